@@ -5,7 +5,7 @@ from sqlalchemy import pool, create_engine
 from sqlalchemy import engine_from_config
 
 # Import Base only (NOT engine!)
-from app.core.database import Base
+from app.core.database import DEFAULT_SHARD, Base, shard_map
 from app.core.config import settings
 
 config = context.config
@@ -13,10 +13,11 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-# Make Alembic use our .env database URL
+# Make Alembic use our .env database URL, or a shard's with `alembic -x shard=<name> ...`
+shard = context.get_x_argument(as_dictionary=True).get("shard", DEFAULT_SHARD)
 config.set_main_option(
     "sqlalchemy.url",
-    settings.DATABASE_URL
+    settings.DATABASE_URL if shard == DEFAULT_SHARD else shard_map.urls[shard]
 )
 
 target_metadata = Base.metadata
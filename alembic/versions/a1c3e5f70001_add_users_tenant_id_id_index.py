@@ -0,0 +1,27 @@
+"""Add composite (tenant_id, id) index on users for keyset pagination
+
+Revision ID: a1c3e5f70001
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1c3e5f70001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_tenant_id_id", "users", ["tenant_id", "id"], unique=False, if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_tenant_id_id", table_name="users", if_exists=True)
@@ -0,0 +1,30 @@
+"""Add version columns to users and tenants
+
+Revision ID: a7c9e1f40007
+Revises: f6b8d0e30006
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c9e1f40007"
+down_revision: Union[str, None] = "f6b8d0e30006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+    op.add_column("tenants", sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("tenants") as batch_op:
+        batch_op.drop_column("version")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("version")
@@ -0,0 +1,36 @@
+"""Add single-row system_state table for signup bootstrap
+
+Revision ID: b2d4f6a80002
+Revises: a1c3e5f70001
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2d4f6a80002"
+down_revision: Union[str, None] = "a1c3e5f70001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "system_state",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("bootstrapped", sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Existing installs already have their first admin
+    op.execute(
+        "INSERT INTO system_state (id, bootstrapped) "
+        "SELECT 1, EXISTS (SELECT 1 FROM users)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("system_state")
@@ -0,0 +1,41 @@
+"""Add tenant_stats counter table and backfill it from users
+
+Revision ID: c3e5a7b90003
+Revises: b2d4f6a80002
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e5a7b90003"
+down_revision: Union[str, None] = "b2d4f6a80002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tenant_stats",
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("total_users", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("active_users", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("admin_users", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["tenant_id"], ["tenants.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("tenant_id"),
+    )
+    op.execute(
+        "INSERT INTO tenant_stats (tenant_id, total_users, active_users, admin_users) "
+        "SELECT tenant_id, COUNT(*), "
+        "SUM(CASE WHEN is_active THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN role = 'admin' THEN 1 ELSE 0 END) "
+        "FROM users GROUP BY tenant_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("tenant_stats")
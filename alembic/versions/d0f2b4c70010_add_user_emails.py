@@ -0,0 +1,34 @@
+"""Add user_emails
+
+Revision ID: d0f2b4c70010
+Revises: c9e1a3b60009
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d0f2b4c70010"
+down_revision: Union[str, None] = "c9e1a3b60009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled from every shard's users by scripts/migrate_shards.py
+    op.create_table(
+        "user_emails",
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("email"),
+    )
+    op.create_index(op.f("ix_user_emails_tenant_id"), "user_emails", ["tenant_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_user_emails_tenant_id"), table_name="user_emails")
+    op.drop_table("user_emails")
@@ -0,0 +1,37 @@
+"""Add principal_invalidations
+
+Revision ID: d4e6f8a00011
+Revises: d4f6b8c10004
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e6f8a00011"
+down_revision: Union[str, None] = "d4f6b8c10004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Workers started with table creation on made this table before it had a migration
+    if sa.inspect(op.get_bind()).has_table("principal_invalidations"):
+        return
+    op.create_table(
+        "principal_invalidations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_principal_invalidations_id"), "principal_invalidations", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_principal_invalidations_id"), table_name="principal_invalidations")
+    op.drop_table("principal_invalidations")
@@ -0,0 +1,30 @@
+"""Add principal_invalidations.versions_only
+
+Revision ID: e1a3c5d80012
+Revises: d0f2b4c70010
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e1a3c5d80012"
+down_revision: Union[str, None] = "d0f2b4c70010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "principal_invalidations",
+        sa.Column("versions_only", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("principal_invalidations") as batch_op:
+        batch_op.drop_column("versions_only")
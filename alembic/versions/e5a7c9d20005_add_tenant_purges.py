@@ -0,0 +1,49 @@
+"""Add tenant status, tenant_purges and tenant-wide principal invalidations
+
+Revision ID: e5a7c9d20005
+Revises: d4e6f8a00011
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a7c9d20005"
+down_revision: Union[str, None] = "d4e6f8a00011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tenants", sa.Column("status", sa.String(), server_default="active", nullable=False))
+    op.create_table(
+        "tenant_purges",
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("users_total", sa.Integer(), nullable=False),
+        sa.Column("users_deleted", sa.Integer(), nullable=False),
+        sa.Column("batches", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("tenant_id"),
+    )
+    op.create_index(op.f("ix_tenant_purges_updated_at"), "tenant_purges", ["updated_at"], unique=False)
+    with op.batch_alter_table("principal_invalidations") as batch_op:
+        batch_op.alter_column("user_id", existing_type=sa.Integer(), nullable=True)
+        batch_op.add_column(sa.Column("tenant_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("principal_invalidations") as batch_op:
+        batch_op.drop_column("tenant_id")
+        batch_op.alter_column("user_id", existing_type=sa.Integer(), nullable=False)
+    op.drop_index(op.f("ix_tenant_purges_updated_at"), table_name="tenant_purges")
+    op.drop_table("tenant_purges")
+    with op.batch_alter_table("tenants") as batch_op:
+        batch_op.drop_column("status")
@@ -0,0 +1,33 @@
+"""Add the tenant_shards directory
+
+Revision ID: f6b8d0e30006
+Revises: e5a7c9d20005
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f6b8d0e30006"
+down_revision: Union[str, None] = "e5a7c9d20005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tenant_shards",
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.String(), nullable=False),
+        sa.Column("moving", sa.Boolean(), server_default="false", nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("tenant_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("tenant_shards")
@@ -3,28 +3,60 @@ from datetime import timedelta
 from typing import Optional
 from pydantic import BaseModel, EmailStr, Field
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Security, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import false, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import security
-from app.api.deps import get_current_active_user
-from app.core.database import get_db
+from app.api.deps import get_current_active_user, get_current_user
+from app.core.etags import with_etag
+from app.core.database import DEFAULT_SHARD, get_default_session, get_directory_session, insert_or_ignore, shard_map, tenant_placement
+from app.core.principal_cache import UserSnapshot
+from app.core.rate_limit import limit_by_ip, limit_by_tenant
+from app.core.revocation import revoke_token
+from app.core.responses import ORJSONResponse
 from app.core.config import settings
-from app.schemas.token import Token
+from app.schemas.token import RefreshRequest, Token
 from app.models.user import User
-from app.models.tenant import Tenant
+from app.models.tenant import TENANT_ACTIVE, Tenant
+from app.models.system_state import SYSTEM_STATE_ID, SystemState
+from app.services.refresh_tokens import issue_refresh_token, revoke_refresh_family, use_refresh_token
+from app.services.repository import get_active_tenant_user, get_active_user_by_email, get_tenant_status_by_name
+from app.services.tenant_shards import find_user_on_shards, tenant_copy_statement
+from app.services.tenant_stats import adjust_tenant_stats, user_counters
+from app.services.user_emails import reserve_emails
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-def create_tenant(db: Session, name: str):
-    db_tenant = db.query(Tenant).filter(Tenant.name == name).first()
-    if db_tenant:
-        return db_tenant
-    db_tenant = Tenant(name=name)
-    db.add(db_tenant)
-    db.commit()
-    db.refresh(db_tenant)
-    return db_tenant
+async def get_or_create_tenant_id(db: AsyncSession, name: str) -> int:
+    """Return the id of tenant `name`, creating it in the current transaction if needed."""
+    # A concurrent creator that rolls back can leave neither row visible; try once more
+    for _ in range(2):
+        tenant_id = await db.scalar(
+            insert_or_ignore(Tenant, "name").values(name=name).returning(Tenant.id)
+        )
+        if tenant_id is None:
+            existing = await get_tenant_status_by_name(db, name)
+            if existing is not None and existing.status != TENANT_ACTIVE:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Tenant is being deleted")
+            tenant_id = existing.id if existing is not None else None
+        if tenant_id is not None:
+            return tenant_id
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Tenant is being created concurrently, please retry"
+    )
+
+async def claim_bootstrap(db: AsyncSession) -> bool:
+    """True for exactly one caller: the signup that creates the first account."""
+    claimed = await db.scalar(
+        update(SystemState)
+        .where(SystemState.id == SYSTEM_STATE_ID, SystemState.bootstrapped == false())
+        .values(bootstrapped=True)
+        .returning(SystemState.id)
+    )
+    return claimed is not None
 
 class UserCreate(BaseModel):
     name: str
@@ -36,83 +68,194 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not security.verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await get_active_user_by_email(db, email)
+    user_db = db
+    if shard_map and (user is None or (await shard_map.placement(user.tenant_id)).shard != DEFAULT_SHARD):
+        # Logins carry no tenant, so users on other shards are looked up there
+        user, user_db = await find_user_on_shards(email)
+    if not user:
         return None
+    # Hand the connection back to the pool while bcrypt runs; the loaded row stays readable
+    await user_db.close()
+    verified, new_hash = await security.verify_and_update_async(password, user.hashed_password)
+    if not verified:
+        return None
+    if new_hash is not None:
+        # Stored hash predates the current policy; skipped if the password changed meanwhile
+        await user_db.execute(
+            update(User)
+            .where(User.id == user.id, User.hashed_password == user.hashed_password)
+            .values(hashed_password=new_hash)
+        )
+        # Commit hands the connection back, so a shard session needs no further closing
+        await user_db.commit()
     return user
 
-@router.post("/login", response_model=Token)
+def token_response(user, refresh_token: str, family_id: str) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = security.create_access_token(
+        data=security.access_token_claims(user, session_id=family_id),
+        expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "expires_in": int(access_token_expires.total_seconds()),
+        "refresh_token": refresh_token,
+    }
+
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_by_ip)])
 async def login(
     request: LoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_default_session)
 ):
     """
-    Get access token by providing email and password
+    Get a short-lived access token and a refresh token by providing email and password
     """
-    user = authenticate_user(db, email=request.email, password=request.password)
+    user = await authenticate_user(db, email=request.email, password=request.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        data={"sub": user.email, "tenant_id": user.tenant_id},
-        expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
 
-@router.post("/signup", status_code=status.HTTP_201_CREATED)
+    # Refresh tokens live on the default database, which `db` is
+    refresh_token, family_id = issue_refresh_token(db, user.id, user.tenant_id)
+    await db.commit()
+    return token_response(user, refresh_token, family_id)
+
+@router.post("/refresh", response_model=Token, dependencies=[Depends(limit_by_ip)])
+async def refresh(
+    request: RefreshRequest,
+    db: AsyncSession = Depends(get_default_session)
+):
+    """
+    Trade a refresh token for a new access token and a new refresh token
+
+    Each refresh token works once. Presenting one again revokes every token
+    issued from the same login.
+    """
+    user_id, tenant_id, family_id = await use_refresh_token(db, request.refresh_token)
+    # The claims are re-read from the user, on their tenant's shard
+    user_db = db
+    if shard_map:
+        placement = await shard_map.placement(tenant_id)
+        if placement.shard != DEFAULT_SHARD:
+            user_db = shard_map.session(placement.shard)
+    try:
+        user = await get_active_tenant_user(user_db, user_id, tenant_id)
+    finally:
+        if user_db is not db:
+            await user_db.close()
+    if user is None:
+        # Deleted, or its tenant is being deleted: nothing left to refresh
+        await revoke_refresh_family(db, family_id)
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    refresh_token, _ = issue_refresh_token(db, user.id, user.tenant_id, family_id)
+    # Built before the commit expires the user row
+    response = token_response(user, refresh_token, family_id)
+    await db.commit()
+    return response
+
+@router.post("/signup", status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_by_ip)])
 async def signup(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_default_session)
 ):
     """
     Create a new user account
     """
-    # Check if user already exists
-    db_user = db.query(User).filter(User.email == user_in.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create or get tenant
-    tenant = create_tenant(db, user_in.tenant_name)
-    
-    # Create new user
-    hashed_password = security.get_password_hash(user_in.password)
-
-    # Determine role: if there are no users in the DB yet, make this first user an admin
-    existing_users = db.query(User).count()
-    role = "admin" if existing_users == 0 else "user"
-    is_super = True if role == "admin" else False
-
-    db_user = User(
-        name=user_in.name,
-        email=user_in.email,
-        hashed_password=hashed_password,
-        tenant_id=tenant.id,
-        role=role,
-        is_superuser=is_super,
-    )
+    # Hash before touching the DB so no connection is held while bcrypt runs
+    hashed_password = await security.get_password_hash_async(user_in.password)
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # One transaction: get-or-create the tenant, claim first-admin, insert the user.
+    # Conflicts are resolved by the unique constraints, not by read-then-write checks.
+    tenant_id = await get_or_create_tenant_id(db, user_in.tenant_name)
+    is_first_user = await claim_bootstrap(db)
+    # The first account on the instance becomes the admin
+    role = "admin" if is_first_user else "user"
+    # The user row goes to the tenant's shard; the registry writes above stay on the default database
+    user_db = db
+    if shard_map:
+        placement = await tenant_placement(tenant_id, write=True)
+        if placement.shard != DEFAULT_SHARD:
+            user_db = shard_map.session(placement.shard)
+    try:
+        if user_db is not db:
+            await user_db.execute(tenant_copy_statement(tenant_id, name=user_in.tenant_name, status=TENANT_ACTIVE))
+        # Claimed on the default database, so no other shard can have it either
+        taken = await reserve_emails(db, tenant_id, [user_in.email])
+        user_id = None if taken else await user_db.scalar(
+            insert_or_ignore(User, "email")
+            .values(
+                name=user_in.name,
+                email=user_in.email,
+                hashed_password=hashed_password,
+                tenant_id=tenant_id,
+                role=role,
+                is_superuser=is_first_user,
+            )
+            .returning(User.id)
+        )
+        if user_id is None:
+            # Undo the tenant and bootstrap claim along with the rejected user
+            await user_db.rollback()
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        await adjust_tenant_stats(user_db, tenant_id, added=user_counters(True, role))
+        if user_db is not db:
+            await user_db.commit()
+        await db.commit()
+    finally:
+        if user_db is not db:
+            await user_db.close()
 
     # Do NOT return token on signup; require explicit login
     return {"message": "User created successfully"}
 
-@router.get("/me")
+@router.get("/me", dependencies=[Depends(limit_by_tenant)])
 async def read_users_me(
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Get current user information
+
+    Served from the principal cache; the ETag is the body's hash, so an
+    unchanged profile is answered with 304.
+    """
+    # orjson encodes the frozen snapshot dataclass natively
+    return with_etag(request, ORJSONResponse(current_user))
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(limit_by_tenant)])
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Security(security.security),
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_user)
+):
+    """
+    Revoke the bearer token of this request, and the refresh token it was issued with
+
+    The token is refused by every worker from its next poll of
+    `revoked_tokens` (TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS) on, and by
+    this one at once.
     """
-    return current_user
\ No newline at end of file
+    claims = security.decode_access_token(credentials.credentials)
+    if claims.get("jti") is None:
+        # Issued before tokens carried an id; it lapses at its `exp`
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token cannot be revoked")
+    await revoke_token(db, claims["jti"], claims["exp"])
+    if claims.get("sid") is not None:
+        await revoke_refresh_family(db, claims["sid"])
+    await db.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,25 +1,41 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.core.database import get_db
+from app.core.database import get_directory_session, shard_map
+from app.core.etags import (
+    cached_not_modified, check_if_match, modified_concurrently, version_cache, version_etag, versioned_response, with_etag
+)
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.rate_limit import limit_by_tenant
+from app.core.responses import ORJSONResponse, rows_response, schema_columns
 from app.core.security import get_current_active_user, get_current_active_superuser
 from app.models.tenant import Tenant as TenantModel
-from app.models.user import User as UserModel
-from app.schemas.tenant import Tenant, TenantCreate, TenantUpdate
+from app.models.tenant_purge import TenantPurge
+from app.core.principal_cache import UserSnapshot, invalidate_tenant_version
+from app.schemas.tenant import Tenant, TenantCreate, TenantPurgeStatus, TenantStats, TenantUpdate
+from app.services.repository import get_tenant_by_name, get_tenant_row
+from app.services.tenant_purge import schedule_purge, start_purge
+from app.services.tenant_shards import sharded_stats, update_tenant_copy
+from app.services.tenant_stats import stats_query
 
-router = APIRouter(prefix="/tenants", tags=["tenants"])
+TENANT_COLUMNS = schema_columns(Tenant, TenantModel)
+PURGE_COLUMNS = schema_columns(TenantPurgeStatus, TenantPurge)
+
+router = APIRouter(prefix="/tenants", tags=["tenants"], dependencies=[Depends(limit_by_tenant)])
 
 @router.post("/", response_model=Tenant, status_code=status.HTTP_201_CREATED)
-def create_tenant(
+async def create_tenant(
     tenant: TenantCreate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_superuser)
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
 ):
     """
     Create a new tenant (superuser only)
     """
-    db_tenant = db.query(TenantModel).filter(TenantModel.name == tenant.name).first()
+    db_tenant = await get_tenant_by_name(db, tenant.name)
     if db_tenant:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,77 +44,164 @@ def create_tenant(
     
     db_tenant = TenantModel(name=tenant.name)
     db.add(db_tenant)
-    db.commit()
-    db.refresh(db_tenant)
+    await db.commit()
+    await db.refresh(db_tenant)
     return db_tenant
 
 @router.get("/", response_model=List[Tenant])
-def read_tenants(
+async def read_tenants(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_superuser)
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
 ):
     """
     Retrieve all tenants (superuser only)
+
+    Pass the `X-Next-Cursor` response header back as `after` for keyset paging.
+    Tagged with the page body's ETag like `GET /users/`.
+    """
+    query = select(*TENANT_COLUMNS)
+    if after is not None:
+        query = query.where(TenantModel.id > decode_cursor(after, "id")["id"])
+    else:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.order_by(TenantModel.id).limit(limit))).all()
+    response = rows_response(rows)
+    set_next_cursor(response, rows, limit, lambda r: {"id": r.id})
+    return with_etag(request, response)
+
+@router.get("/stats", response_model=List[TenantStats])
+async def read_tenants_stats(
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
+):
+    """
+    User counts for every tenant (superuser only)
+
+    Read from the maintained counters, never by counting users. Pages like `GET /tenants/`.
     """
-    tenants = db.query(TenantModel).offset(skip).limit(limit).all()
-    return tenants
+    query = stats_query()
+    if after is not None:
+        query = query.where(TenantModel.id > decode_cursor(after, "id")["id"])
+    else:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.order_by(TenantModel.id).limit(limit))).all()
+    response = ORJSONResponse(await sharded_stats(rows)) if shard_map else rows_response(rows)
+    set_next_cursor(response, rows, limit, lambda r: {"id": r.tenant_id})
+    return response
 
 @router.get("/{tenant_id}", response_model=Tenant)
-def read_tenant(
+async def read_tenant(
     tenant_id: int,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_superuser)
+    request: Request,
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
 ):
     """
     Get a specific tenant (superuser only)
+
+    Tagged with the row's version; see `GET /users/{user_id}`.
     """
-    db_tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
-    if db_tenant is None:
+    unchanged = cached_not_modified(request, "tenant", tenant_id, tenant_id)
+    if unchanged is not None:
+        return unchanged
+    epoch = version_cache.epoch
+    row = await get_tenant_row(db, tenant_id)
+    if row is None:
         raise HTTPException(status_code=404, detail="Tenant not found")
-    return db_tenant
+    return versioned_response(request, "tenant", row, tenant_id, epoch)
+
+@router.get("/{tenant_id}/stats", response_model=TenantStats)
+async def read_tenant_stats(
+    tenant_id: int,
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
+):
+    """
+    User counts for a specific tenant (superuser only)
+    """
+    row = (await db.execute(stats_query().where(TenantModel.id == tenant_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    if shard_map:
+        return ORJSONResponse((await sharded_stats([row]))[0])
+    return ORJSONResponse(row._asdict())
 
 @router.put("/{tenant_id}", response_model=Tenant)
-def update_tenant(
+async def update_tenant(
     tenant_id: int,
     tenant_update: TenantUpdate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_superuser)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
 ):
     """
-    Update a tenant (superuser only)
+    Update a tenant (superuser only); `If-Match` makes it conditional like `PUT /users/{user_id}`
     """
-    db_tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
+    db_tenant = await db.get(TenantModel, tenant_id)
     if db_tenant is None:
         raise HTTPException(status_code=404, detail="Tenant not found")
+    check_if_match(request, version_etag("tenant", tenant_id, db_tenant.version))
     
     # Update tenant data
-    update_data = tenant_update.dict(exclude_unset=True)
+    update_data = tenant_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_tenant, field, value)
     
     db.add(db_tenant)
-    db.commit()
-    db.refresh(db_tenant)
+    # No token claim carries the tenant's name, so its users' tokens stay valid
+    invalidate_tenant_version(db, tenant_id)
+    try:
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        raise modified_concurrently(request)
+    await db.refresh(db_tenant)
+    response.headers["ETag"] = version_etag("tenant", tenant_id, db_tenant.version)
+    if shard_map and update_data:
+        await update_tenant_copy(tenant_id, **update_data)
     return db_tenant
 
-@router.delete("/{tenant_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_tenant(
+@router.delete("/{tenant_id}", response_model=TenantPurgeStatus, status_code=status.HTTP_202_ACCEPTED)
+async def delete_tenant(
     tenant_id: int,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_superuser)
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
 ):
     """
-    Delete a tenant (superuser only)
-    Note: This should be used with caution as it will delete all associated data
+    Delete a tenant and all its users (superuser only)
+
+    The tenant is marked as deleting right away, which locks its users out,
+    and its rows are removed by a background job in small batches. Follow
+    progress at `GET /tenants/{tenant_id}/purge-status`. Repeating the call
+    restarts a failed purge or resumes a stalled one.
     """
-    db_tenant = db.query(TenantModel).filter(TenantModel.id == tenant_id).first()
-    if db_tenant is None:
+    if not await start_purge(db, tenant_id):
         raise HTTPException(status_code=404, detail="Tenant not found")
-    
-    # In a real application, you might want to implement soft delete
-    # or additional checks before deleting a tenant
-    db.delete(db_tenant)
-    db.commit()
-    return {"ok": True}
\ No newline at end of file
+    row = (await db.execute(select(*PURGE_COLUMNS).where(TenantPurge.tenant_id == tenant_id))).one()
+    await db.commit()
+    schedule_purge(tenant_id)
+    return ORJSONResponse(row._asdict(), status_code=status.HTTP_202_ACCEPTED)
+
+@router.get("/{tenant_id}/purge-status", response_model=TenantPurgeStatus)
+async def read_purge_status(
+    tenant_id: int,
+    db: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_superuser)
+):
+    """
+    Progress of a tenant's purge (superuser only)
+    """
+    row = (await db.execute(select(*PURGE_COLUMNS).where(TenantPurge.tenant_id == tenant_id))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="No purge for this tenant")
+    return ORJSONResponse(row._asdict())
@@ -1,28 +1,45 @@
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.core.database import get_db
+from app.core.database import get_directory_session, get_session, shard_map
+from app.core.etags import (
+    cached_not_modified, check_if_match, modified_concurrently, version_cache, version_etag, versioned_response, with_etag
+)
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.principal_cache import UserSnapshot, invalidate_principal
+from app.core.rate_limit import limit_by_tenant
+from app.core.responses import rows_response, schema_columns
+from app.core.security import get_password_hash_async
 from app.api.deps import get_current_active_user
 from app.models.user import User as UserModel
-from app.schemas.user import User, UserCreate, UserUpdate
+from app.schemas.user import User, UserBulkReport, UserCreate, UserUpdate
+from app.services.repository import get_tenant_user, get_tenant_user_row, get_user_by_email
+from app.services.tenant_stats import adjust_tenant_stats, user_counters
+from app.services.user_emails import release_emails, reserve_emails
+from app.services.user_export import MEDIA_TYPES, export_users
+from app.services.user_import import import_users, iter_payload
 
-router = APIRouter(prefix="/users", tags=["users"])
+# Read routes select just the response's columns and serialize the rows directly
+USER_COLUMNS = schema_columns(User, UserModel)
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(UserModel).filter(UserModel.email == email).first()
+router = APIRouter(prefix="/users", tags=["users"], dependencies=[Depends(limit_by_tenant)])
 
 @router.post("/", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_session),
+    directory: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Create a new user (only within the same tenant)
     """
-    db_user = get_user_by_email(db, email=user.email)
+    db_user = await get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,102 +47,195 @@ def create_user(
         )
     
     # Create new user within the same tenant as the current user
-    from app.core.security import get_password_hash
-
     db_user = UserModel(
         email=user.email,
-        hashed_password=get_password_hash(user.password),
+        hashed_password=await get_password_hash_async(user.password),
         tenant_id=current_user.tenant_id  # Same tenant as the creator
     )
+    # With shards, the email may be taken on another one
+    if await reserve_emails(directory, db_user.tenant_id, [db_user.email]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await adjust_tenant_stats(db, db_user.tenant_id, added=user_counters(True, "user"))
+    await db.commit()
+    if directory is not db:
+        await directory.commit()
+    await db.refresh(db_user)
     return db_user
 
+@router.post("/bulk", response_model=UserBulkReport)
+async def bulk_create_users(
+    request: Request,
+    db: AsyncSession = Depends(get_session),
+    directory: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
+    """
+    Create many users in the current tenant at once
+
+    The body is either a JSON array of `{email, password, name?, is_active?}`
+    objects or the same objects streamed as NDJSON (`Content-Type:
+    application/x-ndjson`). Rows are committed in batches; the response
+    reports the outcome of every row by its position in the input.
+    """
+    return await import_users(db, current_user.tenant_id, iter_payload(request), directory)
+
 @router.get("/", response_model=List[User])
-def read_users(
+async def read_users(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Retrieve users (only within the same tenant)
+
+    Pass the `X-Next-Cursor` response header back as `after` to fetch the next
+    page by seeking on (tenant_id, id); `skip` keeps the old offset paging.
+    The ETag is the page body's hash, so an unchanged page is answered with 304.
+    """
+    query = select(*USER_COLUMNS).where(UserModel.tenant_id == current_user.tenant_id)
+    if after is not None:
+        position = decode_cursor(after, "tenant_id", "id")
+        if position["tenant_id"] != current_user.tenant_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.where(UserModel.id > position["id"])
+    else:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.order_by(UserModel.id).limit(limit))).all()
+    response = rows_response(rows)
+    set_next_cursor(response, rows, limit, lambda r: {"tenant_id": r.tenant_id, "id": r.id})
+    return with_etag(request, response)
+
+@router.get("/export")
+async def export_users_stream(
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    current_user: UserSnapshot = Depends(get_current_active_user)
+):
     """
-    users = db.query(UserModel).filter(
-        UserModel.tenant_id == current_user.tenant_id
-    ).offset(skip).limit(limit).all()
-    return users
+    Stream every user in the current tenant as NDJSON or CSV
+
+    Rows are read through a server-side cursor in EXPORT_BATCH_SIZE batches
+    and written out as they arrive, so memory stays flat for any tenant size.
+    """
+    shard = (await shard_map.placement(current_user.tenant_id)).shard if shard_map else None
+    return StreamingResponse(
+        export_users(current_user.tenant_id, fmt, shard),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="users-{current_user.tenant_id}.{fmt}"'},
+    )
 
 @router.get("/{user_id}", response_model=User)
-def read_user(
+async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Get a specific user (only within the same tenant)
+
+    Tagged with the row's version; a poll whose `If-None-Match` is still
+    current gets a 304 from the version cache without a query.
     """
-    db_user = db.query(UserModel).filter(
-        UserModel.id == user_id,
-        UserModel.tenant_id == current_user.tenant_id
-    ).first()
+    unchanged = cached_not_modified(request, "user", user_id, current_user.tenant_id)
+    if unchanged is not None:
+        return unchanged
+    epoch = version_cache.epoch
+    row = await get_tenant_user_row(db, user_id, current_user.tenant_id)
     
-    if db_user is None:
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    return versioned_response(request, "user", row, current_user.tenant_id, epoch)
 
 @router.put("/{user_id}", response_model=User)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_session),
+    directory: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
     Update a user (only within the same tenant)
+
+    With `If-Match`, the update only applies if the user is still at that
+    ETag (412 otherwise).
     """
-    db_user = db.query(UserModel).filter(
-        UserModel.id == user_id,
-        UserModel.tenant_id == current_user.tenant_id
-    ).first()
+    db_user = await get_tenant_user(db, user_id, current_user.tenant_id)
     
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    check_if_match(request, version_etag("user", user_id, db_user.version))
     
+    counted_before = user_counters(db_user.is_active, db_user.role)
+    email_before = db_user.email
+
     # Update user data
-    update_data = user_update.dict(exclude_unset=True)
+    update_data = user_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         if field == "password" and value is not None:
             # Hash the password before saving
-            from app.core.security import get_password_hash
-            setattr(db_user, "hashed_password", get_password_hash(value))
+            setattr(db_user, "hashed_password", await get_password_hash_async(value))
         else:
             setattr(db_user, field, value)
+    if db_user.email != email_before:
+        if await reserve_emails(directory, db_user.tenant_id, [db_user.email]):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+        await release_emails(directory, [email_before])
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    invalidate_principal(db, db_user.id)
+    try:
+        await adjust_tenant_stats(
+            db, db_user.tenant_id, added=user_counters(db_user.is_active, db_user.role), removed=counted_before
+        )
+        await db.commit()
+        if directory is not db:
+            await directory.commit()
+    except StaleDataError:
+        # Another update committed since the row was loaded
+        await db.rollback()
+        raise modified_concurrently(request)
+    await db.refresh(db_user)
+    response.headers["ETag"] = version_etag("user", db_user.id, db_user.version)
     return db_user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_session),
+    directory: AsyncSession = Depends(get_directory_session),
+    current_user: UserSnapshot = Depends(get_current_active_user)
 ):
     """
-    Delete a user (only within the same tenant)
+    Delete a user (only within the same tenant); honours `If-Match` like PUT
     """
-    db_user = db.query(UserModel).filter(
-        UserModel.id == user_id,
-        UserModel.tenant_id == current_user.tenant_id
-    ).first()
+    db_user = await get_tenant_user(db, user_id, current_user.tenant_id)
     
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    check_if_match(request, version_etag("user", user_id, db_user.version))
     
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    invalidate_principal(db, db_user.id)
+    await release_emails(directory, [db_user.email])
+    try:
+        await adjust_tenant_stats(db, db_user.tenant_id, removed=user_counters(db_user.is_active, db_user.role))
+        await db.commit()
+        if directory is not db:
+            await directory.commit()
+    except StaleDataError:
+        await db.rollback()
+        raise modified_concurrently(request)
     return {"ok": True}
\ No newline at end of file
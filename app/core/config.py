@@ -15,6 +15,52 @@ class Settings(BaseSettings):
     # Database
     # Provide a sensible default for local development. Override with env var in production.
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./tenant.db")
+    # "sync" runs queries on the sync driver in the threadpool; "async" uses aiosqlite/asyncpg.
+    # Both modes serve the same routes, so throughput can be compared under the same load.
+    DB_MODE: str = os.getenv("DB_MODE", "sync")
+    # Optional explicit async URL; derived from DATABASE_URL when not set
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+    # What each worker does about the schema at startup (app/core/schema.py):
+    # "auto" creates tables on SQLite or with CREATE_TABLES=true unless the database is already
+    # at the current Alembic revision; "check" only reads that revision and refuses to start on
+    # a mismatch (one query per database, no DDL); "create_all" always runs create_all; "none" skips.
+    SCHEMA_STARTUP: str = os.getenv("SCHEMA_STARTUP", "auto")
+    CREATE_TABLES: bool = os.getenv("CREATE_TABLES", "false").lower() == "true"
+
+    # Read replicas, comma separated (sync or async URLs, like DATABASE_URL). When set,
+    # GET/HEAD requests and their auth lookup read from a replica, round-robin; every
+    # other request uses the primary.
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # After a client writes, its reads go to the primary for this many seconds (read-your-writes)
+    REPLICA_STICKY_SECONDS: float = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    # A replica that fails to connect is skipped for this long; reads fall back to the primary
+    REPLICA_RETRY_SECONDS: float = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+
+    # Tenant shards: JSON {"name": "url"} of extra databases, next to DATABASE_URL (shard
+    # "default", which also holds the tenant registry and the shard directory)
+    DATABASE_SHARDS: str = os.getenv("DATABASE_SHARDS", "{}")
+    # JSON {"tenant_id": "shard"} placing tenants that don't exist yet; rows in the
+    # tenant_shards table (written by scripts/move_tenant.py) take precedence
+    TENANT_SHARDS: str = os.getenv("TENANT_SHARDS", "{}")
+    # How long each worker caches the shard directory; moves wait this long between steps
+    SHARD_MAP_TTL_SECONDS: float = float(os.getenv("SHARD_MAP_TTL_SECONDS", 5))
+
+    # Connection pool (applies to every engine: primary, async and replicas)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    # Seconds before a pooled connection is replaced; -1 keeps connections forever
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", -1))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+
+    # SQLite performance profile, applied as PRAGMAs on every new connection.
+    # Set any of them to an empty string to leave SQLite's default in place.
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: str = os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")
+    SQLITE_MMAP_SIZE: str = os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+    # Negative values are KiB, positive values are pages
+    SQLITE_CACHE_SIZE: str = os.getenv("SQLITE_CACHE_SIZE", "-65536")
     
     # Security
     # WARNING: Replace the default SECRET_KEY in production using env var or .env.
@@ -22,8 +68,91 @@ class Settings(BaseSettings):
     
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
         
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 1440))  # Default to 24 hours
+    # Asymmetric signing: a directory of `<kid>.pem` keys (RSA or EC, private or public only).
+    # When set, access tokens are signed with JWT_SIGNING_KID and carry it in their `kid`
+    # header; SECRET_KEY and ALGORITHM no longer apply to them.
+    JWT_KEYS_DIR: str = os.getenv("JWT_KEYS_DIR", "")
+    JWT_SIGNING_KID: str = os.getenv("JWT_SIGNING_KID", "")
+    # Cache-Control max-age of /.well-known/jwks.json
+    JWKS_MAX_AGE_SECONDS: int = int(os.getenv("JWKS_MAX_AGE_SECONDS", 300))
+
+    # Access tokens carry the user's role and flags and are authorized without a DB lookup,
+    # so they are short-lived; clients renew them with the refresh token from login
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 5))
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+    # How often each worker polls revoked_tokens for logouts made on other workers
+    TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS: float = float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS", 1))
+
+    # Password hash policy for new hashes. Hashes made under another scheme or cost
+    # still verify and are replaced on the user's next successful login.
+    # "bcrypt" or "argon2id" (needs the argon2-cffi package)
+    PASSWORD_HASH_SCHEME: str = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", 2))
+    ARGON2_MEMORY_COST_KIB: int = int(os.getenv("ARGON2_MEMORY_COST_KIB", 19456))
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", 1))
+    # >0: at startup, pick the strongest cost that hashes within this many ms on this host
+    # (replaces BCRYPT_ROUNDS / ARGON2_TIME_COST). Each worker measures on its own, so for
+    # several workers pin the output of scripts/calibrate_password_hash.py instead.
+    PASSWORD_HASH_TARGET_MS: float = float(os.getenv("PASSWORD_HASH_TARGET_MS", 0))
+
+    # Password hashing executor
+    # bcrypt runs in a bounded pool so it never blocks the event loop.
+    # "thread" is cheap to start (bcrypt releases the GIL); "process" isolates CPU work completely.
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+    # 0 means one worker per CPU
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 0))
+    # Max hashing jobs running or waiting; beyond this requests get a 503
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64))
+
+    # Bulk user import (POST /users/bulk)
+    # Hashing for bulk imports uses its own pool so an import can't starve logins
+    BULK_HASH_EXECUTOR: str = os.getenv("BULK_HASH_EXECUTOR", "process")
+    BULK_HASH_WORKERS: int = int(os.getenv("BULK_HASH_WORKERS", 0))
+    # Rows per duplicate check / INSERT / COMMIT
+    BULK_IMPORT_BATCH_SIZE: int = int(os.getenv("BULK_IMPORT_BATCH_SIZE", 500))
     
+    # Rows fetched per round trip by the streaming export (GET /users/export)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+    # Background tenant purge (DELETE /tenants/{id}): users deleted per transaction,
+    # and the pause between batches that leaves the database to live traffic
+    TENANT_PURGE_BATCH_SIZE: int = int(os.getenv("TENANT_PURGE_BATCH_SIZE", 1000))
+    TENANT_PURGE_PAUSE_MS: float = float(os.getenv("TENANT_PURGE_PAUSE_MS", 50))
+
+    # Verified-principal cache used by get_current_user
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+    # Publish invalidations through the principal_invalidations table so other workers see them
+    PRINCIPAL_CACHE_SYNC: bool = os.getenv("PRINCIPAL_CACHE_SYNC", "false").lower() == "true"
+    PRINCIPAL_CACHE_SYNC_INTERVAL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_SYNC_INTERVAL_SECONDS", 1))
+    # Row versions behind If-None-Match on GET /users/{id} and /tenants/{id}; evicted like principals
+    VERSION_CACHE_SIZE: int = int(os.getenv("VERSION_CACHE_SIZE", 10000))
+    VERSION_CACHE_TTL_SECONDS: float = float(os.getenv("VERSION_CACHE_TTL_SECONDS", 60))
+
+    # Prometheus metrics at /metrics plus the request-timing middleware.
+    # For multi-worker servers also set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory.
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Token-bucket rate limiting: login/signup per client IP, everything else per tenant.
+    # Limits are "requests/seconds", e.g. "120/60" = bursts of 120, refilled at 2/s.
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+    # "memory" (per worker) or "database" (rate_limit_buckets table, shared by all workers)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_AUTH: str = os.getenv("RATE_LIMIT_AUTH", "20/60")
+    RATE_LIMIT_READ: str = os.getenv("RATE_LIMIT_READ", "1200/60")
+    RATE_LIMIT_WRITE: str = os.getenv("RATE_LIMIT_WRITE", "300/60")
+    RATE_LIMIT_BULK: str = os.getenv("RATE_LIMIT_BULK", "10/60")
+    # JSON per-tenant overrides, e.g. {"42": {"read": "6000/60", "bulk": "60/60"}}
+    RATE_LIMIT_TENANT_OVERRIDES: str = os.getenv("RATE_LIMIT_TENANT_OVERRIDES", "{}")
+    # Take the client IP from X-Forwarded-For (only behind a trusted proxy)
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+    # Per-request SQL counts/timings, reported in the Server-Timing response header
+    SQL_TIMING_ENABLED: bool = os.getenv("SQL_TIMING_ENABLED", "true").lower() == "true"
+    # Statements slower than this are logged with the request they ran for; 0 disables
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", 200))
+
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
     
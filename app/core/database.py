@@ -1,20 +1,247 @@
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+import itertools
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import create_engine, event, exc, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+
 from app.core.config import settings
+from app.core.metrics import observe_pool_checkout
+
+# Sync and async drivers for each backend; DATABASE_URL may name either one
+_SYNC_DRIVERS = {"sqlite": "sqlite", "postgresql": "postgresql+psycopg2"}
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _with_driver(url: str, drivers: dict) -> str:
+    parsed = make_url(url)
+    driver = drivers.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def to_sync_url(url: str) -> str:
+    return _with_driver(url, _SYNC_DRIVERS)
+
+
+def to_async_url(url: str) -> str:
+    return _with_driver(url, _ASYNC_DRIVERS)
+
+
+class PoolWaitStats:
+    """Checkout wait-time counters for one pool, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds_total += waited
+            if waited > self.wait_seconds_max:
+                self.wait_seconds_max = waited
+
+
+class _TimedCheckoutMixin:
+    """Times how long each checkout waits for a free connection.
+
+    SQLAlchemy has no "before checkout" event, so the wait is measured around
+    the pool's own `_do_get`, which is where a caller blocks when the pool and
+    its overflow are exhausted.
+    """
+
+    wait_stats: PoolWaitStats
+    # `engine` label on the checkout-wait metrics
+    metrics_label = "sync"
+
+    def _do_get(self):
+        if not hasattr(self, "wait_stats"):
+            self.wait_stats = PoolWaitStats()
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_stats.record(waited, timed_out)
+            observe_pool_checkout(self.metrics_label, waited, timed_out)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class QueryStats:
+    """Number of SQL statements and time spent in them for one unit of work (a request)."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+
+    def record(self, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+
+
+# Set per request by the Server-Timing middleware. In sync mode queries run in the
+# threadpool, which copies the context, so they still add to the same QueryStats.
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """Attribute every statement executed inside the block (and its threadpool calls) to one QueryStats."""
+    stats = QueryStats(label)
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, *, is_async: bool = False) -> dict:
+    """Pool and driver keyword arguments for `create_engine`/`create_async_engine`."""
+    options: dict = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() == "sqlite" and not is_async:
+        options["connect_args"] = {"check_same_thread": False}
+    if _is_memory_sqlite(url):
+        # In-memory SQLite uses a single shared connection; queue pool settings don't apply
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def _sqlite_pragmas() -> list:
+    pragmas = [
+        ("journal_mode", settings.SQLITE_JOURNAL_MODE),
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+        ("busy_timeout", settings.SQLITE_BUSY_TIMEOUT_MS),
+        ("mmap_size", settings.SQLITE_MMAP_SIZE),
+        ("cache_size", settings.SQLITE_CACHE_SIZE),
+    ]
+    return [(name, value) for name, value in pragmas if value]
+
+
+def configure_engine(sync_engine: Engine) -> Engine:
+    """Attach per-connection setup (the SQLite PRAGMA profile) and query timing to an engine."""
+    if settings.SQL_TIMING_ENABLED:
+        slow_seconds = settings.SLOW_QUERY_MS / 1000
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+            context._query_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def _record_query(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._query_started
+            stats = _query_stats.get()
+            if stats is not None:
+                stats.record(elapsed)
+            if slow_seconds > 0 and elapsed >= slow_seconds:
+                logging.getLogger("uvicorn.error").warning(
+                    "Slow query (%.1f ms) during %s: %s",
+                    elapsed * 1000, stats.label if stats is not None else "-", " ".join(statement.split())[:500],
+                )
+
+    if sync_engine.dialect.name == "sqlite":
+        pragmas = _sqlite_pragmas()
+
+        @event.listens_for(sync_engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas:
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+    return sync_engine
+
+
+def _make_engine(url: str, is_async: bool, metrics_label: str) -> Union[Engine, AsyncEngine]:
+    """A configured engine for an extra database (replica or shard), its pool metrics under `metrics_label`."""
+    if is_async:
+        url = to_async_url(url)
+        extra = create_async_engine(url, **engine_options(url, is_async=True))
+        configure_engine(extra.sync_engine)
+        pool = extra.sync_engine.pool
+    else:
+        url = to_sync_url(url)
+        extra = configure_engine(create_engine(url, **engine_options(url)))
+        pool = extra.pool
+    pool.metrics_label = metrics_label
+    return extra
+
+
+def pool_status(sync_engine: Engine) -> dict:
+    """Live pool statistics: checked out connections, overflow and checkout waits."""
+    pool = sync_engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+            timeout_seconds=pool.timeout(),
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(
+            checkouts=wait_stats.checkouts,
+            timeouts=wait_stats.timeouts,
+            wait_seconds_total=round(wait_stats.wait_seconds_total, 6),
+            wait_seconds_max=round(wait_stats.wait_seconds_max, 6),
+        )
+    return status
 
-# Load environment variables from .env (settings already does this as well)
-load_dotenv()
 
 # Get database URL from settings (uses default when not provided)
-DATABASE_URL = settings.DATABASE_URL
+DATABASE_URL = to_sync_url(settings.DATABASE_URL)
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
 
-# Create database engine with SQLite-specific connect args when required
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+engine = configure_engine(create_engine(DATABASE_URL, **engine_options(DATABASE_URL)))
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,10 +249,525 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Base class for models
 Base = declarative_base()
 
+# The async engine needs aiosqlite/asyncpg, so it is only built on first use
+_async_engine: Optional[AsyncEngine] = None
+_AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True)
+        )
+        configure_engine(_async_engine.sync_engine)
+        # Objects stay readable after commit; lazy reloads are not possible without a greenlet
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    get_async_engine()
+    return _AsyncSessionLocal
+
+
+def all_pool_status() -> dict:
+    status = {"sync": pool_status(engine)}
+    if _async_engine is not None:
+        status["async"] = pool_status(_async_engine.sync_engine)
+    status.update(replica_set.pool_status())
+    status.update(shard_map.pool_status())
+    return status
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
+    await replica_set.dispose()
+    await shard_map.dispose()
+
+
+class ThreadedSession:
+    """Awaitable facade over a sync `Session`, mirroring the `AsyncSession` API.
+
+    Every blocking call is pushed to the threadpool, so routes can be written
+    once against the async API and still run on the sync driver (DB_MODE=sync).
+    Results are pre-buffered like `AsyncSession` does, so iterating them never
+    touches the DB from the event loop.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    def expunge(self, instance: Any) -> None:
+        self.sync_session.expunge(instance)
+
+    async def execute(self, statement, params=None, *, execution_options=None, **kw):
+        options = {"prebuffer_rows": True, **(execution_options or {})}
+        return await run_in_threadpool(
+            self.sync_session.execute, statement, params, execution_options=options, **kw
+        )
+
+    async def scalar(self, statement, params=None, **kw):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kw)
+
+    async def scalars(self, statement, params=None, **kw):
+        result = await self.execute(statement, params, **kw)
+        return result.scalars()
+
+    async def get(self, entity, ident, **kw):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kw)
+
+    async def connection(self, **kw):
+        return await run_in_threadpool(self.sync_session.connection, **kw)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self, objects=None) -> None:
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance: Any, attribute_names=None) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kw: Any) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kw)
+
+
+def dialect_insert(table):
+    """`insert()` for the configured backend, with its `on_conflict_*` upsert methods."""
+    dialects = {"postgresql": postgresql, "sqlite": sqlite}
+    if engine.dialect.name not in dialects:
+        raise NotImplementedError(f"No upsert support for dialect {engine.dialect.name!r}")
+    return dialects[engine.dialect.name].insert(table)
+
+
+def insert_or_ignore(table, *index_elements: str):
+    """`INSERT ... ON CONFLICT (index_elements) DO NOTHING` for the configured backend.
+
+    Conflicting rows are skipped instead of raising, so with `.returning()`
+    an empty result means the row already existed.
+    """
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=list(index_elements))
+
+
+async def stream_rows(statement, batch_size: int, shard: Optional[str] = None) -> AsyncIterator[list]:
+    """Yield the rows of a Core `select()` in lists of at most `batch_size`.
+
+    Runs on its own connection with a server-side cursor (`stream_results` on
+    psycopg2, `AsyncConnection.stream` on asyncpg), so only one batch is ever
+    held in memory no matter how many rows match. `shard` picks the database
+    (default: the default one).
+    """
+    shard = shard or DEFAULT_SHARD
+    if settings.DB_MODE == "async":
+        async with shard_map.engine(shard, is_async=True).connect() as conn:
+            result = await conn.stream(statement.execution_options(yield_per=batch_size))
+            async for partition in result.partitions(batch_size):
+                yield partition
+        return
+
+    conn = await run_in_threadpool(shard_map.engine(shard).connect)
+    try:
+        conn = conn.execution_options(stream_results=True, yield_per=batch_size)
+        result = await run_in_threadpool(conn.execute, statement)
+        partitions = result.partitions(batch_size)
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                break
+            yield partition
+    finally:
+        await run_in_threadpool(conn.close)
+
+
 def get_db():
     """Dependency for getting database session"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting an `AsyncSession` (aiosqlite / asyncpg)."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+# Methods that may be served from a read replica
+READ_METHODS = ("GET", "HEAD")
+# Set on responses to writes: epoch seconds until which the client reads from the primary
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+class ReplicaSet:
+    """Read replica engines, handed out round-robin.
+
+    Engines are built on first use, sync or async to match DB_MODE. A replica
+    that fails to give out a connection is skipped for `retry_seconds` and
+    then tried again.
+    """
+
+    def __init__(self, urls: List[str], retry_seconds: float):
+        self.urls = urls
+        self.retry_seconds = retry_seconds
+        self._engines: Dict[Tuple[int, bool], Union[Engine, AsyncEngine]] = {}
+        self._down_until = [0.0] * len(urls)
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def engine(self, index: int, is_async: bool = False) -> Union[Engine, AsyncEngine]:
+        key = (index, is_async)
+        with self._lock:
+            if key not in self._engines:
+                # Pool checkout metrics per replica instead of folded into the primary's
+                self._engines[key] = _make_engine(
+                    self.urls[index], is_async, f"{'async' if is_async else 'sync'}-replica{index}"
+                )
+            return self._engines[key]
+
+    def available(self) -> List[int]:
+        """Healthy replicas, rotated so consecutive calls start at the next one."""
+        now = time.monotonic()
+        healthy = [index for index in range(len(self.urls)) if self._down_until[index] <= now]
+        if not healthy:
+            return []
+        start = next(self._next) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def mark_down(self, index: int, error: Exception) -> None:
+        self._down_until[index] = time.monotonic() + self.retry_seconds
+        logging.getLogger("uvicorn.error").warning(
+            "Read replica %d unavailable, skipping it for %.0fs: %s", index, self.retry_seconds, error
+        )
+
+    def pool_status(self) -> dict:
+        return {
+            f"{'async' if is_async else 'sync'}-replica{index}": pool_status(
+                replica.sync_engine if is_async else replica
+            )
+            for (index, is_async), replica in sorted(self._engines.items())
+        }
+
+    async def dispose(self) -> None:
+        for (index, is_async), replica in list(self._engines.items()):
+            if is_async:
+                await replica.dispose()
+            else:
+                replica.dispose()
+        self._engines.clear()
+
+
+class ReadYourWrites:
+    """Remembers which clients wrote recently, so their reads stay on the primary.
+
+    A client is its Authorization header, or its IP when there is none. The
+    mark is kept in this worker and also returned as a cookie, so other
+    workers honour it for clients that send cookies back.
+    """
+
+    def __init__(self, window: float, max_keys: int = 100000):
+        self.window = window
+        self.max_keys = max_keys
+        # Only touched from the event loop thread
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+
+    @staticmethod
+    def _client(request: Request) -> str:
+        return request.headers.get("authorization") or (request.client.host if request.client else "")
+
+    def mark(self, request: Request, response: Response) -> None:
+        if self.window <= 0:
+            return
+        until = time.time() + self.window
+        key = self._client(request)
+        self._until.pop(key, None)
+        self._until[key] = until
+        while len(self._until) > self.max_keys:
+            self._until.popitem(last=False)
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE, f"{until:.3f}", max_age=math.ceil(self.window), httponly=True, samesite="lax"
+        )
+
+    def is_recent(self, request: Request) -> bool:
+        now = time.time()
+        if self._until.get(self._client(request), 0.0) > now:
+            return True
+        try:
+            return float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > now
+        except ValueError:
+            return False
+
+
+replica_set = ReplicaSet(
+    [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    settings.REPLICA_RETRY_SECONDS,
+)
+read_your_writes = ReadYourWrites(settings.REPLICA_STICKY_SECONDS)
+
+
+def _primary_session():
+    if settings.DB_MODE == "async":
+        return get_async_sessionmaker()()
+    return ThreadedSession(SessionLocal())
+
+
+async def _replica_session():
+    """A session on the next healthy replica, or None when none can give out a connection."""
+    for index in replica_set.available():
+        if settings.DB_MODE == "async":
+            db = AsyncSession(replica_set.engine(index, is_async=True), autoflush=False, expire_on_commit=False)
+        else:
+            db = ThreadedSession(Session(bind=replica_set.engine(index), autoflush=False))
+        try:
+            # Check out the connection up front so a dead replica is skipped before the route runs
+            await db.connection()
+            return db
+        except exc.DBAPIError as e:
+            await db.close()
+            replica_set.mark_down(index, e)
+    return None
+
+
+DEFAULT_SHARD = "default"
+
+
+@dataclass(frozen=True)
+class Placement:
+    """Where a tenant's rows live, and whether a move is holding its writes."""
+    shard: str = DEFAULT_SHARD
+    moving: bool = False
+
+
+class ShardMap:
+    """Named databases that tenants are spread over, and which tenant is where.
+
+    "default" is DATABASE_URL. It keeps the tenant registry, the shard
+    directory and every table that isn't per tenant; a shard holds the users
+    and counters of its tenants (plus a copy of their `tenants` rows for the
+    foreign keys). A tenant is on the shard named by its `tenant_shards` row,
+    else by its TENANT_SHARDS pin, else on "default". Each worker re-reads
+    the directory at most every `ttl` seconds. Engines are built on first
+    use, sync or async to match DB_MODE.
+    """
+
+    def __init__(self, urls: Dict[str, str], pins: Dict[int, str], ttl: float):
+        unknown = set(pins.values()) - set(urls) - {DEFAULT_SHARD}
+        if unknown:
+            raise ValueError(f"TENANT_SHARDS names unknown shards: {sorted(unknown)}")
+        self.urls = urls
+        self.pins = pins
+        self.ttl = ttl
+        self._engines: Dict[Tuple[str, bool], Union[Engine, AsyncEngine]] = {}
+        self._directory: Dict[int, Placement] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.urls)
+
+    def names(self) -> List[str]:
+        return [DEFAULT_SHARD, *self.urls]
+
+    def engine(self, shard: str, is_async: bool = False) -> Union[Engine, AsyncEngine]:
+        if shard == DEFAULT_SHARD:
+            return get_async_engine() if is_async else engine
+        key = (shard, is_async)
+        with self._lock:
+            if key not in self._engines:
+                self._engines[key] = _make_engine(
+                    self.urls[shard], is_async, f"{'async' if is_async else 'sync'}-shard-{shard}"
+                )
+            return self._engines[key]
+
+    def session(self, shard: str):
+        """A new session on `shard` for the configured DB_MODE; the caller closes it."""
+        if shard == DEFAULT_SHARD:
+            db = _primary_session()
+        elif settings.DB_MODE == "async":
+            db = AsyncSession(self.engine(shard, is_async=True), autoflush=False, expire_on_commit=False)
+        else:
+            db = ThreadedSession(Session(bind=self.engine(shard), autoflush=False))
+        db.info["shard"] = shard
+        return db
+
+    def load_directory(self) -> None:
+        """Re-read `tenant_shards` from the default database."""
+        # Imported here: the models import Base from this module
+        from app.models.tenant_shard import TenantShard
+
+        with engine.connect() as conn:
+            rows = conn.execute(select(TenantShard.tenant_id, TenantShard.shard, TenantShard.moving)).all()
+        self._directory = {row.tenant_id: Placement(row.shard, bool(row.moving)) for row in rows}
+        self._expires_at = time.monotonic() + self.ttl
+
+    def placement_sync(self, tenant_id: int) -> Placement:
+        if time.monotonic() >= self._expires_at:
+            self.load_directory()
+        return self._lookup(tenant_id)
+
+    async def placement(self, tenant_id: int) -> Placement:
+        if time.monotonic() >= self._expires_at:
+            await run_in_threadpool(self.load_directory)
+        return self._lookup(tenant_id)
+
+    def _lookup(self, tenant_id: int) -> Placement:
+        placement = self._directory.get(tenant_id)
+        if placement is None:
+            placement = Placement(self.pins.get(tenant_id, DEFAULT_SHARD))
+        return placement
+
+    def pool_status(self) -> dict:
+        return {
+            f"{'async' if is_async else 'sync'}-shard-{shard}": pool_status(
+                shard_engine.sync_engine if is_async else shard_engine
+            )
+            for (shard, is_async), shard_engine in sorted(self._engines.items())
+        }
+
+    async def dispose(self) -> None:
+        for (shard, is_async), shard_engine in list(self._engines.items()):
+            if is_async:
+                await shard_engine.dispose()
+            else:
+                shard_engine.dispose()
+        self._engines.clear()
+
+
+shard_map = ShardMap(
+    json.loads(settings.DATABASE_SHARDS),
+    {int(tenant_id): shard for tenant_id, shard in json.loads(settings.TENANT_SHARDS).items()},
+    settings.SHARD_MAP_TTL_SECONDS,
+)
+
+
+def create_all_shards() -> None:
+    """`create_all` on the default database and on every shard; each gets the full schema."""
+    for shard in shard_map.names():
+        Base.metadata.create_all(bind=shard_map.engine(shard))
+
+
+async def tenant_placement(tenant_id: int, write: bool = False) -> Placement:
+    """The tenant's placement; for a write, 503 while a move holds the tenant's writes."""
+    placement = await shard_map.placement(tenant_id)
+    if write and placement.moving:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tenant is being moved to another shard, retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(shard_map.ttl)))},
+        )
+    return placement
+
+
+def _token_tenant_id(request: Request) -> Optional[int]:
+    """The `tenant_id` claim of the bearer token, unverified.
+
+    Only used to pick the database; `get_current_user` verifies the token
+    against the user found there.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from jose import JWTError, jwt
+
+    try:
+        return int(jwt.get_unverified_claims(token)["tenant_id"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+
+
+async def _default_session(request: Request, response: Response):
+    """A session on the default database: a replica for reads when possible, else the primary."""
+    db = None
+    if replica_set:
+        if request.method not in READ_METHODS:
+            read_your_writes.mark(request, response)
+        elif not read_your_writes.is_recent(request):
+            db = await _replica_session()
+    return db if db is not None else _primary_session()
+
+
+async def get_session(request: Request, response: Response) -> AsyncIterator[AsyncSession]:
+    """Dependency used by the routers: an awaitable session for the configured DB_MODE.
+
+    `DB_MODE=async` yields a real `AsyncSession`; `DB_MODE=sync` yields the
+    sync session wrapped in `ThreadedSession`. Both expose the same API, which
+    lets the two drivers be compared under identical handlers.
+
+    With DATABASE_REPLICA_URLS set, GET/HEAD requests (and the auth lookup
+    they share this session with) read from a replica, unless the client
+    wrote in the last REPLICA_STICKY_SECONDS or no replica is reachable.
+
+    With DATABASE_SHARDS set, a request whose bearer token names a tenant on
+    another shard gets a session on that shard (replicas serve the default
+    database only). Writes for a tenant that is being moved get a 503.
+    """
+    db = None
+    tenant_id = _token_tenant_id(request) if shard_map else None
+    if tenant_id is not None:
+        placement = await tenant_placement(tenant_id, write=request.method not in READ_METHODS)
+        if placement.shard != DEFAULT_SHARD:
+            db = shard_map.session(placement.shard)
+    if db is None:
+        db = await _default_session(request, response)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_default_session(request: Request, response: Response) -> AsyncIterator[AsyncSession]:
+    """Dependency for routes that take no access token (login, signup, refresh): the default database.
+
+    Unlike `get_session` it ignores the Authorization header, which nothing
+    on these routes verifies, so a client can't steer them onto a shard.
+    """
+    db = await _default_session(request, response)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def get_directory_session(
+    request: Request, response: Response, db: AsyncSession = Depends(get_session)
+) -> AsyncIterator[AsyncSession]:
+    """Dependency for routes on the tenant registry (`tenants`): always the default database.
+
+    Shares the request's `get_session` session unless that one is on a shard.
+    """
+    if db.info.get("shard", DEFAULT_SHARD) == DEFAULT_SHARD:
+        yield db
+        return
+    directory = await _default_session(request, response)
+    try:
+        yield directory
+    finally:
+        await directory.close()
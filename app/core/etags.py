@@ -0,0 +1,189 @@
+# app/core/etags.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+
+# Headers a 304 drops; everything else the full response would carry is repeated
+_BODY_HEADERS = {"content-length", "content-type"}
+
+
+def version_etag(kind: str, row_id: int, version: int) -> str:
+    """Strong ETag of a versioned row (`User.version`, `Tenant.version`)."""
+    return f'"{kind}-{row_id}-{version}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag of an exact response body, for responses without a single version."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """Whether an If-None-Match (`weak`) or If-Match (strong) header lists `etag`.
+
+    Weak comparison ignores `W/` prefixes; strong comparison never matches a
+    weak tag. `*` matches any current representation.
+    """
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers=None) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(headers or {}))
+    response.headers["ETag"] = etag
+    return response
+
+
+def with_etag(request: Request, response: Response) -> Response:
+    """Tag a rendered response with its body's ETag, or answer 304 if the client has it."""
+    etag = body_etag(response.body)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers = {key: value for key, value in response.headers.items() if key not in _BODY_HEADERS}
+        return not_modified(etag, headers)
+    response.headers["ETag"] = etag
+    return response
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    """412 unless the request's If-Match, when present, names the current version."""
+    header = request.headers.get("if-match")
+    if header is not None and not etag_matches(header, etag, weak=False):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified",
+            headers={"ETag": etag},
+        )
+
+
+def modified_concurrently(request: Request) -> HTTPException:
+    """The error for a write whose version check failed at flush (`StaleDataError`)."""
+    if request.headers.get("if-match") is not None:
+        return HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail="Resource has been modified")
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Resource was modified concurrently, please retry")
+
+
+class VersionCache:
+    """LRU + TTL map of (kind, id) -> (tenant_id, version) for conditional GETs.
+
+    Lets an `If-None-Match` poll be answered with a 304 without touching the
+    DB. Entries are evicted together with the principal cache (same commit
+    hooks, same cross-worker sync), and `epoch` guards against writing back
+    a version read before a concurrent eviction.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Optional[int], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, row_id: int) -> Optional[Tuple[Optional[int], int]]:
+        with self._lock:
+            entry = self._entries.get((kind, row_id))
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop((kind, row_id), None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end((kind, row_id))
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, kind: str, row_id: int, tenant_id: Optional[int], version: int, epoch: int) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            self._entries[(kind, row_id)] = (time.monotonic() + self.ttl, tenant_id, version)
+            self._entries.move_to_end((kind, row_id))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.invalidate_row("user", user_id)
+
+    def invalidate_row(self, kind: str, row_id: int) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._entries.pop((kind, row_id), None)
+
+    def invalidate_tenant(self, tenant_id: int) -> None:
+        """Evict the tenant and all its users (a scan; tenant-wide changes are rare)."""
+        with self._lock:
+            self.epoch += 1
+            self._entries.pop(("tenant", tenant_id), None)
+            stale = [key for key, (_, owner, _) in self._entries.items() if key[0] == "user" and owner == tenant_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+version_cache = VersionCache(
+    maxsize=settings.VERSION_CACHE_SIZE,
+    ttl=settings.VERSION_CACHE_TTL_SECONDS,
+)
+
+
+def cached_not_modified(request: Request, kind: str, row_id: int, tenant_id: int) -> Optional[Response]:
+    """A 304 straight from `version_cache` when the client's ETag is still current, else None.
+
+    `tenant_id` is the caller's scope: an entry cached for another tenant never matches.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    cached = version_cache.get(kind, row_id)
+    if cached is None or cached[0] != tenant_id:
+        return None
+    etag = version_etag(kind, row_id, cached[1])
+    return not_modified(etag) if etag_matches(header, etag) else None
+
+
+def versioned_response(request: Request, kind: str, row, tenant_id: int, epoch: int) -> Response:
+    """Serve a column row that ends in `version`: cache the version, tag it, 304 if unchanged.
+
+    `epoch` is `version_cache.epoch` from before the row was read.
+    """
+    content = row._asdict()
+    version = content.pop("version")
+    version_cache.set(kind, content["id"], tenant_id, version, epoch)
+    etag = version_etag(kind, content["id"], version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    return ORJSONResponse(content, headers={"ETag": etag})
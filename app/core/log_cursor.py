@@ -0,0 +1,70 @@
+# app/core/log_cursor.py
+"""Poll cursor for the append-only logs every worker tails (`revoked_tokens`, `principal_invalidations`).
+
+Ids are handed out when a row is inserted, not when its transaction commits,
+so on Postgres a poll can see id 12 while 11 is still uncommitted; a plain
+`id > last seen` cursor would then skip 11 for good. The cursor remembers
+the ids it jumped over and asks for them again on every poll, until they
+show up or are older than `gap_timeout` (their transaction rolled back, or
+the sequence skipped them).
+"""
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import or_
+
+# No transaction writing to the logs stays open this long
+GAP_TIMEOUT_SECONDS = 60.0
+# Ids remembered per jump; a bigger jump is a sequence skip, not open transactions
+MAX_GAPS = 1000
+# Ids below the newest one at startup that are read once more, in case they were still uncommitted
+START_LOOKBACK = 100
+
+
+class LogCursor:
+    """The last id seen, plus the lower ids not seen yet."""
+
+    def __init__(self, gap_timeout: float = GAP_TIMEOUT_SECONDS, max_gaps: int = MAX_GAPS):
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        self.last_seen_id: Optional[int] = None
+        # Missing id -> when it was first missed (monotonic)
+        self._gaps: Dict[int, float] = {}
+
+    def start(self, last_id: Optional[int]) -> None:
+        """Begin after `last_id`, the newest row at startup (None for an empty log).
+
+        The START_LOOKBACK ids below it are pending too; both logs can apply a row twice.
+        """
+        self.last_seen_id = last_id or 0
+        now = time.monotonic()
+        self._gaps = {
+            missing: now for missing in range(max(1, self.last_seen_id - START_LOOKBACK), self.last_seen_id)
+        }
+
+    def unseen(self, id_column):
+        """WHERE clause for the rows past the cursor and the gaps still pending."""
+        newer = id_column > self.last_seen_id
+        if not self._gaps:
+            return newer
+        return or_(newer, id_column.in_(sorted(self._gaps)))
+
+    def seen(self, row_id: int) -> None:
+        """Record a row returned by `unseen`; rows may come in any order."""
+        now = time.monotonic()
+        if row_id > self.last_seen_id:
+            for missing in range(max(self.last_seen_id + 1, row_id - self.max_gaps), row_id):
+                self._gaps[missing] = now
+            self.last_seen_id = row_id
+        else:
+            self._gaps.pop(row_id, None)
+
+    def expire_gaps(self) -> None:
+        """Stop asking for ids missed longer than `gap_timeout` ago; call once per poll."""
+        cutoff = time.monotonic() - self.gap_timeout
+        for missing in [missing for missing, since in self._gaps.items() if since < cutoff]:
+            del self._gaps[missing]
+
+    @property
+    def gaps(self) -> int:
+        return len(self._gaps)
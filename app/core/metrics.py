@@ -0,0 +1,136 @@
+# app/core/metrics.py
+"""Prometheus metrics for the API process.
+
+With `PROMETHEUS_MULTIPROC_DIR` set (before the app is imported), every
+uvicorn worker writes its samples to mmap'd files in that directory and
+`/metrics` aggregates all of them, so any worker can answer a scrape. Without
+it the default in-process registry is used.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+# Routes that did not match anything share one label so random URLs can't blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status code",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent in bcrypt per hashing job, excluding queueing",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled DB connection",
+    ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Checkouts that gave up after DB_POOL_TIMEOUT",
+    ["engine"],
+)
+RATE_LIMITED_REQUESTS = Counter(
+    "rate_limited_requests",
+    "Requests rejected with 429 by the rate limiter",
+    ["route_class"],
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and in-flight requests.
+
+    The route label is the matched path template (`/api/v1/users/{user_id}`),
+    read from the route the router leaves in the shared scope.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            REQUEST_DURATION.labels(method, route_template(scope), str(status_code)).observe(
+                time.perf_counter() - start
+            )
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return UNMATCHED_ROUTE
+    # Routes of an included router can report their path without the include
+    # prefix; recover it from the part of the request path the route didn't match
+    try:
+        matched = route.path_format.format(**scope.get("path_params", {}))
+    except (AttributeError, KeyError, IndexError, ValueError):
+        return path
+    request_path = scope["path"]
+    if request_path.endswith(matched):
+        return request_path[: len(request_path) - len(matched)] + path
+    return path
+
+
+def observe_pool_checkout(engine: str, waited: float, timed_out: bool) -> None:
+    DB_POOL_CHECKOUT_WAIT.labels(engine).observe(waited)
+    if timed_out:
+        DB_POOL_CHECKOUT_TIMEOUTS.labels(engine).inc()
+
+
+def render_metrics() -> bytes:
+    """Exposition text for a scrape, aggregated across workers in multiprocess mode."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_worker_dead() -> None:
+    """Drop this worker's live gauges from the shared directory on shutdown."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
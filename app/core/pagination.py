@@ -0,0 +1,40 @@
+# app/core/pagination.py
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+
+# Response header carrying the cursor for the page after the current one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict) -> str:
+    """Opaque keyset cursor: URL-safe base64 of the last row's sort key."""
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *keys: str) -> dict:
+    """Decode a cursor produced by `encode_cursor`, requiring integer `keys`."""
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise invalid
+    if not isinstance(position, dict):
+        raise invalid
+    for key in keys:
+        if not isinstance(position.get(key), int):
+            raise invalid
+    return position
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, position_of) -> Optional[str]:
+    """Attach the next-page cursor when the page came back full."""
+    if not rows or len(rows) < limit:
+        return None
+    cursor = encode_cursor(position_of(rows[-1]))
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
@@ -0,0 +1,153 @@
+# app/core/password_hash.py
+import re
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Tuple
+
+import bcrypt
+
+BCRYPT = "bcrypt"
+ARGON2ID = "argon2id"
+SCHEMES = (BCRYPT, ARGON2ID)
+
+# Calibration never goes below these, however slow the host
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 20
+MAX_ARGON2_TIME_COST = 20
+
+_ARGON2_PARAMS = re.compile(r"^\$argon2id\$v=\d+\$m=(\d+),t=(\d+),p=(\d+)\$")
+
+
+@lru_cache(maxsize=None)
+def _argon2_module():
+    """The argon2 module, imported the first time it is needed; None if it isn't installed."""
+    try:
+        import argon2
+    except ImportError:  # argon2-cffi is only needed for PASSWORD_HASH_SCHEME=argon2id
+        return None
+    return argon2
+
+
+def argon2_available() -> bool:
+    return _argon2_module() is not None
+
+
+def _truncate_password_to_72(password: str) -> str:
+    """Truncate a password to 72 bytes safely (UTF-8 aware).
+
+    Bcrypt has a 72-byte limit. We encode to UTF-8, truncate bytes, then decode
+    using 'ignore' to avoid breaking multibyte characters. This keeps behavior
+    deterministic between hash and verify.
+    """
+    if password is None:
+        raise ValueError("Password cannot be None")
+    pw_bytes = password.encode("utf-8")[:72]
+    return pw_bytes.decode("utf-8", errors="ignore")
+
+
+@dataclass(frozen=True)
+class HashPolicy:
+    """Scheme and cost parameters for new password hashes.
+
+    Frozen and picklable, so it can be handed to a process pool worker along
+    with the password.
+    """
+    scheme: str = BCRYPT
+    bcrypt_rounds: int = 12
+    argon2_time_cost: int = 2
+    argon2_memory_cost: int = 19456  # KiB
+    argon2_parallelism: int = 1
+
+    def __post_init__(self):
+        if self.scheme not in SCHEMES:
+            raise ValueError(f"Unknown password hash scheme: {self.scheme!r}")
+        if self.scheme == ARGON2ID and not argon2_available():
+            raise RuntimeError("PASSWORD_HASH_SCHEME=argon2id needs the argon2-cffi package")
+
+    def _argon2(self):
+        argon2 = _argon2_module()
+        return argon2.PasswordHasher(
+            time_cost=self.argon2_time_cost,
+            memory_cost=self.argon2_memory_cost,
+            parallelism=self.argon2_parallelism,
+            type=argon2.Type.ID,
+        )
+
+    def hash(self, password: str) -> str:
+        if self.scheme == ARGON2ID:
+            return self._argon2().hash(password)
+        pw = _truncate_password_to_72(password).encode("utf-8")
+        return bcrypt.hashpw(pw, bcrypt.gensalt(rounds=self.bcrypt_rounds)).decode("utf-8")
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if `hashed` was made with another scheme or other parameters."""
+        if self.scheme == ARGON2ID:
+            match = _ARGON2_PARAMS.match(hashed)
+            return match is None or tuple(map(int, match.groups())) != (
+                self.argon2_memory_cost, self.argon2_time_cost, self.argon2_parallelism
+            )
+        if not hashed.startswith("$2"):
+            return True
+        # $2b$12$<salt+digest>
+        return int(hashed.split("$")[2]) != self.bcrypt_rounds
+
+    def describe(self) -> str:
+        if self.scheme == ARGON2ID:
+            return (
+                f"argon2id time_cost={self.argon2_time_cost} "
+                f"memory_cost={self.argon2_memory_cost}KiB parallelism={self.argon2_parallelism}"
+            )
+        return f"bcrypt rounds={self.bcrypt_rounds}"
+
+
+def verify(password: str, hashed: str) -> bool:
+    """Check `password` against a bcrypt or argon2id hash, whatever the current policy."""
+    if not password or not hashed:
+        return False
+    if hashed.startswith("$argon2"):
+        argon2 = _argon2_module()
+        if argon2 is None:
+            raise RuntimeError("Verifying argon2 hashes needs the argon2-cffi package")
+        try:
+            return argon2.PasswordHasher().verify(hashed, password)
+        except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHashError):
+            return False
+    pw = _truncate_password_to_72(password).encode("utf-8")
+    return bcrypt.checkpw(pw, hashed.encode("utf-8"))
+
+
+def time_hash(policy: HashPolicy, target: float = float("inf"), samples: int = 3) -> float:
+    """Best of `samples` hash times in seconds; stops early once one is within `target`."""
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        policy.hash("calibration-password")
+        best = min(best, time.perf_counter() - start)
+        if best <= target:
+            break
+    return best
+
+
+def calibrate(target_ms: float, base: HashPolicy) -> Tuple[HashPolicy, float]:
+    """Strongest cost of `base.scheme` that hashes within `target_ms` on this host.
+
+    Raises bcrypt rounds (argon2id: time cost, at the configured memory and
+    parallelism) one step at a time and keeps the last one under target.
+    Returns the policy and its measured hash time in seconds. Timings are
+    taken on an idle core, so leave headroom for load.
+    """
+    target = target_ms / 1000
+    if base.scheme == ARGON2ID:
+        field, start, stop = "argon2_time_cost", 1, MAX_ARGON2_TIME_COST
+    else:
+        field, start, stop = "bcrypt_rounds", MIN_BCRYPT_ROUNDS, MAX_BCRYPT_ROUNDS
+    chosen = replace(base, **{field: start})
+    chosen_time = time_hash(chosen, target)
+    for cost in range(start + 1, stop + 1):
+        candidate = replace(base, **{field: cost})
+        elapsed = time_hash(candidate, target)
+        if elapsed > target:
+            break
+        chosen, chosen_time = candidate, elapsed
+    return chosen, chosen_time
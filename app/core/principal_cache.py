@@ -0,0 +1,345 @@
+# app/core/principal_cache.py
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import DEFAULT_SHARD
+from app.core.etags import version_cache
+from app.core.log_cursor import GAP_TIMEOUT_SECONDS, LogCursor
+from app.models.principal_invalidation import PrincipalInvalidation
+
+# Rows nothing reads any more are deleted on every this many log writes
+PRUNE_EVERY = 100
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Immutable, session-free copy of the authenticated user.
+
+    This is what `get_current_user` hands to routes. It carries everything
+    needed for authorization and tenant scoping, but not the password hash.
+    """
+    id: int
+    name: Optional[str]
+    email: str
+    tenant_id: int
+    role: str
+    is_superuser: bool
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            tenant_id=user.tenant_id,
+            role=user.role,
+            is_superuser=bool(user.is_superuser),
+            is_active=bool(user.is_active),
+        )
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "UserSnapshot":
+        """The user as an access token's authorization claims describe it (see `access_token_claims`)."""
+        return cls(
+            id=int(claims["uid"]),
+            name=claims.get("name"),
+            email=claims["sub"],
+            tenant_id=int(claims["tenant_id"]),
+            role=claims["role"],
+            is_superuser=bool(claims["is_superuser"]),
+            is_active=bool(claims["is_active"]),
+        )
+
+
+@dataclass(frozen=True)
+class Principal:
+    claims: dict
+    user: UserSnapshot
+
+
+class PrincipalCache:
+    """LRU + TTL cache of verified tokens -> (decoded claims, user snapshot).
+
+    Entries never outlive the token's own `exp`. Mutations evict by user id;
+    `epoch` is bumped on every eviction so a lookup that raced with one is
+    not written back with stale data.
+
+    Evictions also record when each user (or tenant) last changed, for
+    `claims_outdated`: an access token whose claims were issued before that
+    describes the user as they were, and must be refreshed. Marks are kept
+    for `claims_ttl`, the lifetime of an access token.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, claims_ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.claims_ttl = claims_ttl
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Rows this worker wrote to `principal_invalidations`, for PRUNE_EVERY
+        self.log_writes = 0
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        # ("user" | "tenant", id) -> wall time of its last change, oldest first
+        self._changed_at: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Cross-worker invalidation cursors, one per database (shard) polled
+        self._cursors: Dict[str, LogCursor] = {}
+        self._next_sync_at: Dict[str, float] = {}
+
+    def get(self, token: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= now:
+                self._remove(token, principal.user.id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def peek(self, token: str) -> Optional[Principal]:
+        """Like `get`, without touching LRU order or the hit/miss counters."""
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, token: str, principal: Principal, epoch: int) -> None:
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        exp = principal.claims.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, time.monotonic() + (float(exp) - time.time()))
+        with self._lock:
+            if epoch != self.epoch:
+                # An invalidation happened while this principal was being loaded
+                return
+            self._entries[token] = (expires_at, principal)
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(principal.user.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                old_token, (_, old) = self._entries.popitem(last=False)
+                self._discard_index(old_token, old.user.id)
+                self.evictions += 1
+
+    def claims_outdated(self, claims: dict) -> bool:
+        """Whether the token's user or tenant changed after the token was issued (`iat`)."""
+        issued_at = float(claims.get("iat", 0))
+        for key in (("user", int(claims["uid"])), ("tenant", int(claims["tenant_id"]))):
+            changed_at = self._changed_at.get(key)
+            if changed_at is not None and changed_at >= issued_at:
+                return True
+        return False
+
+    def invalidate_user(self, user_id: int, changed_at: Optional[float] = None) -> None:
+        with self._lock:
+            self.epoch += 1
+            self.invalidations += 1
+            self._mark_changed("user", user_id, changed_at)
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+
+    def invalidate_tenant(self, tenant_id: int, changed_at: Optional[float] = None) -> None:
+        """Evict every cached principal of one tenant (a scan; tenant-wide changes are rare)."""
+        with self._lock:
+            self.epoch += 1
+            self.invalidations += 1
+            self._mark_changed("tenant", tenant_id, changed_at)
+            stale = [
+                (token, principal.user.id)
+                for token, (_, principal) in self._entries.items()
+                if principal.user.tenant_id == tenant_id
+            ]
+            for token, user_id in stale:
+                self._remove(token, user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "changes_tracked": len(self._changed_at),
+            }
+
+    async def sync(self, db: AsyncSession, interval: float) -> None:
+        """Apply invalidations published by other workers, at most once per `interval`.
+
+        Each shard keeps its own log, written by the sessions that change its
+        users, and is polled through sessions on that shard.
+        """
+        shard = db.info.get("shard", DEFAULT_SHARD)
+        now = time.monotonic()
+        if now < self._next_sync_at.get(shard, 0.0):
+            return
+        self._next_sync_at[shard] = now + interval
+        cursor = self._cursors.get(shard)
+        if cursor is None:
+            cursor = LogCursor()
+            cursor.start(await db.scalar(select(func.max(PrincipalInvalidation.id))))
+            self._cursors[shard] = cursor
+            # First poll of this log: entries cached before now (say, for a tenant that has
+            # since moved here) may have missed what it holds, so start over
+            if self._entries:
+                self.clear()
+            version_cache.clear()
+            return
+        rows = (
+            await db.execute(
+                select(
+                    PrincipalInvalidation.id,
+                    PrincipalInvalidation.user_id,
+                    PrincipalInvalidation.tenant_id,
+                    PrincipalInvalidation.created_at,
+                    PrincipalInvalidation.versions_only,
+                )
+                .where(cursor.unseen(PrincipalInvalidation.id))
+                .order_by(PrincipalInvalidation.id)
+            )
+        ).all()
+        for row_id, user_id, tenant_id, created_at, versions_only in rows:
+            # When the change was made, not when it reached this worker, so tokens
+            # refreshed since then stay valid
+            changed_at = created_at.replace(tzinfo=timezone.utc).timestamp()
+            if versions_only:
+                version_cache.invalidate_row("tenant", tenant_id)
+            elif tenant_id is not None:
+                self.invalidate_tenant(tenant_id, changed_at)
+                version_cache.invalidate_tenant(tenant_id)
+            else:
+                self.invalidate_user(user_id, changed_at)
+                version_cache.invalidate_user(user_id)
+            cursor.seen(row_id)
+        cursor.expire_gaps()
+
+    def _mark_changed(self, kind: str, row_id: int, changed_at: Optional[float] = None) -> None:
+        now = time.time()
+        expired_before = now - self.claims_ttl
+        # A change this worker made is applied again when its log row comes back; keep the later time
+        changed_at = max(changed_at or now, self._changed_at.pop((kind, row_id), 0.0))
+        # Every token issued before an old change (say, a log row replayed late) has expired by now
+        if changed_at >= expired_before:
+            self._changed_at[(kind, row_id)] = changed_at
+        while self._changed_at and next(iter(self._changed_at.values())) < expired_before:
+            self._changed_at.popitem(last=False)
+
+    def _remove(self, token: str, user_id: int) -> None:
+        self._entries.pop(token, None)
+        self._discard_index(token, user_id)
+
+    def _discard_index(self, token: str, user_id: int) -> None:
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    claims_ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def invalidate_principal(db: AsyncSession, user_id: int) -> None:
+    """Evict a user's cached principals (and row version) once the current transaction commits.
+
+    Call this before `db.commit()` on any change to a user row. With
+    PRINCIPAL_CACHE_SYNC enabled the eviction is also written to
+    `principal_invalidations` in the same transaction for the other workers.
+    """
+    db.info.setdefault("invalidated_user_ids", set()).add(user_id)
+    if settings.PRINCIPAL_CACHE_SYNC:
+        _log(db, PrincipalInvalidation(user_id=user_id, created_at=datetime.utcnow()))
+
+
+def invalidate_tenant_principals(db: AsyncSession, tenant_id: int) -> None:
+    """Like `invalidate_principal`, for every user of a tenant at once."""
+    db.info.setdefault("invalidated_tenant_ids", set()).add(tenant_id)
+    if settings.PRINCIPAL_CACHE_SYNC:
+        _log(db, PrincipalInvalidation(tenant_id=tenant_id, created_at=datetime.utcnow()))
+
+
+def invalidate_tenant_version(db: AsyncSession, tenant_id: int) -> None:
+    """Evict only the tenant's cached row version, for changes no token claim carries (its name)."""
+    db.info.setdefault("versioned_tenant_ids", set()).add(tenant_id)
+    if settings.PRINCIPAL_CACHE_SYNC:
+        _log(db, PrincipalInvalidation(tenant_id=tenant_id, versions_only=True, created_at=datetime.utcnow()))
+
+
+def _log(db: AsyncSession, row: PrincipalInvalidation) -> None:
+    """Add a log row; every PRUNE_EVERY-th also has the commit delete the rows nothing reads any more."""
+    db.add(row)
+    principal_cache.log_writes += 1
+    if principal_cache.log_writes % PRUNE_EVERY == 0:
+        db.info["prune_principal_invalidations"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _prune_before_commit(session: Session) -> None:
+    """Delete rows older than both an access token's lifetime and a poll cursor's gap window.
+
+    Tokens issued before such a change have expired, and no cursor still
+    waits for them. The newest row is always kept so ids are never reused
+    under the workers' cursors.
+    """
+    if not session.info.pop("prune_principal_invalidations", False):
+        return
+    cutoff = datetime.utcnow() - timedelta(seconds=max(principal_cache.claims_ttl, GAP_TIMEOUT_SECONDS))
+    newest = select(func.max(PrincipalInvalidation.id)).scalar_subquery()
+    session.execute(
+        delete(PrincipalInvalidation).where(PrincipalInvalidation.created_at <= cutoff, PrincipalInvalidation.id < newest)
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session: Session) -> None:
+    for user_id in session.info.pop("invalidated_user_ids", ()):
+        principal_cache.invalidate_user(user_id)
+        version_cache.invalidate_user(user_id)
+    for tenant_id in session.info.pop("invalidated_tenant_ids", ()):
+        principal_cache.invalidate_tenant(tenant_id)
+        version_cache.invalidate_tenant(tenant_id)
+    for tenant_id in session.info.pop("versioned_tenant_ids", ()):
+        version_cache.invalidate_row("tenant", tenant_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("invalidated_user_ids", None)
+    session.info.pop("invalidated_tenant_ids", None)
+    session.info.pop("versioned_tenant_ids", None)
+    session.info.pop("prune_principal_invalidations", None)
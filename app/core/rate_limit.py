@@ -0,0 +1,212 @@
+# app/core/rate_limit.py
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request, Security, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import dialect_insert, engine
+from app.core.metrics import RATE_LIMITED_REQUESTS
+from app.core.principal_cache import principal_cache
+from app.core.security import decode_access_token, security
+from app.models.rate_limit_bucket import RateLimitBucket
+
+# Route classes; each has its own bucket per key
+AUTH = "auth"    # login/signup, keyed by client IP
+READ = "read"    # authenticated GET/HEAD, keyed by tenant
+WRITE = "write"  # authenticated POST/PUT/PATCH/DELETE, keyed by tenant
+BULK = "bulk"    # bulk import and export, keyed by tenant
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`burst` requests at once, refilled at `rate` requests per second."""
+    burst: float
+    rate: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "RateLimit":
+        """`"120/60"` -> bursts of 120, refilling 120 per 60 seconds."""
+        count, _, seconds = spec.partition("/")
+        return cls(burst=float(count), rate=float(count) / float(seconds or 1))
+
+    @property
+    def window(self) -> float:
+        """Seconds for an empty bucket to refill completely."""
+        return self.burst / self.rate
+
+
+def _refill(tokens: float, elapsed: float, limit: RateLimit) -> float:
+    return min(limit.burst, tokens + max(elapsed, 0.0) * limit.rate)
+
+
+class MemoryBucketStore:
+    """Token buckets in this process only; limits apply per worker.
+
+    Only used from the event loop thread. The least recently used buckets are
+    dropped beyond `max_keys`, which at worst hands an idle key a full bucket.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def take(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """Spend `cost` tokens; returns 0 if allowed, else seconds until it would be."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (limit.burst, now))
+        tokens = _refill(tokens, now - updated_at, limit)
+        allowed = tokens >= cost
+        self._buckets[key] = (tokens - cost if allowed else tokens, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0 if allowed else (cost - tokens) / limit.rate
+
+
+class DatabaseBucketStore:
+    """Token buckets in the `rate_limit_buckets` table, shared by every worker.
+
+    Each take is one conditional upsert: the refill and the spend happen in
+    SQL, and the update only applies when enough tokens are left, so
+    concurrent workers can't both spend the last token.
+    """
+
+    def __init__(self, bind: Engine, idle_after: float, prune_every: int = 1000):
+        self.bind = bind
+        self.idle_after = idle_after
+        self.prune_every = prune_every
+        self._takes = 0
+
+    def _take(self, key: str, limit: RateLimit, cost: float) -> float:
+        table = RateLimitBucket.__table__
+        now = time.time()
+        postgres = self.bind.dialect.name == "postgresql"
+        least, greatest = (func.least, func.greatest) if postgres else (func.min, func.max)
+        # Another thread or worker may have stamped the row a moment after our `now`;
+        # that is no elapsed time, and the stamp must not move back
+        elapsed = greatest(now - table.c.updated_at, 0.0)
+        refilled = least(limit.burst, table.c.tokens + elapsed * limit.rate)
+        stmt = dialect_insert(table).values(key=key, tokens=limit.burst - cost, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["key"],
+            set_={"tokens": refilled - cost, "updated_at": greatest(table.c.updated_at, now)},
+            where=refilled >= cost,
+        ).returning(table.c.tokens)
+        with self.bind.begin() as conn:
+            if conn.execute(stmt).first() is not None:
+                return 0.0
+            row = conn.execute(select(table.c.tokens, table.c.updated_at).where(table.c.key == key)).one()
+        retry_after = (cost - _refill(row.tokens, now - row.updated_at, limit)) / limit.rate
+        # The upsert refused; 0 would read as allowed if the row was refilled in between
+        return retry_after if retry_after > 0 else 1 / limit.rate
+
+    def _prune(self) -> None:
+        table = RateLimitBucket.__table__
+        with self.bind.begin() as conn:
+            conn.execute(delete(table).where(table.c.updated_at < time.time() - self.idle_after))
+
+    async def take(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        self._takes += 1
+        if self._takes % self.prune_every == 0:
+            await run_in_threadpool(self._prune)
+        return await run_in_threadpool(self._take, key, limit, cost)
+
+
+class RateLimiter:
+    """Per-route-class limits with optional per-tenant overrides, over a bucket store."""
+
+    def __init__(self, store, limits: Dict[str, RateLimit], tenant_overrides: Dict[int, Dict[str, RateLimit]]):
+        self.store = store
+        self.limits = limits
+        self.tenant_overrides = tenant_overrides
+
+    def limit_for(self, route_class: str, tenant_id: Optional[int] = None) -> RateLimit:
+        return self.tenant_overrides.get(tenant_id, {}).get(route_class) or self.limits[route_class]
+
+    async def check(self, route_class: str, key: str, tenant_id: Optional[int] = None) -> None:
+        retry_after = await self.store.take(f"{route_class}:{key}", self.limit_for(route_class, tenant_id))
+        if retry_after > 0:
+            RATE_LIMITED_REQUESTS.labels(route_class).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded, please retry later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+
+def _build_rate_limiter() -> RateLimiter:
+    limits = {
+        AUTH: RateLimit.parse(settings.RATE_LIMIT_AUTH),
+        READ: RateLimit.parse(settings.RATE_LIMIT_READ),
+        WRITE: RateLimit.parse(settings.RATE_LIMIT_WRITE),
+        BULK: RateLimit.parse(settings.RATE_LIMIT_BULK),
+    }
+    # {"<tenant_id>": {"read": "6000/60", ...}, ...}
+    tenant_overrides = {
+        int(tenant_id): {route_class: RateLimit.parse(spec) for route_class, spec in specs.items()}
+        for tenant_id, specs in json.loads(settings.RATE_LIMIT_TENANT_OVERRIDES or "{}").items()
+    }
+    if settings.RATE_LIMIT_BACKEND == "database":
+        windows = [limit.window for limit in limits.values()]
+        windows += [limit.window for specs in tenant_overrides.values() for limit in specs.values()]
+        store = DatabaseBucketStore(engine, idle_after=max(windows))
+    elif settings.RATE_LIMIT_BACKEND == "memory":
+        store = MemoryBucketStore()
+    else:
+        raise ValueError(f"Unknown rate limit backend: {settings.RATE_LIMIT_BACKEND!r}")
+    return RateLimiter(store, limits, tenant_overrides)
+
+
+rate_limiter = _build_rate_limiter()
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def route_class(request: Request) -> str:
+    route = request.scope.get("route")
+    if getattr(route, "path", "").endswith(("/bulk", "/export")):
+        return BULK
+    return READ if request.method in ("GET", "HEAD") else WRITE
+
+
+async def limit_by_ip(request: Request) -> None:
+    """Dependency for unauthenticated auth routes: runs before any bcrypt work."""
+    if settings.RATE_LIMIT_ENABLED:
+        await rate_limiter.check(AUTH, f"ip:{client_ip(request)}")
+
+
+async def limit_by_tenant(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Security(security),
+) -> None:
+    """Dependency for authenticated routes, keyed by the token's tenant and the route class.
+
+    Runs before the user is loaded, so a limited tenant costs no DB session.
+    Tokens that don't verify are left for `get_current_user` to reject.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    token = credentials.credentials
+    cached = principal_cache.peek(token)
+    if cached is not None:
+        tenant_id = cached.user.tenant_id
+    else:
+        try:
+            tenant_id = int(decode_access_token(token)["tenant_id"])
+        except (HTTPException, KeyError, TypeError, ValueError):
+            return
+    await rate_limiter.check(route_class(request), f"tenant:{tenant_id}", tenant_id)
@@ -0,0 +1,32 @@
+# app/core/responses.py
+from typing import Iterable, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON encoded by orjson, for content that is already plain data.
+
+    Returning a response skips FastAPI's `response_model` validation, so this
+    is for rows and snapshots whose shape is fixed by the query (see
+    `schema_columns`), not for arbitrary objects.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def schema_columns(schema: Type[BaseModel], model) -> tuple:
+    """The `model` columns named by `schema`'s fields, for a column-only select.
+
+    Rows from such a select already have the response's shape, so they can be
+    serialized without loading ORM objects or building schema instances.
+    """
+    return tuple(getattr(model, name) for name in schema.model_fields)
+
+
+def rows_response(rows: Iterable) -> ORJSONResponse:
+    """A JSON array with one object per result row."""
+    return ORJSONResponse([row._asdict() for row in rows])
@@ -0,0 +1,167 @@
+# app/core/revocation.py
+import asyncio
+import contextvars
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import DEFAULT_SHARD, shard_map
+from app.core.log_cursor import LogCursor
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger("uvicorn.error")
+
+# Expired rows are deleted on every this many revocations
+PRUNE_EVERY = 100
+
+
+def _timestamp(value: datetime) -> float:
+    # Stored naive in UTC, like every other DateTime column here
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    """Revoked token ids (`jti`) held in memory, so checking a token is a dict lookup.
+
+    An id is only kept until its token's `exp`; after that the token is
+    refused anyway. Revocations are written to the append-only
+    `revoked_tokens` table, and a background task in each worker polls it
+    every `interval` seconds for rows it hasn't seen (see `LogCursor`), so a
+    logout on one worker reaches the others without a query per request.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.polls = 0
+        self.revocations = 0
+        self._expires_at: Dict[str, float] = {}
+        self._by_expiry: List[Tuple[float, str]] = []
+        self._cursor = LogCursor()
+        self._task: Optional[asyncio.Task] = None
+        self._loaded: Optional[asyncio.Event] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def __contains__(self, jti: Optional[str]) -> bool:
+        return jti in self._expires_at
+
+    def __len__(self) -> int:
+        return len(self._expires_at)
+
+    def add(self, jti: str, expires_at: float) -> None:
+        if expires_at <= time.time() or jti in self._expires_at:
+            return
+        self._expires_at[jti] = expires_at
+        heapq.heappush(self._by_expiry, (expires_at, jti))
+
+    def prune(self) -> None:
+        """Forget ids whose tokens have expired."""
+        now = time.time()
+        while self._by_expiry and self._by_expiry[0][0] <= now:
+            _, jti = heapq.heappop(self._by_expiry)
+            self._expires_at.pop(jti, None)
+
+    async def poll(self) -> None:
+        """Read revocations added since the last poll (all unexpired ones on the first)."""
+        query = select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+        first = self._cursor.last_seen_id is None
+        if first:
+            query = query.where(RevokedToken.expires_at > datetime.utcnow())
+        else:
+            query = query.where(self._cursor.unseen(RevokedToken.id))
+        db = shard_map.session(DEFAULT_SHARD)
+        try:
+            if first:
+                # Later polls start after the newest row, even if it has expired
+                self._cursor.start(await db.scalar(select(func.max(RevokedToken.id))))
+            rows = (await db.execute(query.order_by(RevokedToken.id))).all()
+        finally:
+            await db.close()
+        for row_id, jti, expires_at in rows:
+            self.add(jti, _timestamp(expires_at))
+            if not first:
+                self._cursor.seen(row_id)
+        self._cursor.expire_gaps()
+        self.prune()
+        self.polls += 1
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Could not poll revoked tokens")
+            self._loaded.set()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def ready(self) -> None:
+        """Start the poller in this worker if needed and wait for its first read.
+
+        Called on every authenticated request; after the first one it returns
+        without waiting. The task runs in an empty context so its queries are
+        not counted against the request that happened to start it.
+        """
+        if self._task is None or self._task.done():
+            self._loaded = asyncio.Event()
+            self._stopping = asyncio.Event()
+            self._task = contextvars.Context().run(asyncio.create_task, self._run())
+        if not self._loaded.is_set():
+            await self._loaded.wait()
+
+    async def stop(self) -> None:
+        """Stop the poller, letting a poll in progress finish."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._expires_at),
+            "revocations": self.revocations,
+            "polls": self.polls,
+            "pending_ids": self._cursor.gaps,
+            "interval_seconds": self.interval,
+        }
+
+
+revocation_list = RevocationList(interval=settings.TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS)
+
+
+async def revoke_token(db: AsyncSession, jti: str, exp: float) -> None:
+    """Revoke the token with id `jti` (expiring at `exp`) once `db` commits.
+
+    `db` must be a session on the default database. Every PRUNE_EVERY-th
+    revocation also deletes rows whose tokens have expired, always keeping
+    the newest row so ids are never reused under the workers' poll cursors.
+    """
+    expires_at = datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+    db.add(RevokedToken(jti=jti, expires_at=expires_at))
+    db.info.setdefault("revoked_tokens", []).append((jti, exp))
+    revocation_list.revocations += 1
+    if revocation_list.revocations % PRUNE_EVERY == 0:
+        await db.flush()
+        newest = select(func.max(RevokedToken.id)).scalar_subquery()
+        await db.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow(), RevokedToken.id < newest)
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _revoke_after_commit(session: Session) -> None:
+    for jti, exp in session.info.pop("revoked_tokens", ()):
+        revocation_list.add(jti, exp)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop("revoked_tokens", None)
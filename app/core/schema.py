@@ -0,0 +1,100 @@
+# app/core/schema.py
+"""Schema handling at worker startup.
+
+`create_all` inspects every table on every database, and with several uvicorn
+workers they all run it at once. A database migrated (or created and stamped)
+to the current Alembic revision only needs one `SELECT version_num` to confirm
+it, which is what SCHEMA_STARTUP=check does and what "auto" tries first.
+"""
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import Column, MetaData, String, Table, exc, inspect, select
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.database import Base, shard_map
+# Every model must be registered with Base.metadata before create_all, or the stamp would lie
+import app.models.user  # noqa: F401
+import app.models.tenant  # noqa: F401
+import app.models.principal_invalidation  # noqa: F401
+import app.models.system_state  # noqa: F401
+import app.models.tenant_stats  # noqa: F401
+import app.models.rate_limit_bucket  # noqa: F401
+import app.models.tenant_purge  # noqa: F401
+import app.models.tenant_shard  # noqa: F401
+import app.models.revoked_token  # noqa: F401
+import app.models.refresh_token  # noqa: F401
+import app.models.user_email  # noqa: F401
+
+logger = logging.getLogger("uvicorn.error")
+
+# The Alembic head the models match; bump with every new revision
+SCHEMA_VERSION = "e1a3c5d80012"
+
+MODES = ("auto", "check", "create_all", "none")
+
+# Alembic's own bookkeeping table, kept out of Base.metadata so create_all leaves it alone
+_alembic_version = Table(
+    "alembic_version", MetaData(), Column("version_num", String(32), primary_key=True)
+)
+
+
+def schema_version(bind: Engine) -> Optional[str]:
+    """The revision the database is stamped with, or None if it was never stamped."""
+    with bind.connect() as conn:
+        try:
+            return conn.scalar(select(_alembic_version.c.version_num))
+        except exc.DBAPIError:
+            # No alembic_version table
+            return None
+
+
+def check_schema() -> Dict[str, Optional[str]]:
+    """The stamped revision of every database that is not at SCHEMA_VERSION."""
+    versions = {shard: schema_version(shard_map.engine(shard)) for shard in shard_map.names()}
+    return {shard: version for shard, version in versions.items() if version != SCHEMA_VERSION}
+
+
+def create_schema(bind: Engine) -> None:
+    """`create_all`, stamping SCHEMA_VERSION if the database was empty, so the next start can skip it.
+
+    A database that already had tables but no stamp may predate columns that
+    create_all doesn't add; it stays unstamped until `alembic stamp`/`upgrade`.
+    """
+    with bind.begin() as conn:
+        empty = not inspect(conn).get_table_names()
+        Base.metadata.create_all(conn)
+        if empty:
+            _alembic_version.create(conn)
+            conn.execute(_alembic_version.insert().values(version_num=SCHEMA_VERSION))
+
+
+def prepare_schema(mode: str = settings.SCHEMA_STARTUP) -> None:
+    """Apply SCHEMA_STARTUP on the default database and every DATABASE_SHARDS shard."""
+    if mode not in MODES:
+        raise ValueError(f"SCHEMA_STARTUP must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == "none":
+        return
+    if mode == "auto" and not (settings.CREATE_TABLES or settings.DATABASE_URL.startswith("sqlite")):
+        logger.info("Skipping automatic table creation on startup")
+        return
+
+    if mode == "create_all":
+        behind = dict.fromkeys(shard_map.names())
+    else:
+        behind = check_schema()
+    if mode == "check":
+        if behind:
+            raise RuntimeError(
+                f"Database schema is not at revision {SCHEMA_VERSION}: {behind}; run `alembic upgrade head`"
+            )
+        return
+    for shard, version in behind.items():
+        if version is not None and mode == "auto":
+            logger.warning(
+                "Shard %s is at revision %s, not %s; creating missing tables, run `alembic upgrade head`",
+                shard, version, SCHEMA_VERSION,
+            )
+        logger.info("Creating database tables on shard %s (create_all)", shard)
+        create_schema(shard_map.engine(shard))
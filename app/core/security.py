@@ -1,46 +1,182 @@
 # app/core/security.py
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, List, Optional, Tuple
 
-import bcrypt
-from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import password_hash
 from app.core.config import settings
-from app.models.user import User
-from app.core.database import get_db
+from app.core.metrics import PASSWORD_HASH_DURATION
+from app.core.password_hash import HashPolicy
+from app.core.principal_cache import Principal, UserSnapshot, principal_cache
+from app.core.revocation import revocation_list
+from app.core.signing_keys import key_set
+from app.core.database import get_session
+from app.services.repository import get_active_user_by_email
 
 # Use HTTP Bearer for token extraction
 security = HTTPBearer()
 
 
-def _truncate_password_to_72(password: str) -> str:
-    """Truncate a password to 72 bytes safely (UTF-8 aware).
+hash_policy = HashPolicy(
+    scheme=settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds=settings.BCRYPT_ROUNDS,
+    argon2_time_cost=settings.ARGON2_TIME_COST,
+    argon2_memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+    argon2_parallelism=settings.ARGON2_PARALLELISM,
+)
 
-    Bcrypt has a 72-byte limit. We encode to UTF-8, truncate bytes, then decode
-    using 'ignore' to avoid breaking multibyte characters. This keeps behavior
-    deterministic between hash and verify.
-    """
-    if password is None:
-        raise ValueError("Password cannot be None")
-    pw_bytes = password.encode("utf-8")[:72]
-    return pw_bytes.decode("utf-8", errors="ignore")
+
+def set_hash_policy(policy: HashPolicy) -> None:
+    """Replace the policy for new hashes, e.g. with the result of `calibrate`."""
+    global hash_policy
+    hash_policy = policy
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    if not plain_password or not hashed_password:
-        return False
-    plain_trunc = _truncate_password_to_72(plain_password).encode("utf-8")
-    hp = hashed_password.encode("utf-8") if isinstance(hashed_password, str) else hashed_password
-    return bcrypt.checkpw(plain_trunc, hp)
+    return password_hash.verify(plain_password, hashed_password)
+
+
+def get_password_hash(password: str, policy: Optional[HashPolicy] = None) -> str:
+    return (policy or hash_policy).hash(password)
+
+
+def verify_and_update(
+    plain_password: str, hashed_password: str, policy: Optional[HashPolicy] = None
+) -> Tuple[bool, Optional[str]]:
+    """Verify a password; if its hash doesn't match `policy`, also return a fresh hash to store."""
+    policy = policy or hash_policy
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    return True, policy.hash(plain_password) if policy.needs_rehash(hashed_password) else None
+
+
+def _timed(fn: Callable[..., Any], *args: Any):
+    # Runs inside the worker so the measurement excludes time spent queued
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+class HashingPool:
+    """Bounded executor for password hashing.
+
+    bcrypt is deliberately slow (~250ms), so calling it from an `async def`
+    route stalls every other request on the worker. Jobs are submitted to a
+    thread or process pool instead, and once `max_queue` jobs are running or
+    waiting new ones are rejected with a 503 rather than piling up.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 0, max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing executor: {kind!r}")
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # Only touched from the event loop thread, so a plain counter is enough
+        if self.pending >= self.max_queue:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            elapsed, result = await loop.run_in_executor(self._get_executor(), _timed, fn, *args)
+            PASSWORD_HASH_DURATION.labels(fn.__name__).observe(elapsed)
+            return result
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
+
+
+# Separate pool for bulk imports; each job hashes a whole chunk of passwords.
+# The queue allows roughly two imports in flight before new ones get a 503.
+bulk_hashing_pool = HashingPool(
+    kind=settings.BULK_HASH_EXECUTOR,
+    max_workers=settings.BULK_HASH_WORKERS,
+    max_queue=2 * (settings.BULK_HASH_WORKERS or os.cpu_count() or 1),
+)
+
 
+def hash_passwords(passwords: List[str], policy: HashPolicy) -> List[str]:
+    return [policy.hash(password) for password in passwords]
 
-def get_password_hash(password: str) -> str:
-    pw = _truncate_password_to_72(password).encode("utf-8")
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(pw, salt).decode("utf-8")
+
+async def hash_passwords_parallel(passwords: List[str]) -> List[str]:
+    """Hash many passwords at once, split evenly across the bulk pool's workers."""
+    if not passwords:
+        return []
+    workers = bulk_hashing_pool.max_workers
+    size = -(-len(passwords) // workers)
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    hashed = await asyncio.gather(*(bulk_hashing_pool.run(hash_passwords, chunk, hash_policy) for chunk in chunks))
+    return [h for chunk in hashed for h in chunk]
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await hashing_pool.run(verify_and_update, plain_password, hashed_password, hash_policy)
+
+
+# The policy is passed along explicitly: process pool workers don't see set_hash_policy
+async def get_password_hash_async(password: str) -> str:
+    return await hashing_pool.run(get_password_hash, password, hash_policy)
+
+
+def access_token_claims(user, session_id: Optional[str] = None) -> dict:
+    """Everything `get_current_user` needs to authorize the user without a DB lookup.
+
+    `session_id` is the refresh token family the token was issued from; logout revokes it.
+    """
+    claims = {
+        "sub": user.email,
+        "tenant_id": user.tenant_id,
+        "uid": user.id,
+        "name": user.name,
+        "role": user.role,
+        "is_superuser": bool(user.is_superuser),
+        "is_active": bool(user.is_active),
+    }
+    if session_id is not None:
+        claims["sid"] = session_id
+    return claims
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -48,15 +184,35 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        # Default to minutes configured in settings (fallback to 24h)
-        minutes = getattr(settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 1440)
-        expire = datetime.utcnow() + timedelta(minutes=minutes)
-    to_encode.update({"exp": expire})
+        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    # `jti` names the token for POST /auth/logout and the revocation list. `iat` keeps
+    # sub-second precision, to compare with the principal cache's change marks.
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
+    # Imported on first use: jose and its crypto backend are a large part of the app's import time
+    from jose import jwt
+
+    if key_set:
+        signing_key = key_set.signing_key
+        return jwt.encode(
+            to_encode, signing_key.key, algorithm=signing_key.algorithm, headers={"kid": signing_key.kid}
+        )
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
 def decode_access_token(token: str) -> dict:
+    """Verify a token and return its claims, or raise 401.
+
+    With a key set, the token's `kid` header picks the already parsed key,
+    and only that key's algorithm is accepted.
+    """
+    from jose import JWTError, jwt
+
     try:
+        if key_set:
+            verifying_key = key_set.get(jwt.get_unverified_header(token).get("kid"))
+            if verifying_key is None:
+                raise JWTError("Unknown signing key")
+            return jwt.decode(token, verifying_key.verify_key, algorithms=[verifying_key.algorithm])
         return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
@@ -64,13 +220,21 @@ def decode_access_token(token: str) -> dict:
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Security(security),
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_session),
+) -> UserSnapshot:
     """Dependency that returns the current user and enforces tenant binding.
 
-    The JWT must contain `sub` (email) and `tenant_id`. We verify the token,
-    fetch the user from DB, and ensure the `tenant_id` in the token matches the
-    user's tenant_id to prevent cross-tenant token reuse.
+    The JWT must contain `sub` (email) and `tenant_id`. Tokens issued with
+    `access_token_claims` also carry the user's id, role and flags, and are
+    authorized from those alone, without touching the DB; one issued before
+    its user or tenant last changed is refused so the client refreshes it.
+    Older tokens without them are checked against the user in the DB, whose
+    `tenant_id` must match the token's to prevent cross-tenant token reuse.
+
+    Verified tokens are kept in `principal_cache`, so repeat requests with the
+    same token skip the JWT decode too. The returned snapshot is detached from
+    the session and read-only. Tokens revoked by `POST /auth/logout` are
+    refused by an in-memory lookup of their `jti`.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -79,18 +243,43 @@ async def get_current_user(
     )
 
     token = credentials.credentials
+    await revocation_list.ready()
+    if settings.PRINCIPAL_CACHE_SYNC:
+        await principal_cache.sync(db, settings.PRINCIPAL_CACHE_SYNC_INTERVAL_SECONDS)
+    cached = principal_cache.get(token)
+    if cached is not None:
+        if cached.claims.get("jti") in revocation_list:
+            raise credentials_exception
+        return cached.user
+
+    epoch = principal_cache.epoch
     try:
         payload = decode_access_token(token)
         email: Optional[str] = payload.get("sub")
         token_tenant_id: Optional[int] = payload.get("tenant_id")
-        if email is None or token_tenant_id is None:
+        if email is None or token_tenant_id is None or payload.get("jti") in revocation_list:
             raise credentials_exception
     except HTTPException:
         raise
     except Exception:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    if "uid" in payload:
+        try:
+            outdated = principal_cache.claims_outdated(payload)
+            snapshot = UserSnapshot.from_claims(payload)
+        except (KeyError, TypeError, ValueError):
+            raise credentials_exception
+        if outdated:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token is outdated, refresh it",
+                headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+            )
+        principal_cache.set(token, Principal(claims=payload, user=snapshot), epoch)
+        return snapshot
+
+    user = await get_active_user_by_email(db, email)
     if user is None:
         raise credentials_exception
 
@@ -98,16 +287,18 @@ async def get_current_user(
         # Token's tenant_id doesn't match the user's tenant -> invalid
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid tenant for token")
 
-    return user
+    snapshot = UserSnapshot.from_user(user)
+    principal_cache.set(token, Principal(claims=payload, user=snapshot), epoch)
+    return snapshot
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
-async def get_current_active_superuser(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_superuser(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,58 @@
+# app/core/server_timing.py
+import time
+from typing import Dict
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.database import track_queries
+
+SERVER_TIMING_HEADER = "Server-Timing"
+
+
+class ServerTimingMiddleware:
+    """Adds `Server-Timing: db;dur=..;desc="N queries", app;dur=..` to every response.
+
+    `db` is the time spent in SQL statements issued for the request and `app`
+    the time until the response started. Statements run after that (streamed
+    bodies, dependency teardown) are not included.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        with track_queries(f"{scope['method']} {scope['path']}") as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        SERVER_TIMING_HEADER,
+                        f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries", '
+                        f"app;dur={(time.perf_counter() - start) * 1000:.2f}",
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def parse_server_timing(value: str) -> Dict[str, dict]:
+    """`'db;dur=1.5;desc="2 queries", app;dur=3'` -> `{"db": {"dur": 1.5, "desc": "2 queries"}, ...}`"""
+    metrics = {}
+    for entry in value.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        metric = {}
+        for param in params:
+            key, _, raw = param.partition("=")
+            metric[key] = float(raw) if key == "dur" else raw.strip('"')
+        metrics[name] = metric
+    return metrics
+
+
+def query_count(value: str) -> int:
+    """Number of queries reported in a Server-Timing header value."""
+    return int(parse_server_timing(value)["db"]["desc"].split()[0])
@@ -0,0 +1,100 @@
+# app/core/signing_keys.py
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+import orjson
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from jose.backends.base import Key
+
+# Signature algorithm for each elliptic curve, by key size
+_EC_ALGORITHMS = {256: "ES256", 384: "ES384", 521: "ES512"}
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """One key of the set, parsed once; `key` can sign only if the PEM held the private key."""
+
+    kid: str
+    algorithm: str
+    key: "Key"
+    verify_key: "Key"
+    can_sign: bool
+    public_jwk: dict
+
+
+def _algorithm(public_key) -> str:
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and public_key.curve.key_size in _EC_ALGORITHMS:
+        return _EC_ALGORITHMS[public_key.curve.key_size]
+    raise ValueError(f"Unsupported signing key type: {type(public_key).__name__}")
+
+
+def load_key(kid: str, pem: bytes) -> SigningKey:
+    """Parse a PEM private or public key; the algorithm follows from the key type."""
+    # Only needed with JWT_KEYS_DIR, so kept out of the app's import time
+    from cryptography.hazmat.primitives import serialization
+    from jose import jwk
+
+    try:
+        public_key = serialization.load_pem_private_key(pem, password=None).public_key()
+        can_sign = True
+    except ValueError:
+        public_key = serialization.load_pem_public_key(pem)
+        can_sign = False
+    algorithm = _algorithm(public_key)
+    key = jwk.construct(pem, algorithm)
+    verify_key = key.public_key() if can_sign else key
+    public_jwk = {**verify_key.to_dict(), "kid": kid, "use": "sig"}
+    return SigningKey(
+        kid=kid, algorithm=algorithm, key=key, verify_key=verify_key, can_sign=can_sign, public_jwk=public_jwk
+    )
+
+
+class KeySet:
+    """The asymmetric keys access tokens are signed and verified with, by `kid`.
+
+    Every `<kid>.pem` in the keys directory is loaded and parsed once, so
+    verifying a token is a dict lookup plus the signature check. Tokens are
+    signed with `signing_kid`; the other keys stay valid for verification, and
+    all public halves are published at `/.well-known/jwks.json` for other
+    services to verify tokens without calling this one.
+    """
+
+    def __init__(self, keys: Dict[str, SigningKey], signing_kid: str = ""):
+        self.keys = keys
+        if not signing_kid:
+            # With a single private key there is nothing to choose
+            private = [kid for kid, key in keys.items() if key.can_sign]
+            signing_kid = private[0] if len(private) == 1 else ""
+        self.signing_key: Optional[SigningKey] = keys.get(signing_kid)
+        if keys and (self.signing_key is None or not self.signing_key.can_sign):
+            raise ValueError(f"JWT_SIGNING_KID must name a private key in the key set, got {signing_kid!r}")
+        # Rendered once; the set only changes on restart
+        self.jwks = orjson.dumps({"keys": [key.public_jwk for key in keys.values()]})
+
+    @classmethod
+    def from_directory(cls, directory: str, signing_kid: str = "") -> "KeySet":
+        keys = {}
+        if directory:
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".pem"):
+                    with open(os.path.join(directory, name), "rb") as f:
+                        keys[name[:-4]] = load_key(name[:-4], f.read())
+        return cls(keys, signing_kid)
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def get(self, kid: Optional[str]) -> Optional[SigningKey]:
+        return self.keys.get(kid) if kid is not None else None
+
+
+# Empty unless JWT_KEYS_DIR is set; without keys tokens are signed with SECRET_KEY/ALGORITHM
+key_set = KeySet.from_directory(settings.JWT_KEYS_DIR, settings.JWT_SIGNING_KID)
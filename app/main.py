@@ -1,11 +1,23 @@
 # app/main.py
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.api.v1 import auth, user, tenant
-from app.core.database import engine, Base
-import os
+from app.core.database import all_pool_status, dispose_async_engine
+from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, mark_worker_dead, render_metrics
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.etags import version_cache, with_etag
+from app.core.principal_cache import principal_cache
+from app.core.revocation import revocation_list
+from app.core.schema import prepare_schema
+from app.core.signing_keys import key_set
+from app.core.server_timing import SERVER_TIMING_HEADER, ServerTimingMiddleware
+from app.core.password_hash import calibrate
+from app.core.security import (
+    bulk_hashing_pool, get_current_active_superuser, hash_policy, hashing_pool, set_hash_policy
+)
+from app.services.tenant_purge import cancel_purges, resume_purges
 import logging
 
 # Create FastAPI app
@@ -24,8 +36,16 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, SERVER_TIMING_HEADER, "ETag"],
     )
 
+if settings.SQL_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
+# Outermost, so the timing covers CORS and every other middleware too
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(user.router, prefix=settings.API_V1_STR)
@@ -36,21 +56,87 @@ async def root():
     return {"message": "Welcome to the Multi-Tenant API"}
 
 
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks(request: Request):
+    """Public keys for verifying access tokens by their `kid`; empty while tokens use SECRET_KEY."""
+    response = Response(
+        key_set.jwks,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}"},
+    )
+    return with_etag(request, response)
+
+
+@app.get("/cache-stats", dependencies=[Depends(get_current_active_superuser)])
+async def cache_stats():
+    """Hit/miss counters for the verified-principal and row-version caches, and the revocation list size (superuser only)."""
+    return {
+        "principal_cache": principal_cache.stats(),
+        "version_cache": version_cache.stats(),
+        "revocation_list": revocation_list.stats(),
+    }
+
+
+@app.get("/pool-stats", dependencies=[Depends(get_current_active_superuser)])
+async def pool_stats():
+    """Connection pool usage and checkout wait times for each engine (superuser only)."""
+    return all_pool_status()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.on_event("startup")
 def create_tables_on_startup():
-    """Create DB tables on startup for local development or when explicitly requested.
+    """Create or check DB tables on startup, per SCHEMA_STARTUP (see app/core/schema.py).
 
-    Behavior:
-    - If `CREATE_TABLES=true` in env or `.env`, always run `Base.metadata.create_all`.
-    - If using SQLite (DEV), create tables automatically.
+    Behavior ("auto", the default):
+    - If `CREATE_TABLES=true` in env or `.env`, or using SQLite (DEV), create tables,
+      unless the database is already stamped with the current Alembic revision.
+    Either way on the default database and on every DATABASE_SHARDS shard.
+    With "check" a database that is not at that revision stops the worker from starting.
     """
+    if settings.SCHEMA_STARTUP == "check":
+        prepare_schema()
+        return
     try:
-        create_flag = os.getenv("CREATE_TABLES", "false").lower() == "true"
-        if create_flag or settings.DATABASE_URL.startswith("sqlite"):
-            logging.getLogger("uvicorn").info("Creating database tables (create_all)")
-            Base.metadata.create_all(bind=engine)
-        else:
-            logging.getLogger("uvicorn").info("Skipping automatic table creation on startup")
+        prepare_schema()
     except Exception as e:
         logging.getLogger("uvicorn.error").exception("Error creating tables on startup: %s", e)
 
+
+@app.on_event("startup")
+def calibrate_password_hash():
+    """With PASSWORD_HASH_TARGET_MS set, fit the hash cost to this host before serving."""
+    if settings.PASSWORD_HASH_TARGET_MS > 0:
+        policy, elapsed = calibrate(settings.PASSWORD_HASH_TARGET_MS, hash_policy)
+        set_hash_policy(policy)
+        logging.getLogger("uvicorn").info(
+            "Password hashing calibrated to %s (%.0fms, target %.0fms)",
+            policy.describe(), elapsed * 1000, settings.PASSWORD_HASH_TARGET_MS,
+        )
+
+
+@app.on_event("startup")
+async def resume_tenant_purges():
+    """Continue tenant purges that were pending or cut off by a previous shutdown."""
+    try:
+        await resume_purges()
+    except Exception as e:
+        logging.getLogger("uvicorn.error").exception("Error resuming tenant purges: %s", e)
+
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    """Release password hashing workers, background tasks and async DB connections."""
+    mark_worker_dead()
+    cancel_purges()
+    await revocation_list.stop()
+    hashing_pool.shutdown()
+    bulk_hashing_pool.shutdown()
+    await dispose_async_engine()
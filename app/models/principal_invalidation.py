@@ -0,0 +1,22 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, false, func
+from app.core.database import Base
+
+
+class PrincipalInvalidation(Base):
+    """Append-only log of users whose cached principals must be dropped.
+
+    Each worker polls the rows it hasn't seen (`LogCursor`), so a change made on
+    one worker evicts the cached user everywhere else too. A row with
+    `tenant_id` set instead evicts every user of that tenant, or with
+    `versions_only` just the tenant's cached row version (a rename).
+    """
+    __tablename__ = "principal_invalidations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True)
+    tenant_id = Column(Integer, nullable=True)
+    versions_only = Column(Boolean, nullable=False, default=False, server_default=false())
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<PrincipalInvalidation user_id={self.user_id} tenant_id={self.tenant_id}>"
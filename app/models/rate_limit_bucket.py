@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Float, String
+from app.core.database import Base
+
+
+class RateLimitBucket(Base):
+    """Token bucket state shared by all workers when RATE_LIMIT_BACKEND=database.
+
+    `updated_at` is wall-clock epoch seconds so every process computes the
+    same refill; a row idle for longer than its refill window is equivalent
+    to no row and can be deleted.
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RateLimitBucket {self.key} tokens={self.tokens:.2f}>"
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+from app.core.database import Base
+
+
+class RefreshToken(Base):
+    """A refresh token, stored as the SHA-256 of its value.
+
+    Lives on the default database only. Every refresh marks the row `used_at`
+    and issues a new one in the same `family_id`; presenting a used token
+    again means it was copied, and revokes the whole family. Rows are only
+    needed until `expires_at` and are pruned after.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), nullable=False, unique=True, index=True)
+    family_id = Column(String(32), nullable=False, index=True)
+    # No foreign key: the user may live on a shard
+    user_id = Column(Integer, nullable=False)
+    tenant_id = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<RefreshToken family={self.family_id} user_id={self.user_id}>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Integer, String, func
+from app.core.database import Base
+
+
+class RevokedToken(Base):
+    """Append-only log of revoked access tokens, by their `jti` claim.
+
+    Lives on the default database only. Every worker polls the rows it hasn't
+    seen (`LogCursor`) into its in-memory revocation list. A row is only needed
+    until `expires_at`, the token's own `exp`; older rows are pruned.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<RevokedToken jti={self.jti}>"
@@ -0,0 +1,31 @@
+from sqlalchemy import Boolean, Column, Integer, event, exists, false
+from app.core.database import Base, insert_or_ignore
+from app.models.user import User
+
+SYSTEM_STATE_ID = 1
+
+
+class SystemState(Base):
+    """Single-row table of instance-wide flags.
+
+    `bootstrapped` flips to true when the first account (the admin) is
+    created, so signup decides first-admin with one indexed row update instead
+    of counting the users table.
+    """
+    __tablename__ = "system_state"
+
+    id = Column(Integer, primary_key=True)
+    bootstrapped = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    def __repr__(self):
+        return f"<SystemState bootstrapped={self.bootstrapped}>"
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _seed_system_state(target, connection, **kw):
+    # Idempotent; an instance that already has users starts out bootstrapped
+    connection.execute(
+        insert_or_ignore(SystemState.__table__, "id").values(
+            id=SYSTEM_STATE_ID, bootstrapped=exists().where(User.id.isnot(None))
+        )
+    )
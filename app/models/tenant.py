@@ -1,12 +1,21 @@
 from sqlalchemy import Column, Integer, String
 from app.core.database import Base
 
+# Tenant.status: "deleting" tenants can't be logged into or signed up to while they are purged
+TENANT_ACTIVE = "active"
+TENANT_DELETING = "deleting"
+
 
 class Tenant(Base):
     __tablename__ = "tenants"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
+    status = Column(String, nullable=False, default=TENANT_ACTIVE, server_default=TENANT_ACTIVE)
+    # Bumped by every ORM update; backs ETags and If-Match (core UPDATEs must bump it themselves)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Tenant {self.name}>"
\ No newline at end of file
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from app.core.database import Base
+
+# TenantPurge.status
+PURGE_PENDING = "pending"
+PURGE_RUNNING = "running"
+PURGE_DONE = "done"
+PURGE_FAILED = "failed"
+
+
+class TenantPurge(Base):
+    """Progress of a background tenant deletion.
+
+    No foreign key: the row outlives the tenant so the outcome stays visible
+    at `GET /tenants/{id}/purge-status`. `updated_at` doubles as the job's
+    heartbeat; a running purge that stops beating can be taken over.
+    """
+    __tablename__ = "tenant_purges"
+
+    tenant_id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False, default=PURGE_PENDING)
+    users_total = Column(Integer, nullable=False, default=0)
+    users_deleted = Column(Integer, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<TenantPurge tenant_id={self.tenant_id} {self.status} {self.users_deleted}/{self.users_total}>"
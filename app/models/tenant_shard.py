@@ -0,0 +1,20 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, func
+from app.core.database import Base
+
+
+class TenantShard(Base):
+    """Shard directory: which database holds a tenant's users and counters.
+
+    Lives on the default database only. Tenants without a row are placed by
+    the TENANT_SHARDS setting, or stay on "default". While `moving` is set,
+    writes for the tenant are refused so a move can finish its last pass.
+    """
+    __tablename__ = "tenant_shards"
+
+    tenant_id = Column(Integer, primary_key=True)
+    shard = Column(String, nullable=False)
+    moving = Column(Boolean, nullable=False, default=False, server_default="false")
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<TenantShard tenant_id={self.tenant_id} {self.shard}{' (moving)' if self.moving else ''}>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, ForeignKey, Integer
+from app.core.database import Base
+
+
+class TenantStats(Base):
+    """Per-tenant user counters.
+
+    Kept in step with `users` by applying deltas in the same transaction as
+    every user insert, update and delete, so reading them is one primary-key
+    lookup instead of a COUNT(*) over the tenant's users.
+    """
+    __tablename__ = "tenant_stats"
+
+    tenant_id = Column(Integer, ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    total_users = Column(Integer, nullable=False, default=0, server_default="0")
+    active_users = Column(Integer, nullable=False, default=0, server_default="0")
+    admin_users = Column(Integer, nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<TenantStats tenant_id={self.tenant_id} total={self.total_users}>"
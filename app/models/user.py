@@ -1,11 +1,15 @@
 # app/models/user.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.expression import true
 from app.core.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination seeks on (tenant_id, id)
+        Index("ix_users_tenant_id_id", "tenant_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=True)
@@ -16,10 +20,14 @@ class User(Base):
     role = Column(String, nullable=False, default='user', server_default='user')
     is_superuser = Column(Boolean, default=False, server_default='false')
     is_active = Column(Boolean, default=True, server_default='true', nullable=False)
+    # Bumped by every ORM update; backs ETags and If-Match (core UPDATEs must bump it themselves)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     
     # Relationship
     tenant = relationship("Tenant", back_populates="users")
 
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         return f"<User {self.email}>"
 
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String
+from app.core.database import Base
+
+
+class UserEmail(Base):
+    """Which tenant each user's email belongs to, across every shard.
+
+    Lives on the default database only, and is only kept with DATABASE_SHARDS
+    set: `users.email` is unique per database, so a user's email is reserved
+    here before the user is inserted on its tenant's shard.
+    """
+    __tablename__ = "user_emails"
+
+    email = Column(String, primary_key=True)
+    # No foreign key: rows are removed with the tenant's purge
+    tenant_id = Column(Integer, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<UserEmail {self.email} tenant_id={self.tenant_id}>"
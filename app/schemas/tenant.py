@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import Optional
 
 class TenantBase(BaseModel):
@@ -12,9 +13,30 @@ class TenantUpdate(TenantBase):
 
 class TenantInDBBase(TenantBase):
     id: int
-    
-    class Config:
-        orm_mode = True
+    status: str
+
+    model_config = ConfigDict(from_attributes=True)
 
 class Tenant(TenantInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+class TenantStats(BaseModel):
+    tenant_id: int
+    total_users: int
+    active_users: int
+    admin_users: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TenantPurgeStatus(BaseModel):
+    tenant_id: int
+    status: str
+    users_total: int
+    users_deleted: int
+    batches: int
+    error: Optional[str] = None
+    started_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -3,6 +3,12 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str
+    # Seconds until access_token expires; renew it with refresh_token at POST /auth/refresh
+    expires_in: int | None = None
+    refresh_token: str | None = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: str | None = None
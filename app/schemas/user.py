@@ -1,5 +1,5 @@
 # app/schemas/user.py
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -22,11 +22,29 @@ class UserInDBBase(UserBase):
     id: int
     tenant_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class User(UserInDBBase):
     pass
 
 class UserInDB(UserInDBBase):
-    hashed_password: str
\ No newline at end of file
+    hashed_password: str
+
+class UserBulkItem(BaseModel):
+    email: EmailStr
+    password: str = Field(..., min_length=8)
+    name: Optional[str] = None
+    is_active: bool = True
+
+class UserBulkResult(BaseModel):
+    index: int
+    email: Optional[str] = None
+    # "created", "duplicate", "invalid" or "error" (a batch that could not be written)
+    status: str
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class UserBulkReport(BaseModel):
+    created: int
+    failed: int
+    results: List[UserBulkResult]
\ No newline at end of file
@@ -0,0 +1,96 @@
+# app/services/refresh_tokens.py
+import hashlib
+import itertools
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.refresh_token import RefreshToken
+
+logger = logging.getLogger("uvicorn.error")
+
+# Expired rows are deleted on every this many refreshes
+PRUNE_EVERY = 100
+_refreshes = itertools.count(1)
+
+
+def hash_refresh_token(token: str) -> str:
+    # The token is 256 random bits, so a plain digest is enough to keep it unguessable at rest
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(
+    db: AsyncSession, user_id: int, tenant_id: int, family_id: Optional[str] = None
+) -> Tuple[str, str]:
+    """Add a new refresh token to `db`; returns (token, family_id). A new login starts a family."""
+    token = secrets.token_urlsafe(32)
+    family_id = family_id or uuid.uuid4().hex
+    db.add(RefreshToken(
+        token_hash=hash_refresh_token(token),
+        family_id=family_id,
+        user_id=user_id,
+        tenant_id=tenant_id,
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token, family_id
+
+
+async def revoke_refresh_family(db: AsyncSession, family_id: str) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+async def use_refresh_token(db: AsyncSession, token: str):
+    """Mark a refresh token used and return its (user_id, tenant_id, family_id), or raise 401.
+
+    Claiming is a single conditional UPDATE, so of two requests with the same
+    token only one wins. A token that was already used is a replay: its
+    whole family is revoked (committed here) and the legitimate holder has
+    to log in again too.
+    """
+    now = datetime.utcnow()
+    token_hash = hash_refresh_token(token)
+    claimed = (
+        await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > now,
+            )
+            .values(used_at=now)
+            .returning(RefreshToken.user_id, RefreshToken.tenant_id, RefreshToken.family_id)
+        )
+    ).first()
+    if claimed is not None:
+        if next(_refreshes) % PRUNE_EVERY == 0:
+            await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+        return claimed
+
+    refused = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    row = (
+        await db.execute(
+            select(RefreshToken.used_at, RefreshToken.revoked_at, RefreshToken.family_id, RefreshToken.user_id)
+            .where(RefreshToken.token_hash == token_hash)
+        )
+    ).first()
+    if row is not None and row.used_at is not None and row.revoked_at is None:
+        logger.warning("Refresh token reused; revoking family %s of user %s", row.family_id, row.user_id)
+        await revoke_refresh_family(db, row.family_id)
+        await db.commit()
+    raise refused
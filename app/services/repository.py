@@ -0,0 +1,80 @@
+# app/services/repository.py
+"""The hot lookup queries, built once and shared by every router.
+
+Each statement is constructed at import with `bindparam` placeholders and
+executed with the values as parameters. Reusing the same statement object
+skips building the `select()` and lets SQLAlchemy reuse its memoized cache
+key, so every call after the first goes straight to the compiled form.
+`scripts/bench_statements.py` measures the difference.
+"""
+from typing import Optional
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.responses import schema_columns
+from app.models.tenant import TENANT_ACTIVE, Tenant
+from app.models.user import User
+from app.schemas.tenant import Tenant as TenantSchema
+from app.schemas.user import User as UserSchema
+
+# Users of a tenant that is being deleted no longer authenticate
+ACTIVE_USER_BY_EMAIL = (
+    select(User)
+    .join(Tenant, Tenant.id == User.tenant_id)
+    .where(User.email == bindparam("email"), Tenant.status == TENANT_ACTIVE)
+)
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+# Refresh re-reads the user for its claims; users of a tenant being deleted get none
+ACTIVE_TENANT_USER = (
+    select(User)
+    .join(Tenant, Tenant.id == User.tenant_id)
+    .where(User.id == bindparam("user_id"), User.tenant_id == bindparam("tenant_id"), Tenant.status == TENANT_ACTIVE)
+)
+TENANT_USER = select(User).where(User.id == bindparam("user_id"), User.tenant_id == bindparam("tenant_id"))
+# Column-only reads in the response's shape (see `schema_columns`), plus the row version for its ETag
+TENANT_USER_ROW = (
+    select(*schema_columns(UserSchema, User), User.version)
+    .where(User.id == bindparam("user_id"), User.tenant_id == bindparam("tenant_id"))
+)
+TENANT_ROW = select(*schema_columns(TenantSchema, Tenant), Tenant.version).where(Tenant.id == bindparam("tenant_id"))
+TENANT_BY_NAME = select(Tenant).where(Tenant.name == bindparam("name"))
+TENANT_STATUS_BY_NAME = select(Tenant.id, Tenant.status).where(Tenant.name == bindparam("name"))
+
+
+async def get_active_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """The user with `email`, unless their tenant is being deleted."""
+    return await db.scalar(ACTIVE_USER_BY_EMAIL, {"email": email})
+
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(USER_BY_EMAIL, {"email": email})
+
+
+async def get_tenant_user(db: AsyncSession, user_id: int, tenant_id: int) -> Optional[User]:
+    """User `user_id` if it belongs to `tenant_id`; other tenants' users are not found."""
+    return await db.scalar(TENANT_USER, {"user_id": user_id, "tenant_id": tenant_id})
+
+
+async def get_active_tenant_user(db: AsyncSession, user_id: int, tenant_id: int) -> Optional[User]:
+    """Like `get_tenant_user`, unless the tenant is being deleted."""
+    return await db.scalar(ACTIVE_TENANT_USER, {"user_id": user_id, "tenant_id": tenant_id})
+
+
+async def get_tenant_user_row(db: AsyncSession, user_id: int, tenant_id: int):
+    """Like `get_tenant_user`, as a row of the `User` schema's columns and `version`."""
+    return (await db.execute(TENANT_USER_ROW, {"user_id": user_id, "tenant_id": tenant_id})).first()
+
+
+async def get_tenant_row(db: AsyncSession, tenant_id: int):
+    """Tenant `tenant_id` as a row of the `Tenant` schema's columns and `version`."""
+    return (await db.execute(TENANT_ROW, {"tenant_id": tenant_id})).first()
+
+
+async def get_tenant_by_name(db: AsyncSession, name: str) -> Optional[Tenant]:
+    return await db.scalar(TENANT_BY_NAME, {"name": name})
+
+
+async def get_tenant_status_by_name(db: AsyncSession, name: str):
+    """(id, status) of tenant `name`, or None."""
+    return (await db.execute(TENANT_STATUS_BY_NAME, {"name": name})).first()
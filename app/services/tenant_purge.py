@@ -0,0 +1,226 @@
+# app/services/tenant_purge.py
+import asyncio
+import contextvars
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import DEFAULT_SHARD, dialect_insert, engine, shard_map, tenant_placement
+from app.core.principal_cache import invalidate_tenant_principals
+from app.models.tenant import TENANT_DELETING, Tenant
+from app.models.tenant_purge import PURGE_DONE, PURGE_FAILED, PURGE_PENDING, PURGE_RUNNING, TenantPurge
+from app.models.tenant_shard import TenantShard
+from app.models.tenant_stats import TenantStats
+from app.models.user import User
+from app.models.user_email import UserEmail
+from app.services.tenant_stats import COUNTERS, user_counters
+
+logger = logging.getLogger("uvicorn.error")
+
+# A running purge whose heartbeat is older than this is assumed dead and may be taken over
+PURGE_LEASE_SECONDS = 60
+
+# Purge tasks running in this worker, by tenant id
+_tasks: Dict[int, asyncio.Task] = {}
+
+
+async def start_purge(db: AsyncSession, tenant_id: int) -> bool:
+    """Mark a tenant as deleting and record a pending purge; call before commit.
+
+    Returns False if there is no such tenant. Calling it again for a tenant
+    that is already deleting leaves a pending or running purge as it is, and
+    restarts a failed one.
+    """
+    marked = await db.scalar(
+        update(Tenant)
+        .where(Tenant.id == tenant_id)
+        .values(status=TENANT_DELETING, version=Tenant.version + 1)
+        .returning(Tenant.id)
+    )
+    if marked is None:
+        return False
+    now = datetime.utcnow()
+    shard = (await tenant_placement(tenant_id, write=True)).shard if shard_map else DEFAULT_SHARD
+    if shard == DEFAULT_SHARD:
+        # Counters are decremented batch by batch, so on a restart this is what is left
+        remaining = await db.scalar(select(TenantStats.total_users).where(TenantStats.tenant_id == tenant_id)) or 0
+    else:
+        remaining = await _lock_out_on_shard(shard, tenant_id)
+    fresh = dict(status=PURGE_PENDING, users_total=remaining, users_deleted=0, batches=0, error=None,
+                 started_at=now, updated_at=now, finished_at=None)
+    stmt = dialect_insert(TenantPurge).values(tenant_id=tenant_id, **fresh)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["tenant_id"],
+        set_=fresh,
+        # "done" only survives from an earlier tenant that had the same id
+        where=TenantPurge.status.in_([PURGE_FAILED, PURGE_DONE]),
+    ))
+    invalidate_tenant_principals(db, tenant_id)
+    return True
+
+
+async def _lock_out_on_shard(shard: str, tenant_id: int) -> int:
+    """Mark the shard's copy of the tenant as deleting too; returns its remaining user count."""
+    shard_db = shard_map.session(shard)
+    try:
+        await shard_db.execute(update(Tenant).where(Tenant.id == tenant_id).values(status=TENANT_DELETING))
+        invalidate_tenant_principals(shard_db, tenant_id)
+        remaining = await shard_db.scalar(select(TenantStats.total_users).where(TenantStats.tenant_id == tenant_id))
+        await shard_db.commit()
+        return remaining or 0
+    finally:
+        await shard_db.close()
+
+
+def _claim(tenant_id: int) -> bool:
+    """Take the purge for this worker if it is pending or its runner stopped beating."""
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        claimed = conn.execute(
+            update(TenantPurge)
+            .where(
+                TenantPurge.tenant_id == tenant_id,
+                or_(
+                    TenantPurge.status == PURGE_PENDING,
+                    and_(
+                        TenantPurge.status == PURGE_RUNNING,
+                        TenantPurge.updated_at < now - timedelta(seconds=PURGE_LEASE_SECONDS),
+                    ),
+                ),
+            )
+            .values(status=PURGE_RUNNING, updated_at=now)
+        )
+    return claimed.rowcount == 1
+
+
+def _purge_batch(shard_engine: Engine, tenant_id: int, after_id: int, batch_size: int) -> Optional[int]:
+    """Delete the next `batch_size` users in one short transaction; returns the last id, or None when done."""
+    with shard_engine.begin() as conn:
+        rows = conn.execute(
+            select(User.id, User.is_active, User.role)
+            .where(User.tenant_id == tenant_id, User.id > after_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if rows:
+            conn.execute(delete(User).where(User.id.in_([row.id for row in rows])))
+            removed = sum((user_counters(row.is_active, row.role) for row in rows), Counter())
+            conn.execute(
+                update(TenantStats)
+                .where(TenantStats.tenant_id == tenant_id)
+                .values({key: getattr(TenantStats, key) - removed[key] for key in COUNTERS})
+            )
+        progress = (
+            update(TenantPurge)
+            .where(TenantPurge.tenant_id == tenant_id)
+            .values(
+                users_deleted=TenantPurge.users_deleted + len(rows),
+                batches=TenantPurge.batches + 1,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        if shard_engine is engine:
+            # Progress and heartbeat in the same transaction as the delete
+            conn.execute(progress)
+    if shard_engine is not engine:
+        with engine.begin() as conn:
+            conn.execute(progress)
+    return rows[-1].id if rows else None
+
+
+def _finish(shard_engine: Engine, tenant_id: int) -> None:
+    now = datetime.utcnow()
+    if shard_engine is not engine:
+        with shard_engine.begin() as conn:
+            conn.execute(delete(TenantStats).where(TenantStats.tenant_id == tenant_id))
+            conn.execute(delete(Tenant).where(Tenant.id == tenant_id))
+    with engine.begin() as conn:
+        conn.execute(delete(TenantStats).where(TenantStats.tenant_id == tenant_id))
+        conn.execute(delete(TenantShard).where(TenantShard.tenant_id == tenant_id))
+        conn.execute(delete(UserEmail).where(UserEmail.tenant_id == tenant_id))
+        conn.execute(delete(Tenant).where(Tenant.id == tenant_id))
+        conn.execute(
+            update(TenantPurge)
+            .where(TenantPurge.tenant_id == tenant_id)
+            .values(status=PURGE_DONE, updated_at=now, finished_at=now)
+        )
+
+
+def _fail(tenant_id: int, error: Exception) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            update(TenantPurge)
+            .where(TenantPurge.tenant_id == tenant_id)
+            .values(status=PURGE_FAILED, error=f"{type(error).__name__}: {error}"[:2000], updated_at=datetime.utcnow())
+        )
+
+
+async def run_purge(tenant_id: int) -> None:
+    """Delete a deleting tenant's users batch by batch, then the tenant itself.
+
+    Every batch is its own short transaction on the primary, followed by a
+    pause, so live traffic keeps getting connections and row locks.
+    """
+    if not await run_in_threadpool(_claim, tenant_id):
+        return
+    try:
+        # Users and counters live on the tenant's shard; the registry and progress on "default"
+        shard_engine = shard_map.engine((await shard_map.placement(tenant_id)).shard)
+        last_id = 0
+        while True:
+            last_id = await run_in_threadpool(
+                _purge_batch, shard_engine, tenant_id, last_id, settings.TENANT_PURGE_BATCH_SIZE
+            )
+            if last_id is None:
+                break
+            await asyncio.sleep(settings.TENANT_PURGE_PAUSE_MS / 1000)
+        await run_in_threadpool(_finish, shard_engine, tenant_id)
+        logger.info("Tenant %d purged", tenant_id)
+    except asyncio.CancelledError:
+        # Shutdown: the heartbeat goes stale and the next start resumes the purge
+        raise
+    except Exception as e:
+        logger.exception("Purge of tenant %d failed", tenant_id)
+        await run_in_threadpool(_fail, tenant_id, e)
+
+
+def schedule_purge(tenant_id: int) -> None:
+    """Run the tenant's purge in the background of this worker, unless it already is."""
+    task = _tasks.get(tenant_id)
+    if task is not None and not task.done():
+        return
+    # Start from an empty context so the purge's queries aren't counted against the request that scheduled it
+    task = contextvars.Context().run(asyncio.create_task, run_purge(tenant_id))
+    _tasks[tenant_id] = task
+    task.add_done_callback(lambda done: _tasks.pop(tenant_id, None) if _tasks.get(tenant_id) is done else None)
+
+
+def _resumable() -> List[int]:
+    stale = datetime.utcnow() - timedelta(seconds=PURGE_LEASE_SECONDS)
+    with engine.connect() as conn:
+        return list(conn.scalars(
+            select(TenantPurge.tenant_id).where(
+                or_(
+                    TenantPurge.status == PURGE_PENDING,
+                    and_(TenantPurge.status == PURGE_RUNNING, TenantPurge.updated_at < stale),
+                )
+            )
+        ))
+
+
+async def resume_purges() -> None:
+    """Pick up purges left pending, or abandoned by a worker that stopped."""
+    for tenant_id in await run_in_threadpool(_resumable):
+        schedule_purge(tenant_id)
+
+
+def cancel_purges() -> None:
+    for task in list(_tasks.values()):
+        task.cancel()
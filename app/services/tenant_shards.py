@@ -0,0 +1,224 @@
+# app/services/tenant_shards.py
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Engine
+
+from app.core.database import DEFAULT_SHARD, dialect_insert, shard_map
+from app.models.tenant import TENANT_ACTIVE, Tenant
+from app.models.tenant_shard import TenantShard
+from app.models.tenant_stats import TenantStats
+from app.models.user import User
+from app.services.repository import get_active_user_by_email
+from app.services.tenant_stats import COUNTERS
+
+logger = logging.getLogger("uvicorn.error")
+
+USER_FIELDS = [column.key for column in User.__table__.columns]
+
+
+class MoveError(RuntimeError):
+    pass
+
+
+def tenant_copy_statement(tenant_id: int, **values):
+    """Upsert a shard's copy of a registry row (it backs the foreign keys and the status join there)."""
+    stmt = dialect_insert(Tenant).values(id=tenant_id, **values)
+    return stmt.on_conflict_do_update(index_elements=["id"], set_={key: stmt.excluded[key] for key in values})
+
+
+async def update_tenant_copy(tenant_id: int, **values) -> None:
+    """Mirror a change to the tenant's registry row onto its shard, if it lives on one."""
+    placement = await shard_map.placement(tenant_id)
+    if placement.shard == DEFAULT_SHARD:
+        return
+    db = shard_map.session(placement.shard)
+    try:
+        await db.execute(update(Tenant).where(Tenant.id == tenant_id).values(**values))
+        await db.commit()
+    finally:
+        await db.close()
+
+
+async def sharded_stats(rows: List) -> List[Dict]:
+    """`stats_query` rows as dicts, with the counters of sharded tenants read from their shards."""
+    stats = [row._asdict() for row in rows]
+    by_shard: Dict[str, List[dict]] = {}
+    for row in stats:
+        shard = (await shard_map.placement(row["tenant_id"])).shard
+        if shard != DEFAULT_SHARD:
+            row.update(dict.fromkeys(COUNTERS, 0))
+            by_shard.setdefault(shard, []).append(row)
+    for shard, shard_rows in by_shard.items():
+        db = shard_map.session(shard)
+        try:
+            result = await db.execute(
+                select(TenantStats.tenant_id, *(getattr(TenantStats, key) for key in COUNTERS))
+                .where(TenantStats.tenant_id.in_([row["tenant_id"] for row in shard_rows]))
+            )
+            counters = {row.tenant_id: row._asdict() for row in result}
+        finally:
+            await db.close()
+        for row in shard_rows:
+            row.update(counters.get(row["tenant_id"], {}))
+    return stats
+
+
+async def find_user_on_shards(email: str):
+    """Look up a login on every shard but "default"; returns (user, session) or (None, None).
+
+    A hit only counts on the shard the directory places its tenant on, so
+    rows a move left behind are ignored. The caller closes the session.
+    """
+    for shard in shard_map.names()[1:]:
+        db = shard_map.session(shard)
+        user = await get_active_user_by_email(db, email)
+        if user is not None and (await shard_map.placement(user.tenant_id)).shard == shard:
+            return user, db
+        await db.close()
+    return None, None
+
+
+# --- Moving a tenant between shards (scripts/move_tenant.py) ---
+
+def _set_directory(tenant_id: int, shard: str, moving: bool) -> None:
+    with shard_map.engine(DEFAULT_SHARD).begin() as conn:
+        stmt = dialect_insert(TenantShard).values(tenant_id=tenant_id, shard=shard, moving=moving)
+        conn.execute(stmt.on_conflict_do_update(index_elements=["tenant_id"], set_={"shard": shard, "moving": moving}))
+
+
+def sync_users(source: Engine, target: Engine, tenant_id: int, batch_size: int) -> Dict[str, int]:
+    """Make the tenant's users on `target` equal to those on `source`.
+
+    Walks both sides by id in `batch_size` ranges, one short transaction per
+    batch: rows that differ or are missing are upserted, rows gone from the
+    source are deleted. Run on a live tenant it copies everything; run again
+    after writes are held it only moves what changed in between.
+    """
+    copied = deleted = 0
+    after_id = 0
+    while True:
+        with source.connect() as conn:
+            rows = conn.execute(
+                select(User.__table__)
+                .where(User.tenant_id == tenant_id, User.id > after_id)
+                .order_by(User.id)
+                .limit(batch_size)
+            ).all()
+        upper = rows[-1].id if rows else None
+        with target.begin() as conn:
+            in_range = User.id > after_id if upper is None else User.id.between(after_id + 1, upper)
+            existing = {
+                row.id: row for row in conn.execute(select(User.__table__).where(User.tenant_id == tenant_id, in_range))
+            }
+            if rows:
+                taken = conn.scalars(
+                    select(User.id).where(User.id.in_([row.id for row in rows]), User.tenant_id != tenant_id)
+                ).all()
+                if taken:
+                    raise MoveError(f"user ids {taken[:10]} are already used by other tenants on the target shard")
+            changed = [row._asdict() for row in rows if existing.get(row.id) != row]
+            if changed:
+                stmt = dialect_insert(User)
+                conn.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["id"], set_={key: stmt.excluded[key] for key in USER_FIELDS if key != "id"}
+                    ),
+                    changed,
+                )
+            gone = set(existing) - {row.id for row in rows}
+            if gone:
+                conn.execute(delete(User).where(User.id.in_(gone)))
+        copied += len(changed)
+        deleted += len(gone)
+        if upper is None:
+            return {"copied": copied, "deleted": deleted}
+        after_id = upper
+
+
+def _copy_tenant(source: Engine, target: Engine, tenant_id: int) -> None:
+    """The registry row copy and the counters, which only change together with writes."""
+    with shard_map.engine(DEFAULT_SHARD).connect() as conn:
+        tenant = conn.execute(select(Tenant.name, Tenant.status).where(Tenant.id == tenant_id)).one()
+    with source.connect() as conn:
+        stats = conn.execute(select(TenantStats.__table__).where(TenantStats.tenant_id == tenant_id)).first()
+    with target.begin() as conn:
+        conn.execute(tenant_copy_statement(tenant_id, name=tenant.name, status=tenant.status))
+        if stats is not None:
+            stmt = dialect_insert(TenantStats).values(**stats._asdict())
+            conn.execute(stmt.on_conflict_do_update(index_elements=["tenant_id"], set_={key: stmt.excluded[key] for key in COUNTERS}))
+
+
+def _drop_tenant(shard: str, tenant_id: int, batch_size: int) -> None:
+    """Delete what a move left behind on the old shard; the registry row stays on "default"."""
+    shard_engine = shard_map.engine(shard)
+    while True:
+        with shard_engine.begin() as conn:
+            ids = conn.scalars(select(User.id).where(User.tenant_id == tenant_id).order_by(User.id).limit(batch_size)).all()
+            if not ids:
+                break
+            conn.execute(delete(User).where(User.id.in_(ids)))
+    with shard_engine.begin() as conn:
+        conn.execute(delete(TenantStats).where(TenantStats.tenant_id == tenant_id))
+        if shard != DEFAULT_SHARD:
+            conn.execute(delete(Tenant).where(Tenant.id == tenant_id))
+
+
+def move_tenant(
+    tenant_id: int,
+    target: str,
+    batch_size: int = 1000,
+    wait: Optional[float] = None,
+    log: Callable[[str], None] = logger.info,
+) -> None:
+    """Move a tenant's users and counters to shard `target` while it keeps serving.
+
+    1. Copy every row to the target; the tenant stays fully usable.
+    2. Hold its writes (`moving`; they get 503) and wait out the workers' directory cache.
+    3. Copy what changed during step 1, then point the directory at the target.
+    4. Once every worker reads from the target, release writes and delete the old rows.
+
+    `wait` defaults to SHARD_MAP_TTL_SECONDS plus a second. If anything fails
+    before the switch, writes are released and the tenant stays where it was;
+    running the move again resumes from what was already copied.
+    """
+    wait = shard_map.ttl + 1 if wait is None else wait
+    if target not in shard_map.names():
+        raise MoveError(f"unknown shard {target!r}; configured: {', '.join(shard_map.names())}")
+    with shard_map.engine(DEFAULT_SHARD).connect() as conn:
+        tenant_status = conn.scalar(select(Tenant.status).where(Tenant.id == tenant_id))
+    if tenant_status is None:
+        raise MoveError(f"tenant {tenant_id} does not exist")
+    if tenant_status != TENANT_ACTIVE:
+        raise MoveError(f"tenant {tenant_id} is {tenant_status}")
+    shard_map.load_directory()
+    source = shard_map.placement_sync(tenant_id).shard
+    if source == target:
+        raise MoveError(f"tenant {tenant_id} is already on {target!r}")
+    source_engine, target_engine = shard_map.engine(source), shard_map.engine(target)
+
+    start = time.perf_counter()
+    _copy_tenant(source_engine, target_engine, tenant_id)
+    counts = sync_users(source_engine, target_engine, tenant_id, batch_size)
+    log(f"copied {counts['copied']} users from {source!r} to {target!r} in {time.perf_counter() - start:.1f}s")
+
+    _set_directory(tenant_id, source, moving=True)
+    try:
+        log(f"holding writes, waiting {wait:.1f}s for every worker to see it")
+        time.sleep(wait)
+        held = time.perf_counter()
+        counts = sync_users(source_engine, target_engine, tenant_id, batch_size)
+        _copy_tenant(source_engine, target_engine, tenant_id)
+        _set_directory(tenant_id, target, moving=True)
+        log(f"caught up ({counts['copied']} copied, {counts['deleted']} deleted) in {time.perf_counter() - held:.1f}s")
+    except BaseException:
+        _set_directory(tenant_id, source, moving=False)
+        raise
+    # Writes stay held until no worker can still send them to the old shard
+    time.sleep(wait)
+    _set_directory(tenant_id, target, moving=False)
+    log(f"tenant {tenant_id} now on {target!r}; writes held for {time.perf_counter() - held:.1f}s")
+    _drop_tenant(source, tenant_id, batch_size)
+    log(f"removed tenant {tenant_id}'s rows from {source!r}")
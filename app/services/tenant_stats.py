@@ -0,0 +1,88 @@
+# app/services/tenant_stats.py
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models.tenant import Tenant
+from app.models.tenant_stats import TenantStats
+from app.models.user import User
+
+COUNTERS = ("total_users", "active_users", "admin_users")
+
+
+def user_counters(is_active: bool, role: str = "user") -> Counter:
+    """What one user contributes to its tenant's counters."""
+    return Counter(total_users=1, active_users=int(bool(is_active)), admin_users=int(role == "admin"))
+
+
+async def adjust_tenant_stats(
+    db: AsyncSession,
+    tenant_id: int,
+    added: Optional[Counter] = None,
+    removed: Optional[Counter] = None,
+) -> None:
+    """Apply a counter delta in the caller's transaction; call before commit."""
+    delta = {key: (added or {}).get(key, 0) - (removed or {}).get(key, 0) for key in COUNTERS}
+    if not any(delta.values()):
+        return
+    stmt = dialect_insert(TenantStats).values(tenant_id=tenant_id, **delta)
+    # Increment in SQL so concurrent writers serialise on the row instead of losing updates
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["tenant_id"],
+        set_={key: getattr(TenantStats, key) + stmt.excluded[key] for key in COUNTERS},
+    )
+    await db.execute(stmt)
+
+
+def stats_query():
+    """Counters for every tenant; tenants that never had a user read as zeros."""
+    return select(
+        Tenant.id.label("tenant_id"),
+        *(func.coalesce(getattr(TenantStats, key), 0).label(key) for key in COUNTERS),
+    ).outerjoin(TenantStats, TenantStats.tenant_id == Tenant.id)
+
+
+def _actual_counts_query():
+    return select(
+        User.tenant_id,
+        func.count().label("total_users"),
+        func.sum(case((User.is_active, 1), else_=0)).label("active_users"),
+        func.sum(case((User.role == "admin", 1), else_=0)).label("admin_users"),
+    ).group_by(User.tenant_id)
+
+
+def _as_counts(row) -> Dict[str, int]:
+    return {key: int(getattr(row, key) or 0) for key in COUNTERS}
+
+
+def find_drift(session: Session) -> List[dict]:
+    """Compare stored counters against a full recount of `users`."""
+    zeros = dict.fromkeys(COUNTERS, 0)
+    actual = {row.tenant_id: _as_counts(row) for row in session.execute(_actual_counts_query())}
+    stored_query = select(TenantStats.tenant_id, *(getattr(TenantStats, key) for key in COUNTERS))
+    stored = {row.tenant_id: _as_counts(row) for row in session.execute(stored_query)}
+    session.rollback()
+    return [
+        {"tenant_id": tenant_id, "stored": stored.get(tenant_id, zeros), "actual": actual.get(tenant_id, zeros)}
+        for tenant_id in sorted(set(actual) | set(stored))
+        if stored.get(tenant_id, zeros) != actual.get(tenant_id, zeros)
+    ]
+
+
+def reset_tenant_stats(session: Session, tenant_id: int) -> Dict[str, int]:
+    """Recount one tenant and overwrite its counters, in its own transaction.
+
+    The counter row is locked first (on backends that support it), so writers
+    that commit during the recount are either counted or applied on top.
+    """
+    session.execute(select(TenantStats).where(TenantStats.tenant_id == tenant_id).with_for_update())
+    row = session.execute(_actual_counts_query().where(User.tenant_id == tenant_id)).first()
+    counts = _as_counts(row) if row is not None else dict.fromkeys(COUNTERS, 0)
+    stmt = dialect_insert(TenantStats).values(tenant_id=tenant_id, **counts)
+    session.execute(stmt.on_conflict_do_update(index_elements=["tenant_id"], set_=counts))
+    session.commit()
+    return counts
@@ -0,0 +1,35 @@
+# app/services/user_emails.py
+"""Email uniqueness across shards.
+
+With DATABASE_SHARDS set, creating a user or changing its email first claims
+the email in `user_emails` on the default database. The claim is part of the
+default database's transaction, which the caller commits after the shard's;
+a concurrent claim of the same email waits on it, then finds it taken.
+Without shards `users.email` is the only constraint and nothing is written.
+"""
+from typing import Iterable, Set
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import insert_or_ignore, shard_map
+from app.models.user_email import UserEmail
+
+
+async def reserve_emails(directory: AsyncSession, tenant_id: int, emails: Iterable[str]) -> Set[str]:
+    """Claim `emails` for `tenant_id` in `directory`'s transaction; returns the ones already taken."""
+    emails = set(emails)
+    if not shard_map or not emails:
+        return set()
+    claimed = await directory.scalars(
+        insert_or_ignore(UserEmail, "email").returning(UserEmail.email),
+        [{"email": email, "tenant_id": tenant_id} for email in emails],
+    )
+    return emails - set(claimed.all())
+
+
+async def release_emails(directory: AsyncSession, emails: Iterable[str]) -> None:
+    """Give `emails` back, in `directory`'s transaction."""
+    emails = list(emails)
+    if shard_map and emails:
+        await directory.execute(delete(UserEmail).where(UserEmail.email.in_(emails)))
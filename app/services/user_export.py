@@ -0,0 +1,52 @@
+# app/services/user_export.py
+import csv
+import io
+import json
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import stream_rows
+from app.models.user import User
+
+# Exported columns; the password hash is deliberately not among them
+EXPORT_COLUMNS = (
+    User.id,
+    User.email,
+    User.name,
+    User.tenant_id,
+    User.role,
+    User.is_active,
+    User.is_superuser,
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_statement(tenant_id: int):
+    # Column-only select: rows come back as plain tuples, no ORM identity map
+    return select(*EXPORT_COLUMNS).where(User.tenant_id == tenant_id).order_by(User.id)
+
+
+async def export_users(tenant_id: int, fmt: str, shard: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Encode a tenant's users batch by batch as NDJSON or CSV, read from `shard`."""
+    rows = stream_rows(export_statement(tenant_id), settings.EXPORT_BATCH_SIZE, shard)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        async for batch in rows:
+            writer.writerows(batch)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        return
+
+    async for batch in rows:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(",", ":")) + "\n" for row in batch
+        ).encode("utf-8")
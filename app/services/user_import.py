@@ -0,0 +1,195 @@
+# app/services/user_import.py
+import json
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import hash_passwords_parallel
+from app.models.user import User
+from app.services.tenant_stats import adjust_tenant_stats, user_counters
+from app.services.user_emails import reserve_emails
+from app.schemas.user import UserBulkItem, UserBulkReport, UserBulkResult
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class _BadLine:
+    """Placeholder for an NDJSON line that is not valid JSON."""
+
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _BadLine(f"Invalid JSON: {e}")
+
+
+async def iter_payload(request: Request) -> AsyncIterator[Any]:
+    """Yield raw rows from a JSON array body or a streamed NDJSON body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if pending.strip():
+            yield _parse_line(pending)
+        return
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Body must be a JSON array or NDJSON (application/x-ndjson)",
+        )
+    for row in payload:
+        yield row
+
+
+def _validation_detail(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+async def _existing_emails(db: AsyncSession, emails: List[str]) -> set:
+    return set((await db.scalars(select(User.email).where(User.email.in_(emails)))).all())
+
+
+async def _import_batch(
+    db: AsyncSession, directory: AsyncSession, tenant_id: int, batch: List[Tuple[int, Any]]
+) -> List[UserBulkResult]:
+    results: Dict[int, UserBulkResult] = {}
+    candidates: List[Tuple[int, UserBulkItem]] = []
+    seen = set()
+    for index, raw in batch:
+        if isinstance(raw, _BadLine):
+            results[index] = UserBulkResult(index=index, status="invalid", detail=raw.detail)
+            continue
+        try:
+            item = UserBulkItem.model_validate(raw)
+        except ValidationError as e:
+            email = raw.get("email") if isinstance(raw, dict) else None
+            results[index] = UserBulkResult(
+                index=index, email=email if isinstance(email, str) else None,
+                status="invalid", detail=_validation_detail(e),
+            )
+            continue
+        if item.email in seen:
+            results[index] = UserBulkResult(
+                index=index, email=item.email, status="duplicate", detail="Duplicate email in request"
+            )
+            continue
+        seen.add(item.email)
+        candidates.append((index, item))
+
+    if candidates:
+        # One set-based lookup per batch instead of one SELECT per user
+        existing = await _existing_emails(db, [item.email for _, item in candidates])
+        # End the read transaction so no connection is held while hashing
+        await db.rollback()
+
+        to_insert = [(index, item) for index, item in candidates if item.email not in existing]
+        hashes = await hash_passwords_parallel([item.password for _, item in to_insert])
+        rows = {
+            item.email: (index, {
+                "email": item.email,
+                "name": item.name,
+                "hashed_password": hashed,
+                "tenant_id": tenant_id,
+                "is_active": item.is_active,
+            })
+            for (index, item), hashed in zip(to_insert, hashes)
+        }
+
+        # Retry once if a concurrent writer claimed some of the emails meanwhile
+        ids: Dict[str, int] = {}
+        failed: Optional[str] = None
+        for attempt in range(2):
+            pending = [row for email, (_, row) in rows.items() if email not in existing]
+            if not pending:
+                break
+            try:
+                # With shards, emails taken on another one count as existing too
+                existing |= await reserve_emails(directory, tenant_id, [row["email"] for row in pending])
+                pending = [row for row in pending if row["email"] not in existing]
+                if pending:
+                    created = await db.execute(insert(User).returning(User.id, User.email), pending)
+                    ids = {email: user_id for user_id, email in created.all()}
+                    await adjust_tenant_stats(db, tenant_id, added=sum(
+                        (user_counters(row["is_active"]) for _, row in rows.values() if row["email"] in ids),
+                        Counter(),
+                    ))
+                await db.commit()
+                if directory is not db:
+                    await directory.commit()
+                break
+            except IntegrityError:
+                await db.rollback()
+                if directory is not db:
+                    await directory.rollback()
+                ids = {}
+                taken = await _existing_emails(db, [row["email"] for row in pending])
+                await db.rollback()
+                if attempt or not taken:
+                    # Not (only) an email race, e.g. the tenant was purged meanwhile. Earlier
+                    # batches are committed, so report this one's rows instead of failing the request
+                    failed = "Not imported: the batch conflicted with a concurrent change; retry this row"
+                    break
+                existing |= taken
+
+        for email, (index, _) in rows.items():
+            if email in existing:
+                continue
+            if failed is None:
+                results[index] = UserBulkResult(index=index, email=email, status="created", id=ids.get(email))
+            else:
+                results[index] = UserBulkResult(index=index, email=email, status="error", detail=failed)
+
+        for index, item in candidates:
+            if item.email in existing:
+                results[index] = UserBulkResult(
+                    index=index, email=item.email, status="duplicate", detail="Email already registered"
+                )
+
+    return [results[index] for index, _ in batch]
+
+
+async def import_users(
+    db: AsyncSession, tenant_id: int, rows: AsyncIterator[Any], directory: Optional[AsyncSession] = None
+) -> UserBulkReport:
+    """Create users in `tenant_id` in chunked transactions of BULK_IMPORT_BATCH_SIZE rows.
+
+    `directory` is the default database's session when `db` is on a shard;
+    emails are claimed there (see `reserve_emails`).
+    """
+    directory = directory if directory is not None else db
+    results: List[UserBulkResult] = []
+    batch: List[Tuple[int, Any]] = []
+    index = 0
+    async for raw in rows:
+        batch.append((index, raw))
+        index += 1
+        if len(batch) >= settings.BULK_IMPORT_BATCH_SIZE:
+            results.extend(await _import_batch(db, directory, tenant_id, batch))
+            batch = []
+    if batch:
+        results.extend(await _import_batch(db, directory, tenant_id, batch))
+
+    created = sum(1 for r in results if r.status == "created")
+    return UserBulkReport(created=created, failed=len(results) - created, results=results)
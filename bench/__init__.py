@@ -0,0 +1,4 @@
+"""Latency/throughput benchmarks for the API's hot paths.
+
+Run `PYTHONPATH=. .venv/bin/python -m bench --help` for options.
+"""
@@ -0,0 +1,142 @@
+"""Run API workloads concurrently and report throughput and p50/p95/p99.
+
+Each selected workload runs on its own for `--duration` seconds with
+`--concurrency` workers in a closed loop, after `--warmup` seconds whose
+samples are discarded. By default the app runs in-process over an ASGI
+transport against a fresh SQLite DB; `--target uvicorn` spawns a real server.
+
+Results can be written as JSON (`--out`) and checked against an earlier run
+(`--compare`): any p50/p95/p99 more than `--threshold` slower, throughput more
+than `--threshold` lower, or extra errors counts as a regression and makes the
+run exit non-zero.
+
+Run:
+    PYTHONPATH=. .venv/bin/python -m bench --out bench-before.json
+    PYTHONPATH=. .venv/bin/python -m bench --compare bench-before.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from bench.report import compare, load_results, print_table, summarize, write_results
+from bench.targets import in_process, uvicorn_server
+from bench.workloads import WORKLOADS, keep_token_fresh, seed
+
+
+async def run_workload(client, ctx, fn, concurrency: int, duration: float, warmup: float) -> dict:
+    latencies = []
+    errors = 0
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                await fn(client, ctx)
+            except Exception:
+                if start >= measure_from:
+                    errors += 1
+                continue
+            if start >= measure_from:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - measure_from)
+
+
+async def main(args) -> int:
+    if args.target == "uvicorn":
+        target = uvicorn_server(args.concurrency, args.port, args.server_workers)
+    else:
+        target = in_process()
+
+    results = {}
+    async with target as client:
+        ctx = await seed(client, args.users)
+        # Access tokens last ACCESS_TOKEN_EXPIRE_MINUTES; a full run takes longer
+        renewer = asyncio.create_task(keep_token_fresh(client, ctx))
+        try:
+            for name in args.workloads:
+                print(f"running {name} ...", file=sys.stderr)
+                results[name] = await run_workload(
+                    client, ctx, WORKLOADS[name], args.concurrency, args.duration, args.warmup
+                )
+        finally:
+            renewer.cancel()
+
+    print_table(results)
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.target,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "users": args.users,
+        "db_mode": os.getenv("DB_MODE", "sync"),
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+    if args.out:
+        write_results(args.out, meta, results)
+        print(f"wrote {args.out}")
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), {"meta": meta, "results": results}, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} vs {args.compare}")
+    return 0
+
+
+def _git_rev():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument(
+        "--workloads", default=",".join(WORKLOADS),
+        help=f"comma-separated subset of: {', '.join(WORKLOADS)}",
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients per workload")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per workload")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each workload")
+    parser.add_argument("--users", type=int, default=50, help="users seeded for the user workloads")
+    parser.add_argument("--database-url", help="default: a fresh SQLite file in a temp dir")
+    parser.add_argument("--port", type=int, default=8765, help="port for --target uvicorn")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn workers for --target uvicorn")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression, 0.10 = 10%%")
+    args = parser.parse_args(argv)
+
+    args.workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workload(s): {', '.join(unknown)}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    # Must happen before anything imports the app
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='bench-')}/bench.db"
+    sys.exit(asyncio.run(main(args)))
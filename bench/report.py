@@ -0,0 +1,73 @@
+"""Summaries, JSON result files and regression checks."""
+import json
+import statistics
+from typing import Dict, List
+
+# Latencies where larger is worse, and throughput where smaller is worse
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+THROUGHPUT_KEY = "throughput_rps"
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Reduce raw per-operation latencies (seconds) to the numbers we track."""
+    ms = [s * 1000 for s in latencies] or [0.0]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.mean(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    print(
+        f"{'workload':<14} {'ops':>7} {'err':>5} {'ops/s':>9} "
+        f"{'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<14} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>9.1f} "
+            f"{r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['p99_ms']:>7.2f}ms {r['max_ms']:>7.2f}ms"
+        )
+
+
+def write_results(path: str, meta: dict, results: Dict[str, dict]) -> None:
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Return one line per metric that got worse than `threshold` (0.1 = 10%)."""
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for key in LATENCY_KEYS:
+            if old[key] and new[key] > old[key] * (1 + threshold):
+                regressions.append(f"{name}.{key}: {old[key]:.2f} -> {new[key]:.2f} (+{new[key] / old[key] - 1:.0%})")
+        if old[THROUGHPUT_KEY] and new[THROUGHPUT_KEY] < old[THROUGHPUT_KEY] * (1 - threshold):
+            regressions.append(
+                f"{name}.{THROUGHPUT_KEY}: {old[THROUGHPUT_KEY]:.1f} -> {new[THROUGHPUT_KEY]:.1f} "
+                f"({new[THROUGHPUT_KEY] / old[THROUGHPUT_KEY] - 1:.0%})"
+            )
+        if new["errors"] > old["errors"]:
+            regressions.append(f"{name}.errors: {old['errors']} -> {new['errors']}")
+    return regressions
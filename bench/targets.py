@@ -0,0 +1,69 @@
+"""Where requests go: the app in-process over ASGI, or a spawned uvicorn."""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+
+
+@asynccontextmanager
+async def in_process() -> AsyncIterator[httpx.AsyncClient]:
+    """Drive `app.main:app` directly; no sockets, so only the app itself is measured."""
+    # Imported here so DATABASE_URL is already set when the app configures its engine
+    from app.core.database import Base, dispose_async_engine, engine
+    from app.core.security import bulk_hashing_pool, hashing_pool
+    from app.main import app
+
+    # ASGITransport does not run startup events
+    Base.metadata.create_all(bind=engine)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            yield client
+    finally:
+        hashing_pool.shutdown()
+        bulk_hashing_pool.shutdown()
+        await dispose_async_engine()
+
+
+@asynccontextmanager
+async def uvicorn_server(concurrency: int, port: int, workers: int) -> AsyncIterator[httpx.AsyncClient]:
+    """Spawn uvicorn on `port` with the current environment and talk to it over HTTP."""
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+            await _wait_until_ready(client, proc)
+            yield client
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def _wait_until_ready(client: httpx.AsyncClient, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"uvicorn did not become ready within {timeout:.0f}s")
@@ -0,0 +1,142 @@
+"""Seeding and the request mix each workload sends.
+
+A workload is one coroutine that performs a single operation against an
+`httpx.AsyncClient` and raises on an unexpected status; the runner times it.
+"""
+import asyncio
+import itertools
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+API = "/api/v1"
+PASSWORD = "password123"
+# Renew the access token once this share of its lifetime has passed
+RENEW_AT = 0.5
+
+
+@dataclass
+class BenchContext:
+    admin_email: str
+    token: str
+    refresh_token: str
+    # When to renew `token` (monotonic); see `keep_token_fresh`
+    renew_at: float
+    user_ids: List[int]
+    rng: random.Random = field(default_factory=lambda: random.Random(0))
+    counter: itertools.count = field(default_factory=itertools.count)
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+async def seed(client: httpx.AsyncClient, n_users: int) -> BenchContext:
+    """Sign up an admin in a fresh tenant and bulk-create `n_users` users next to it.
+
+    Tenant CRUD needs the admin to be a superuser, which only the first account
+    on an empty database gets.
+    """
+    run = uuid.uuid4().hex[:8]
+    email = f"bench-admin-{run}@example.com"
+    r = await client.post(
+        f"{API}/auth/signup",
+        json={"name": "Bench", "email": email, "password": PASSWORD, "tenant_name": f"bench-{run}"},
+    )
+    r.raise_for_status()
+    r = await client.post(f"{API}/auth/login", json={"email": email, "password": PASSWORD})
+    r.raise_for_status()
+    tokens = r.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    rows = [{"email": f"bench-{run}-{i}@example.com", "password": PASSWORD} for i in range(n_users)]
+    r = await client.post(f"{API}/users/bulk", headers=headers, json=rows)
+    r.raise_for_status()
+    user_ids = [row["id"] for row in r.json()["results"] if row["status"] == "created"]
+    return BenchContext(
+        admin_email=email,
+        token=tokens["access_token"],
+        refresh_token=tokens["refresh_token"],
+        renew_at=_renew_at(tokens),
+        user_ids=user_ids,
+    )
+
+
+def _renew_at(tokens: dict) -> float:
+    return time.monotonic() + tokens["expires_in"] * RENEW_AT
+
+
+async def renew_token(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    """Swap the admin's tokens for fresh ones through `/auth/refresh` (refresh tokens work once)."""
+    r = await client.post(f"{API}/auth/refresh", json={"refresh_token": ctx.refresh_token})
+    if r.status_code != 200:
+        # The refresh token is gone (say, the run outlived it): start a new session
+        r = await client.post(f"{API}/auth/login", json={"email": ctx.admin_email, "password": PASSWORD})
+    r.raise_for_status()
+    tokens = r.json()
+    ctx.token, ctx.refresh_token, ctx.renew_at = tokens["access_token"], tokens["refresh_token"], _renew_at(tokens)
+
+
+async def keep_token_fresh(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    """Renew the admin's access token halfway through each lifetime, for runs longer than one.
+
+    A single task does it, so concurrent workers never present the same
+    refresh token twice (which would revoke the whole family); requests in
+    flight with the previous access token stay valid until it expires.
+    """
+    while True:
+        await asyncio.sleep(max(0.0, ctx.renew_at - time.monotonic()))
+        await renew_token(client, ctx)
+
+
+def _check(r: httpx.Response, *expected: int) -> None:
+    if r.status_code not in (expected or (200,)):
+        raise RuntimeError(f"{r.request.method} {r.request.url.path} -> {r.status_code} {r.text[:200]}")
+
+
+async def login(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    r = await client.post(f"{API}/auth/login", json={"email": ctx.admin_email, "password": PASSWORD})
+    _check(r)
+
+
+async def me(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    _check(await client.get(f"{API}/auth/me", headers=ctx.headers))
+
+
+async def list_users(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    _check(await client.get(f"{API}/users/?limit=50", headers=ctx.headers))
+
+
+async def get_user(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    user_id = ctx.rng.choice(ctx.user_ids)
+    _check(await client.get(f"{API}/users/{user_id}", headers=ctx.headers))
+
+
+async def update_user(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    user_id = ctx.rng.choice(ctx.user_ids)
+    _check(await client.put(f"{API}/users/{user_id}", headers=ctx.headers, json={"is_active": True}))
+
+
+async def tenant_crud(client: httpx.AsyncClient, ctx: BenchContext) -> None:
+    """Create, read, rename and delete a tenant: four requests per operation."""
+    name = f"bench-tenant-{uuid.uuid4().hex[:8]}-{next(ctx.counter)}"
+    r = await client.post(f"{API}/tenants/", headers=ctx.headers, json={"name": name})
+    _check(r, 201)
+    tenant_id = r.json()["id"]
+    _check(await client.get(f"{API}/tenants/{tenant_id}", headers=ctx.headers))
+    _check(await client.put(f"{API}/tenants/{tenant_id}", headers=ctx.headers, json={"name": f"{name}-renamed"}))
+    _check(await client.delete(f"{API}/tenants/{tenant_id}", headers=ctx.headers), 202)
+
+
+WORKLOADS: Dict[str, Callable[[httpx.AsyncClient, BenchContext], Awaitable[None]]] = {
+    "login": login,
+    "me": me,
+    "list_users": list_users,
+    "get_user": get_user,
+    "update_user": update_user,
+    "tenant_crud": tenant_crud,
+}
@@ -0,0 +1,171 @@
+"""Benchmark: how long a new worker takes to import the app, start up and serve its first request.
+
+Every sample is a fresh interpreter, as a worker started by the autoscaler
+would be. Each one times `import app.main`, the startup handlers (entering
+the app's lifespan) and a first login plus `GET /auth/me`, against a SQLite
+database created and stamped beforehand, once with SCHEMA_STARTUP=check and
+once with SCHEMA_STARTUP=create_all for comparison. Also checks that:
+- with "check", startup runs one `alembic_version` query per database and no DDL
+- jose, cryptography and argon2 are not imported until they are needed
+- SCHEMA_VERSION is the Alembic head, so "check" accepts a migrated database
+
+Exits non-zero if any of those fails, or if a median (of the "check" samples)
+exceeds its budget.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/bench_cold_start.py --samples 7
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/bench_cold_start.py --max-import-ms 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from checklib import PASSWORD, Checks, bearer
+
+# Only needed on first use (a token, an argon2 hash, JWT_KEYS_DIR); none of them at import
+DEFERRED_MODULES = ("jose", "cryptography", "argon2")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL = "bench@example.com"
+
+
+async def sample() -> dict:
+    """One cold start, in this (fresh) process; the app is configured by the environment."""
+    start = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter() - start
+    deferred_loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+
+    import httpx
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    statements = []
+    event.listen(Engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter() - start
+        startup_statements = list(statements)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            r = await client.post("/api/v1/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            assert r.status_code == 200, r.text
+            r = await client.get("/api/v1/auth/me", headers=bearer(r.json()["access_token"]))
+            assert r.status_code == 200, r.text
+            first_request = time.perf_counter() - start
+    return {
+        "import_ms": imported * 1000,
+        "startup_ms": started * 1000,
+        "first_request_ms": first_request * 1000,
+        "schema_queries": sum("alembic_version" in s for s in startup_statements),
+        "ddl_statements": sum(s.lstrip().upper().startswith(("CREATE", "PRAGMA TABLE_INFO")) for s in startup_statements),
+        "deferred_loaded": deferred_loaded,
+    }
+
+
+def prepare_database() -> None:
+    """Create, stamp and seed the database every sample starts against."""
+    from app.core.database import SessionLocal, engine
+    from app.core.schema import prepare_schema, schema_version
+    from app.core.security import get_password_hash, hashing_pool
+    from app.models.tenant import Tenant
+    from app.models.user import User
+
+    prepare_schema("create_all")
+    assert schema_version(engine) is not None, "create_all on an empty database should stamp it"
+    session = SessionLocal()
+    try:
+        tenant = Tenant(name="Bench")
+        session.add(tenant)
+        session.commit()
+        session.add(User(email=EMAIL, hashed_password=get_password_hash(PASSWORD), tenant_id=tenant.id, role="admin"))
+        session.commit()
+    finally:
+        session.close()
+    hashing_pool.shutdown()
+
+
+def alembic_head() -> str:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(Config(os.path.join(ROOT, "alembic.ini"))).get_current_head()
+
+
+def run_samples(env: dict, samples: int) -> list:
+    results = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, __file__, "--sample"], env=env, cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        result["process_ms"] = (time.perf_counter() - start) * 1000
+        results.append(result)
+    return results
+
+
+def main(args) -> int:
+    tmpdir = tempfile.mkdtemp(prefix="bench-cold-start-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmpdir}/cold.db",
+        "BCRYPT_ROUNDS": "4",
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+    }
+    os.environ.update(env)
+    prepare_database()
+
+    from app.core.schema import SCHEMA_VERSION
+
+    checks = Checks()
+    expect = checks.expect
+
+    head = alembic_head()
+    expect(f"SCHEMA_VERSION is the Alembic head ({SCHEMA_VERSION}, head {head})", SCHEMA_VERSION == head)
+
+    medians = {}
+    for mode in ("check", "create_all"):
+        results = run_samples({**env, "SCHEMA_STARTUP": mode}, args.samples)
+        medians[mode] = {key: statistics.median(r[key] for r in results)
+                         for key in ("import_ms", "startup_ms", "first_request_ms", "process_ms")}
+        m = medians[mode]
+        print(
+            f"{mode:<11} import {m['import_ms']:7.1f}ms  startup {m['startup_ms']:7.1f}ms  "
+            f"first request {m['first_request_ms']:7.1f}ms  whole process {m['process_ms']:7.1f}ms"
+        )
+        if mode == "check":
+            queries = {r["schema_queries"] for r in results}
+            ddl = {r["ddl_statements"] for r in results}
+            expect(f"check: one schema version query per database, no DDL ({queries} queries, {ddl} DDL)",
+                   queries == {1} and ddl == {0})
+            loaded = sorted({name for r in results for name in r["deferred_loaded"]})
+            expect(f"nothing in {DEFERRED_MODULES} is imported with the app ({loaded})", not loaded)
+
+    check = medians["check"]
+    print(f"      (create_all instead of check costs {medians['create_all']['startup_ms'] - check['startup_ms']:+.1f}ms per worker)")
+    for key, budget in (("import_ms", args.max_import_ms), ("startup_ms", args.max_startup_ms),
+                        ("first_request_ms", args.max_first_request_ms)):
+        expect(f"median {key[:-3].replace('_', ' ')} {check[key]:.1f}ms within {budget:.0f}ms", check[key] <= budget)
+
+    return checks.report("cold start within budget")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--sample"]:
+        print(json.dumps(asyncio.run(sample())))
+        sys.exit(0)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=5, help="fresh processes per schema mode (median reported)")
+    parser.add_argument("--max-import-ms", type=float, default=1200, help="budget for `import app.main`")
+    parser.add_argument("--max-startup-ms", type=float, default=100, help="budget for the startup handlers")
+    parser.add_argument("--max-first-request-ms", type=float, default=250, help="budget for the first login + /auth/me")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+"""Benchmark: `/auth/me` latency while a login storm is running.
+
+Logins spend ~250ms in bcrypt. If that work ran on the event loop every other
+request on the worker would queue behind it; with the hashing pool `/auth/me`
+latency should stay roughly where it is on an idle server.
+
+The app runs in-process over an ASGI transport against a throwaway SQLite DB.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/bench_login_storm.py --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# Point the app at a scratch database before any app module is imported
+_tmpdir = tempfile.mkdtemp(prefix="bench-login-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+import httpx  # noqa: E402
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+EMAIL = "storm@example.com"
+PASSWORD = "password123"
+
+
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        tenant = Tenant(name="Bench")
+        session.add(tenant)
+        session.commit()
+        user = User(email=EMAIL, name="Storm", hashed_password=get_password_hash(PASSWORD), tenant_id=tenant.id)
+        session.add(user)
+        session.commit()
+        return create_access_token({"sub": user.email, "tenant_id": user.tenant_id})
+    finally:
+        session.close()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(label, samples):
+    ms = [s * 1000 for s in samples]
+    print(
+        f"{label:<14} n={len(ms):<6} p50={percentile(ms, 50):7.2f}ms "
+        f"p99={percentile(ms, 99):7.2f}ms max={max(ms):7.2f}ms mean={statistics.mean(ms):7.2f}ms"
+    )
+
+
+async def probe_me(client, token, stop_at):
+    headers = {"Authorization": f"Bearer {token}"}
+    samples = []
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        r = await client.get("/api/v1/auth/me", headers=headers)
+        samples.append(time.perf_counter() - start)
+        r.raise_for_status()
+        await asyncio.sleep(0.005)
+    return samples
+
+
+async def login_loop(client, stop_at, counters):
+    payload = {"email": EMAIL, "password": PASSWORD}
+    while time.perf_counter() < stop_at:
+        r = await client.post("/api/v1/auth/login", json=payload)
+        counters[r.status_code] = counters.get(r.status_code, 0) + 1
+
+
+async def main(concurrency, duration):
+    token = setup_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = await probe_me(client, token, time.perf_counter() + duration / 2)
+
+        counters = {}
+        stop_at = time.perf_counter() + duration
+        storm = [asyncio.create_task(login_loop(client, stop_at, counters)) for _ in range(concurrency)]
+        busy = await probe_me(client, token, stop_at)
+        await asyncio.gather(*storm)
+
+    report("idle /me", idle)
+    report("storm /me", busy)
+    print("login responses:", dict(sorted(counters.items())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="storm duration in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.duration))
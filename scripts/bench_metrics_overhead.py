@@ -0,0 +1,123 @@
+"""Benchmark: per-request cost of the Prometheus metrics middleware.
+
+Builds the app's middleware stack twice, with and without `MetricsMiddleware`,
+over the same router and DB. Both stacks are driven with raw ASGI calls so the
+harness adds as little as possible, and rounds alternate between them to
+cancel out drift. Uses the cheapest authenticated routes (`/auth/me` with a
+cached principal, `GET /users/{id}`), where relative overhead is largest.
+
+Exits non-zero if the median overhead exceeds `--max-overhead` (default 5%).
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/bench_metrics_overhead.py --requests 2000 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Point the app at a scratch database before any app module is imported
+_tmpdir = tempfile.mkdtemp(prefix="bench-metrics-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["METRICS_ENABLED"] = "true"
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.metrics import MetricsMiddleware  # noqa: E402
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def setup_db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        tenant = Tenant(name="Bench")
+        session.add(tenant)
+        session.commit()
+        user = User(email="bench@example.com", hashed_password=get_password_hash("password123"), tenant_id=tenant.id)
+        session.add(user)
+        session.commit()
+        return user.id, create_access_token({"sub": user.email, "tenant_id": user.tenant_id})
+    finally:
+        session.close()
+
+
+async def call(asgi, path, token):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await asgi(scope, receive, send)
+    assert status == 200, (path, status)
+
+
+async def per_request_us(asgi, path, token, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        await call(asgi, path, token)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def main(n_requests, rounds, max_overhead):
+    user_id, token = setup_db()
+
+    with_metrics = app.build_middleware_stack()
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not MetricsMiddleware]
+    without_metrics = app.build_middleware_stack()
+
+    worst = 0.0
+    for path in ("/api/v1/auth/me", f"/api/v1/users/{user_id}"):
+        # Warm caches and the principal cache on both stacks
+        await per_request_us(with_metrics, path, token, 50)
+        await per_request_us(without_metrics, path, token, 50)
+        on, off = [], []
+        for _ in range(rounds):
+            off.append(await per_request_us(without_metrics, path, token, n_requests))
+            on.append(await per_request_us(with_metrics, path, token, n_requests))
+        on_us, off_us = statistics.median(on), statistics.median(off)
+        overhead = on_us / off_us - 1
+        worst = max(worst, overhead)
+        print(
+            f"{path:<24} without {off_us:8.1f}us  with {on_us:8.1f}us  "
+            f"delta {on_us - off_us:6.1f}us  overhead {overhead:+6.2%}"
+        )
+
+    if worst > max_overhead:
+        print(f"FAIL: metrics overhead {worst:.2%} exceeds {max_overhead:.0%}")
+        return 1
+    print(f"OK: metrics overhead within {max_overhead:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000, help="requests per round and variant")
+    parser.add_argument("--rounds", type=int, default=7, help="alternating rounds (median reported)")
+    parser.add_argument("--max-overhead", type=float, default=0.05, help="allowed overhead, 0.05 = 5%%")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.requests, args.rounds, args.max_overhead)))
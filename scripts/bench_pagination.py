@@ -0,0 +1,122 @@
+"""Benchmark: offset vs keyset (cursor) paging on `GET /users/` at increasing depth.
+
+Seeds one tenant with `--users` rows in a throwaway SQLite DB, then times the
+same page fetched with `?skip=N` and with `?after=<cursor>`. Offset paging has
+to walk and discard N rows; the cursor seeks straight to the page through the
+(tenant_id, id) index, so its latency should stay flat as N grows.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/bench_pagination.py --users 500000 --limit 100
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# Point the app at a scratch database before any app module is imported
+_tmpdir = tempfile.mkdtemp(prefix="bench-pagination-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+
+import httpx  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.core.database import Base, engine  # noqa: E402
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor  # noqa: E402
+from app.core.security import create_access_token, get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+TENANT_ID = 1
+
+
+def seed(n_users, batch=20000):
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash("password123")
+    with engine.begin() as conn:
+        conn.execute(insert(Tenant), [{"id": TENANT_ID, "name": "Bench"}, {"id": 2, "name": "Other"}])
+    for start in range(0, n_users, batch):
+        rows = [
+            {
+                "email": f"user{i}@example.com",
+                "name": f"User {i}",
+                "hashed_password": hashed,
+                # Interleave a second tenant so the tenant filter has work to do
+                "tenant_id": TENANT_ID if i % 4 else 2,
+            }
+            for i in range(start, min(start + batch, n_users))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(User), rows)
+    return create_access_token({"sub": "user1@example.com", "tenant_id": TENANT_ID})
+
+
+async def timed_get(client, url, headers, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = await client.get(url, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+    return statistics.median(samples), r
+
+
+def timed_sql(stmt, repeat):
+    samples = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(stmt).all()
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def main(n_users, limit, repeat):
+    t0 = time.perf_counter()
+    token = seed(n_users)
+    print(f"seeded {n_users} users in {time.perf_counter() - t0:.1f}s")
+    headers = {"Authorization": f"Bearer {token}"}
+    tenant_rows = sum(1 for i in range(n_users) if i % 4)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the principal cache so auth is not part of the measurement
+        await client.get("/api/v1/users/?limit=1", headers=headers)
+        print(
+            f"{'depth':>10} {'http offset':>12} {'http cursor':>12} "
+            f"{'sql offset':>11} {'sql cursor':>11} {'sql speedup':>12}"
+        )
+        depth = limit
+        while depth < tenant_rows:
+            offset_ms, offset_resp = await timed_get(
+                client, f"/api/v1/users/?skip={depth}&limit={limit}", headers, repeat
+            )
+            # Cursor pointing at the row just before this page
+            previous = (await client.get(f"/api/v1/users/?skip={depth - 1}&limit=1", headers=headers)).json()[0]
+            cursor = encode_cursor({"tenant_id": TENANT_ID, "id": previous["id"]})
+            cursor_ms, cursor_resp = await timed_get(
+                client, f"/api/v1/users/?after={cursor}&limit={limit}", headers, repeat
+            )
+            assert offset_resp.json() == cursor_resp.json()
+            assert offset_resp.headers.get(NEXT_CURSOR_HEADER) == cursor_resp.headers.get(NEXT_CURSOR_HEADER)
+
+            # The same two statements without the HTTP/serialization overhead
+            base = select(User).where(User.tenant_id == TENANT_ID).order_by(User.id).limit(limit)
+            sql_offset_ms = timed_sql(base.offset(depth), repeat)
+            sql_cursor_ms = timed_sql(base.where(User.id > previous["id"]), repeat)
+            print(
+                f"{depth:>10} {offset_ms:>10.2f}ms {cursor_ms:>10.2f}ms "
+                f"{sql_offset_ms:>9.2f}ms {sql_cursor_ms:>9.2f}ms {sql_offset_ms / sql_cursor_ms:>11.1f}x"
+            )
+            depth *= 10
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200000, help="rows to seed")
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per measurement (median reported)")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.limit, args.repeat))
@@ -0,0 +1,131 @@
+"""Benchmark: list response serialization, ORM + response_model vs column rows + orjson.
+
+Seeds one tenant in a throwaway SQLite DB and times 100- and 1,000-row user
+lists two ways:
+- `serialize`: just fetch + encode, outside HTTP. The old path loads `User`
+  ORM objects and runs them through a `TypeAdapter(List[User])` (validate
+  from attributes, dump to JSON), which is what FastAPI does for
+  `response_model`. The new path selects the schema's columns and hands the
+  row dicts to orjson.
+- `http`: the full request over ASGI, `GET /users/` against a copy of the
+  old route mounted next to it for the comparison.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/bench_serialization.py --sizes 100 1000 --repeat 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+# Point the app at a scratch database before any app module is imported
+_tmpdir = tempfile.mkdtemp(prefix="bench-serialization-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["METRICS_ENABLED"] = "false"
+os.environ["SQL_TIMING_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.api.v1.user import USER_COLUMNS  # noqa: E402
+from app.core.database import Base, SessionLocal, engine, get_session  # noqa: E402
+from app.core.security import create_access_token, get_current_active_user, get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.user import User as UserSchema  # noqa: E402
+
+USER_LIST = TypeAdapter(List[UserSchema])
+
+
+@app.get("/bench/orm-users", response_model=List[UserSchema])
+async def orm_users(limit: int = 100, db=Depends(get_session), current_user=Depends(get_current_active_user)):
+    """The pre-change `GET /users/`: ORM objects validated through `response_model`."""
+    query = select(User).where(User.tenant_id == current_user.tenant_id).order_by(User.id).limit(limit)
+    return (await db.scalars(query)).all()
+
+
+def seed(n_users):
+    Base.metadata.create_all(bind=engine)
+    hashed = get_password_hash("password123")
+    with engine.begin() as conn:
+        conn.execute(insert(Tenant), [{"id": 1, "name": "Bench"}])
+        conn.execute(
+            insert(User),
+            [{"email": f"user{i}@example.com", "name": f"User {i}", "hashed_password": hashed, "tenant_id": 1}
+             for i in range(n_users)],
+        )
+    return create_access_token({"sub": "user0@example.com", "tenant_id": 1})
+
+
+def per_call_us(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def bench_serialize(size, repeat):
+    session = SessionLocal()
+    try:
+        def orm():
+            users = session.scalars(select(User).where(User.tenant_id == 1).order_by(User.id).limit(size)).all()
+            body = USER_LIST.dump_json(USER_LIST.validate_python(users, from_attributes=True))
+            session.expunge_all()
+            return body
+
+        def rows():
+            result = session.execute(select(*USER_COLUMNS).where(User.tenant_id == 1).order_by(User.id).limit(size))
+            return orjson.dumps([row._asdict() for row in result])
+
+        assert orjson.loads(orm()) == orjson.loads(rows())
+        return per_call_us(orm, repeat), per_call_us(rows, repeat)
+    finally:
+        session.close()
+
+
+async def bench_http(client, size, headers, repeat):
+    async def timed(url):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            r = await client.get(url, headers=headers)
+            samples.append(time.perf_counter() - start)
+            assert r.status_code == 200, r.text
+        return statistics.median(samples) * 1e6
+
+    old = await timed(f"/bench/orm-users?limit={size}")
+    new = await timed(f"/api/v1/users/?limit={size}")
+    return old, new
+
+
+async def main(sizes, repeat):
+    token = seed(max(sizes))
+    headers = {"Authorization": f"Bearer {token}"}
+    print(f"{'':<10} {'rows':>6} {'orm+model':>12} {'rows+orjson':>12} {'speedup':>8}")
+    for size in sizes:
+        old, new = bench_serialize(size, repeat)
+        print(f"{'serialize':<10} {size:>6} {old:>10.0f}us {new:>10.0f}us {old / new:>7.2f}x")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await bench_http(client, 10, headers, 20)  # warm the principal cache and routes
+        for size in sizes:
+            old, new = await bench_http(client, size, headers, repeat)
+            print(f"{'http':<10} {size:>6} {old:>10.0f}us {new:>10.0f}us {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="rows per response")
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per case (median reported)")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
@@ -0,0 +1,137 @@
+"""Benchmark: per-call overhead of the hot lookups, rebuilt per call vs shared statements.
+
+Seeds one tenant in a throwaway SQLite DB and times each lookup in
+`app/services/repository.py` three ways:
+- `inline`: a fresh `select()` per call, as the routes built them before
+- `lambda`: `lambda_stmt`, which caches the construction by code location
+- `shared`: the module-level statement with `bindparam`s, as routes use now
+
+Two measurements per lookup:
+- `prepare`: only what runs in Python before the compiled-cache lookup
+  (building the statement and its cache key); no DB
+- `execute`: the whole call through a sync `Session`, DB round trip included
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/bench_statements.py --repeat 5000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Point the app at a scratch database before any app module is imported
+_tmpdir = tempfile.mkdtemp(prefix="bench-statements-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["SQL_TIMING_ENABLED"] = "false"
+
+from sqlalchemy import insert, lambda_stmt, select  # noqa: E402
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.responses import schema_columns  # noqa: E402
+from app.models.tenant import TENANT_ACTIVE, Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.user import User as UserSchema  # noqa: E402
+from app.services import repository  # noqa: E402
+
+USER_COLUMNS = schema_columns(UserSchema, User)
+EMAIL = "user500@example.com"
+USER_ID, TENANT_ID = 500, 1
+NAME = "Bench"
+
+# name -> (inline builder, lambda builder, shared statement, its parameters)
+LOOKUPS = {
+    "active user by email": (
+        lambda: select(User).join(Tenant, Tenant.id == User.tenant_id).where(User.email == EMAIL, Tenant.status == TENANT_ACTIVE),
+        lambda: lambda_stmt(
+            lambda: select(User).join(Tenant, Tenant.id == User.tenant_id).where(User.email == EMAIL, Tenant.status == TENANT_ACTIVE)
+        ),
+        repository.ACTIVE_USER_BY_EMAIL,
+        {"email": EMAIL},
+    ),
+    "user by email": (
+        lambda: select(User).where(User.email == EMAIL),
+        lambda: lambda_stmt(lambda: select(User).where(User.email == EMAIL)),
+        repository.USER_BY_EMAIL,
+        {"email": EMAIL},
+    ),
+    "user by id+tenant": (
+        lambda: select(User).where(User.id == USER_ID, User.tenant_id == TENANT_ID),
+        lambda: lambda_stmt(lambda: select(User).where(User.id == USER_ID, User.tenant_id == TENANT_ID)),
+        repository.TENANT_USER,
+        {"user_id": USER_ID, "tenant_id": TENANT_ID},
+    ),
+    "user row by id+tenant": (
+        lambda: select(*USER_COLUMNS).where(User.id == USER_ID, User.tenant_id == TENANT_ID),
+        lambda: lambda_stmt(lambda: select(*USER_COLUMNS).where(User.id == USER_ID, User.tenant_id == TENANT_ID)),
+        repository.TENANT_USER_ROW,
+        {"user_id": USER_ID, "tenant_id": TENANT_ID},
+    ),
+    "tenant by name": (
+        lambda: select(Tenant).where(Tenant.name == NAME),
+        lambda: lambda_stmt(lambda: select(Tenant).where(Tenant.name == NAME)),
+        repository.TENANT_BY_NAME,
+        {"name": NAME},
+    ),
+}
+
+
+def seed(n_users):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Tenant), [{"id": TENANT_ID, "name": NAME}])
+        conn.execute(
+            insert(User),
+            [{"email": f"user{i}@example.com", "hashed_password": "x", "tenant_id": TENANT_ID} for i in range(1, n_users + 1)],
+        )
+
+
+def per_call_us(fn, repeat):
+    for _ in range(min(repeat, 200)):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def main(repeat):
+    seed(1000)
+    session = SessionLocal()
+    print(f"{'lookup':<22} {'':<8} {'inline':>9} {'lambda':>9} {'shared':>9} {'saved':>8}")
+    try:
+        for name, (inline, via_lambda, shared, params) in LOOKUPS.items():
+            expected = session.execute(inline()).all()
+            assert session.execute(via_lambda()).all() == expected
+            assert session.execute(shared, params).all() == expected, name
+            session.expunge_all()
+
+            prepare = [
+                per_call_us(lambda: inline()._generate_cache_key(), repeat),
+                per_call_us(lambda: via_lambda()._generate_cache_key(), repeat),
+                per_call_us(lambda: shared._generate_cache_key(), repeat),
+            ]
+
+            def run(build=None):
+                result = session.execute(build()) if build else session.execute(shared, params)
+                result.all()
+                session.expunge_all()
+
+            execute = [
+                per_call_us(lambda: run(inline), repeat),
+                per_call_us(lambda: run(via_lambda), repeat),
+                per_call_us(run, repeat),
+            ]
+            for label, (old, lam, new) in (("prepare", prepare), ("execute", execute)):
+                print(f"{name:<22} {label:<8} {old:>7.1f}us {lam:>7.1f}us {new:>7.1f}us {old - new:>6.1f}us")
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5000, help="timed calls per case (median reported)")
+    args = parser.parse_args()
+    main(args.repeat)
@@ -0,0 +1,54 @@
+"""Pick password hashing parameters that hit a target latency on this host.
+
+Measures hash time for increasing bcrypt rounds (or argon2id time cost, at a
+fixed memory cost and parallelism) and prints the strongest setting that
+stays within `--target-ms`, as environment variables to pin in `.env`.
+Run it on the production hardware; the result is per-hash on an idle core, so
+leave headroom for concurrent logins.
+
+Existing hashes made with other parameters keep working and are upgraded on
+each user's next successful login.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/calibrate_password_hash.py --target-ms 250
+    PYTHONPATH=. .venv/bin/python scripts/calibrate_password_hash.py --scheme argon2id --memory-kib 65536
+"""
+import argparse
+import sys
+from dataclasses import replace
+
+from app.core.password_hash import ARGON2ID, SCHEMES, HashPolicy, calibrate, time_hash
+
+
+def main(args) -> int:
+    base = HashPolicy(scheme=args.scheme, argon2_memory_cost=args.memory_kib, argon2_parallelism=args.parallelism)
+    policy, elapsed = calibrate(args.target_ms, base)
+    print(f"{policy.describe()}: {elapsed * 1000:.0f}ms per hash (target {args.target_ms:.0f}ms)")
+    if elapsed * 1000 > args.target_ms:
+        print("warning: even the minimum cost is over target on this host")
+
+    # The next step up, for context
+    if policy.scheme == ARGON2ID:
+        stronger = replace(policy, argon2_time_cost=policy.argon2_time_cost + 1)
+    else:
+        stronger = replace(policy, bcrypt_rounds=policy.bcrypt_rounds + 1)
+    print(f"{stronger.describe()}: {time_hash(stronger, samples=1) * 1000:.0f}ms per hash")
+
+    print("\n# .env")
+    print(f"PASSWORD_HASH_SCHEME={policy.scheme}")
+    if policy.scheme == ARGON2ID:
+        print(f"ARGON2_TIME_COST={policy.argon2_time_cost}")
+        print(f"ARGON2_MEMORY_COST_KIB={policy.argon2_memory_cost}")
+        print(f"ARGON2_PARALLELISM={policy.argon2_parallelism}")
+    else:
+        print(f"BCRYPT_ROUNDS={policy.bcrypt_rounds}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250, help="max time for one hash")
+    parser.add_argument("--scheme", choices=SCHEMES, default="bcrypt")
+    parser.add_argument("--memory-kib", type=int, default=19456, help="argon2id memory cost")
+    parser.add_argument("--parallelism", type=int, default=1, help="argon2id lanes")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,162 @@
+"""Check conditional requests: ETags, If-None-Match and If-Match.
+
+Drives the app in-process against a throwaway SQLite DB with
+PRINCIPAL_CACHE_SYNC on. Checks that:
+- `GET /users/{id}`, `/tenants/{id}`, `/auth/me` and the list routes carry a
+  strong ETag, and a repeat with `If-None-Match` gets a 304: with no query on
+  the single-object routes, with just the page query on the lists
+- a change through the API, through another worker (a direct DB write plus
+  its `principal_invalidations` row) or by a tenant purge makes the old ETag
+  miss again; a tenant rename leaves its users' access tokens valid
+- `PUT` with the current `If-Match` applies and returns the new ETag; a stale
+  or weak one gets 412 and changes nothing; `DELETE` honours it too
+- two sessions updating the same row: the second to flush gets the ORM's
+  version check failure instead of silently overwriting
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_etags.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_etags.py
+"""
+import asyncio
+import sys
+
+from checklib import API, PASSWORD, Checks, bearer, client, login, queries_of, scratch_env, shutdown, signup
+
+SYNC_INTERVAL = 2
+scratch_env(
+    "etags",
+    SQL_TIMING_ENABLED="true",
+    PRINCIPAL_CACHE_SYNC="true",
+    PRINCIPAL_CACHE_SYNC_INTERVAL_SECONDS=SYNC_INTERVAL,
+    BCRYPT_ROUNDS=4,
+)
+
+from sqlalchemy import update  # noqa: E402
+from sqlalchemy.orm.exc import StaleDataError  # noqa: E402
+
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.principal_invalidation import PrincipalInvalidation  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        for email, tenant in (("admin@example.com", "Ops"), ("other@example.com", "Other")):
+            r = await signup(http, email, tenant)
+            assert r.status_code == 201, r.text
+        r = await login(http, "admin@example.com")
+        auth = bearer(r.json()["access_token"])
+        r = await login(http, "other@example.com")
+        other = bearer(r.json()["access_token"])
+        r = await http.post(f"{API}/users/", headers=auth, json={"email": "u1@example.com", "password": PASSWORD, "tenant_id": 0})
+        user_id = r.json()["id"]
+
+        async def conditional(url, etag, headers=None):
+            r = await http.get(f"{API}{url}", headers={**(headers or auth), "If-None-Match": etag})
+            return r.status_code, queries_of(r), r
+
+        # If-None-Match on every tagged GET; lists hash the page, so they still run its query
+        for url, budget in ((f"/users/{user_id}", 0), ("/tenants/1", 0), ("/auth/me", 0), ("/users/", 1), ("/tenants/", 1)):
+            r = await http.get(f"{API}{url}", headers=auth)
+            etag = r.headers.get("ETag", "")
+            expect(f"GET {url} carries a strong ETag ({etag})", r.status_code == 200 and etag.startswith('"'))
+            code, queries, r = await conditional(url, etag)
+            expect(f"GET {url} with it: 304, {queries} queries", code == 304 and not r.content and queries <= budget)
+            code, _, _ = await conditional(url, f'W/{etag}, "other"')
+            expect(f"GET {url} matches a weak or listed tag ({code})", code == 304)
+
+        r = await http.get(f"{API}/users/{user_id}", headers=auth)
+        user_etag = r.headers["ETag"]
+        code, _, _ = await conditional(f"/users/{user_id}", user_etag, headers=other)
+        expect(f"another tenant's token never gets a 304 for the user ({code})", code == 404)
+
+        r = await http.get(f"{API}/users/", headers=auth)
+        list_etag = r.headers["ETag"]
+        await http.post(f"{API}/users/", headers=auth, json={"email": "u2@example.com", "password": PASSWORD, "tenant_id": 0})
+        code, _, _ = await conditional("/users/", list_etag)
+        expect(f"list ETag misses after a new user ({code})", code == 200)
+
+        # If-Match
+        r = await http.put(f"{API}/users/{user_id}", headers={**auth, "If-Match": user_etag}, json={"is_active": False})
+        new_etag = r.headers.get("ETag")
+        expect(f"PUT with the current If-Match applies ({r.status_code}, {new_etag})", r.status_code == 200 and new_etag != user_etag)
+        code, _, r = await conditional(f"/users/{user_id}", user_etag)
+        expect(f"the old ETag misses after the update ({code})", code == 200 and r.headers["ETag"] == new_etag)
+        r = await http.put(f"{API}/users/{user_id}", headers={**auth, "If-Match": user_etag}, json={"is_active": True})
+        expect(f"PUT with a stale If-Match gets 412 ({r.status_code})", r.status_code == 412)
+        r = await http.put(f"{API}/users/{user_id}", headers={**auth, "If-Match": f"W/{new_etag}"}, json={"is_active": True})
+        expect(f"PUT with a weak If-Match gets 412 ({r.status_code})", r.status_code == 412)
+        r = await http.get(f"{API}/users/{user_id}", headers=auth)
+        expect("a refused PUT changed nothing", r.json()["is_active"] is False and r.headers["ETag"] == new_etag)
+        r = await http.delete(f"{API}/users/{user_id}", headers={**auth, "If-Match": user_etag})
+        expect(f"DELETE with a stale If-Match gets 412 ({r.status_code})", r.status_code == 412)
+
+        r = await http.get(f"{API}/tenants/1", headers=auth)
+        tenant_etag = r.headers["ETag"]
+        r = await http.put(f"{API}/tenants/1", headers={**auth, "If-Match": tenant_etag}, json={"name": "Ops 2"})
+        expect(f"tenant PUT with If-Match applies ({r.status_code})", r.status_code == 200 and r.headers["ETag"] != tenant_etag)
+        # No token claim carries the tenant's name, so a rename keeps its users' tokens valid
+        r = await http.get(f"{API}/tenants/1", headers=auth)
+        expect(f"a tenant rename doesn't outdate its access tokens ({r.status_code})", r.status_code == 200)
+        code, _, r = await conditional("/tenants/1", tenant_etag)
+        expect(f"tenant's old ETag misses ({code}, {r.json().get('name') if code == 200 else ''})", code == 200)
+
+        # A write by another worker reaches this one through principal_invalidations
+        r = await http.get(f"{API}/users/{user_id}", headers=auth)
+        user_etag = r.headers["ETag"]
+        with SessionLocal() as session:
+            session.execute(update(User).where(User.id == user_id).values(name="Renamed", version=User.version + 1))
+            session.add(PrincipalInvalidation(user_id=user_id))
+            session.commit()
+        await asyncio.sleep(SYNC_INTERVAL)
+        code, _, _ = await conditional(f"/users/{user_id}", user_etag)
+        expect(f"another worker's update makes the ETag miss ({code})", code == 200)
+
+        # ... and a tenant rename by another worker through a versions-only row
+        r = await http.get(f"{API}/tenants/1", headers=auth)
+        tenant_etag = r.headers["ETag"]
+        with SessionLocal() as session:
+            session.execute(update(Tenant).where(Tenant.id == 1).values(name="Ops 3", version=Tenant.version + 1))
+            session.add(PrincipalInvalidation(tenant_id=1, versions_only=True))
+            session.commit()
+        await asyncio.sleep(SYNC_INTERVAL)
+        code, _, r = await conditional("/tenants/1", tenant_etag)
+        expect(f"another worker's tenant rename makes the ETag miss, tokens still valid ({code})", code == 200)
+
+        # Starting a purge changes the tenant's status, and so its version
+        r = await http.get(f"{API}/tenants/2", headers=auth)
+        tenant_etag = r.headers["ETag"]
+        await http.delete(f"{API}/tenants/2", headers=auth)
+        code, _, r = await conditional("/tenants/2", tenant_etag)
+        expect(f"purge start makes the tenant's ETag miss ({code})", code in (200, 404))
+
+        r = await http.get("/cache-stats", headers=auth)
+        expect(f"version cache reports hits ({r.json()['version_cache']['hits']})", r.json()["version_cache"]["hits"] > 0)
+
+    # Lost updates: the version column makes the later of two flushes fail
+    with SessionLocal() as first, SessionLocal() as second:
+        a = first.get(User, user_id)
+        b = second.get(User, user_id)
+        a.name = "first"
+        first.commit()
+        b.name = "second"
+        try:
+            second.commit()
+            expect("concurrent ORM update is refused", False)
+        except StaleDataError:
+            expect("concurrent ORM update is refused", True)
+
+    await shutdown()
+    return checks.report("conditional requests honoured")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
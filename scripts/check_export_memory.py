@@ -0,0 +1,130 @@
+"""Check that `GET /users/export` streams in constant memory.
+
+Exports a small tenant and a large one from a throwaway SQLite DB and asserts
+the process's peak RSS grows by no more than `--budget-mb` between the two.
+The app is driven directly over ASGI with a `send` that discards body chunks,
+because test clients buffer the whole response and would measure themselves.
+
+Exits non-zero when the budget is exceeded.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_export_memory.py --users 1000000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+
+from checklib import scratch_env
+
+scratch_env("export")
+# Memory-mapped DB pages and a large page cache count towards RSS and scale with
+# the file, which would hide what the export itself allocates
+os.environ.setdefault("SQLITE_MMAP_SIZE", "0")
+os.environ.setdefault("SQLITE_CACHE_SIZE", "-2000")
+
+from sqlalchemy import text  # noqa: E402
+
+from app.core.database import Base, engine  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+
+SMALL_TENANT, LARGE_TENANT = 1, 2
+
+
+def seed(small, large):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO tenants (id, name) VALUES (1, 'small'), (2, 'large')"))
+        # Generate rows inside SQLite so seeding doesn't raise this process's peak RSS
+        conn.execute(
+            text(
+                "WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :total) "
+                "INSERT INTO users (email, name, hashed_password, tenant_id, role, is_superuser, is_active) "
+                "SELECT 'user' || n || '@example.com', 'User ' || n, 'x', "
+                "CASE WHEN n <= :small THEN 1 ELSE 2 END, 'user', 0, 1 FROM seq"
+            ),
+            {"total": small + large, "small": small},
+        )
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def export(tenant_id, email, fmt):
+    token = create_access_token({"sub": email, "tenant_id": tenant_id})
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/users/export",
+        "raw_path": b"/api/v1/users/export",
+        "query_string": f"format={fmt}".encode(),
+        "root_path": "",
+        "headers": [(b"host", b"check"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("check", 80),
+    }
+    received = {"status": None, "bytes": 0, "lines": 0}
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        # Deliver the (empty) request once, then block like a client that stays connected
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            received["bytes"] += len(body)
+            received["lines"] += body.count(b"\n")
+
+    await app(scope, receive, send)
+    return received
+
+
+async def main(small, large, fmt, budget_mb):
+    seed(small, large)
+
+    # Each export authenticates as the first seeded user of its tenant
+    result = await export(SMALL_TENANT, "user1@example.com", fmt)
+    assert result["status"] == 200, result
+    baseline = peak_rss_mb()
+    print(f"small tenant: {small:>9} rows, {result['bytes'] / 1e6:8.1f} MB streamed, peak RSS {baseline:7.1f} MB")
+
+    result = await export(LARGE_TENANT, f"user{small + 1}@example.com", fmt)
+    assert result["status"] == 200, result
+    expected_lines = large + (1 if fmt == "csv" else 0)
+    assert result["lines"] == expected_lines, (result["lines"], expected_lines)
+    peak = peak_rss_mb()
+    print(f"large tenant: {large:>9} rows, {result['bytes'] / 1e6:8.1f} MB streamed, peak RSS {peak:7.1f} MB")
+
+    growth = peak - baseline
+    print(f"peak RSS growth: {growth:.1f} MB (budget {budget_mb} MB)")
+    if growth > budget_mb:
+        print("FAIL: export memory grows with tenant size")
+        return 1
+    print("OK: export memory is bounded")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small", type=int, default=1000, help="rows in the small tenant")
+    parser.add_argument("--users", type=int, default=500000, help="rows in the large tenant")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--budget-mb", type=float, default=32.0, help="allowed peak RSS growth")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.small, args.users, args.format, args.budget_mb)))
@@ -0,0 +1,136 @@
+"""Check asymmetric token signing, key rotation and /.well-known/jwks.json.
+
+Drives the app in-process against a throwaway SQLite DB and a keys directory
+holding a retired key (public half only), the current RSA key and a spare EC
+key. Checks that:
+- tokens are signed with the current key and carry its `kid`
+- the JWKS lists every key's public half, with Cache-Control and an ETag,
+  and a token verifies against it alone, as another service would
+- tokens signed by another key of the set still verify (rotation), while an
+  unknown `kid`, a missing `kid`, a shared-secret token and an HS256 token
+  keyed with the public key are refused
+- signing and verifying reuse the parsed keys instead of parsing a PEM per token
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_jwks.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_jwks.py
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from checklib import API, Checks, client, login, scratch_env, shutdown, signup
+
+# Point the app at a scratch database and keys directory before any app module is imported
+_tmpdir = scratch_env("jwks", JWT_SIGNING_KID="current", BCRYPT_ROUNDS=4)
+_keys = os.path.join(_tmpdir, "keys")
+_generate = [sys.executable, os.path.join(os.path.dirname(__file__), "generate_signing_key.py"), "--dir", _keys]
+for args in (["--kid", "retired"], ["--kid", "retired", "--public"], ["--kid", "current"], ["--kid", "spare", "--type", "ec"]):
+    subprocess.run(_generate + args, check=True, stdout=subprocess.DEVNULL)
+os.environ["JWT_KEYS_DIR"] = _keys
+
+from fastapi import HTTPException  # noqa: E402
+from jose import jwk, jwt  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, engine  # noqa: E402
+from app.core.security import create_access_token, decode_access_token  # noqa: E402
+from app.core.signing_keys import key_set  # noqa: E402
+from app.main import app  # noqa: E402
+
+EMAIL = "admin@example.com"
+
+
+def claims():
+    return {"sub": EMAIL, "tenant_id": 1, "exp": datetime.utcnow() + timedelta(minutes=5)}
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        r = await signup(http, EMAIL, "Ops")
+        assert r.status_code == 201, r.text
+        r = await login(http, EMAIL)
+        token = r.json()["access_token"]
+        header = jwt.get_unverified_header(token)
+        expect(f"tokens are signed with the current key ({header})", header == {"alg": "RS256", "typ": "JWT", "kid": "current"})
+
+        async def me(token):
+            return (await http.get(f"{API}/auth/me", headers={"Authorization": f"Bearer {token}"})).status_code
+
+        expect("the token authenticates", await me(token) == 200)
+
+        # The JWKS, as another service would fetch and use it
+        r = await http.get("/.well-known/jwks.json")
+        keys = {key["kid"]: key for key in r.json()["keys"]}
+        expect(f"JWKS lists every key ({sorted(keys)})", sorted(keys) == ["current", "retired", "spare"])
+        expect("JWKS holds public halves only", not any("d" in key for key in keys.values()))
+        expect(f"JWKS is cacheable ({r.headers.get('cache-control')})",
+               r.headers.get("cache-control") == f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}")
+        etag = r.headers.get("etag", "")
+        r = await http.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+        expect(f"JWKS revalidates with 304 ({r.status_code})", r.status_code == 304 and etag)
+        offline = jwt.decode(token, keys[header["kid"]], algorithms=[keys[header["kid"]]["alg"]])
+        expect("a token verifies against the JWKS alone", offline["sub"] == EMAIL)
+
+        # Rotation: every key of the set verifies, only keys of the set do
+        spare = key_set.get("spare")
+        signed_by_spare = jwt.encode(claims(), spare.key, algorithm=spare.algorithm, headers={"kid": "spare"})
+        expect("a token from another key of the set is accepted", await me(signed_by_spare) == 200)
+        expect("the retired key can't sign", not key_set.get("retired").can_sign)
+        unknown = jwt.encode(claims(), spare.key, algorithm=spare.algorithm, headers={"kid": "gone"})
+        expect("an unknown kid is refused", await me(unknown) == 401)
+        no_kid = jwt.encode(claims(), key_set.signing_key.key, algorithm="RS256")
+        expect("a token without kid is refused", await me(no_kid) == 401)
+        shared = jwt.encode(claims(), settings.SECRET_KEY, algorithm="HS256")
+        expect("a shared-secret token is refused", await me(shared) == 401)
+        with open(os.path.join(_keys, "current.pem"), "rb") as f:
+            private_pem = f.read()
+        public_pem = jwk.construct(private_pem, "RS256").public_key().to_pem()
+        try:
+            confused = jwt.encode(claims(), public_pem.decode(), algorithm="HS256", headers={"kid": "current"})
+            expect("an HS256 token keyed with the public key is refused", await me(confused) == 401)
+        except Exception:
+            # Newer backends refuse to use a PEM as an HMAC secret at all
+            expect("an HS256 token keyed with the public key can't be made", True)
+
+    # Signing and verifying use the parsed keys: no PEM is parsed per token
+    rounds = 200
+    construct, parsed = jwk.construct, []
+    jwk.construct = lambda *args, **kwargs: parsed.append(args) or construct(*args, **kwargs)
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            create_access_token({"sub": EMAIL, "tenant_id": 1})
+        signing = (time.perf_counter() - start) / rounds * 1e6
+        start = time.perf_counter()
+        for _ in range(rounds):
+            decode_access_token(token)
+        verifying = (time.perf_counter() - start) / rounds * 1e6
+    finally:
+        jwk.construct = construct
+    expect(f"no key parsed per token ({len(parsed)} parses; sign {signing:.0f}us, verify {verifying:.0f}us)", not parsed)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        jwt.encode(claims(), private_pem.decode(), algorithm="RS256")
+    print(f"      (signing from the PEM instead: {(time.perf_counter() - start) / rounds * 1e6:.0f}us per token)")
+    try:
+        decode_access_token(unknown)
+        expect("decode_access_token refuses an unknown kid", False)
+    except HTTPException as exc:
+        expect("decode_access_token refuses an unknown kid", exc.status_code == 401)
+
+    await shutdown()
+    return checks.report("tokens are signed per key and verifiable from the JWKS")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,98 @@
+"""Check that each endpoint stays within its SQL query budget.
+
+Drives the app in-process against a throwaway SQLite DB and reads the query
+count every response reports in its `Server-Timing` header. A route going over
+its budget (an N+1 loop, a lost cache, an extra refresh) fails the check.
+Budgets match the current counts; lower one when a route gets cheaper.
+
+Exits non-zero if any endpoint is over budget.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_query_counts.py
+"""
+import asyncio
+import sys
+
+from checklib import API, PASSWORD, client, queries_of, scratch_env, shutdown
+
+scratch_env("query-counts", SQL_TIMING_ENABLED="true")
+
+import httpx  # noqa: E402
+
+from app.core.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def assert_max_queries(response: httpx.Response, budget: int) -> int:
+    """Fail if `response` reports more than `budget` SQL queries; returns the count."""
+    count = queries_of(response)
+    if count > budget:
+        raise QueryBudgetExceeded(
+            f"{response.request.method} {response.request.url.path}: {count} queries, budget {budget}"
+        )
+    return count
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    failures = []
+    async with client(app) as http:
+        async def check(label, budget, method, url, expected_status=200, **kw):
+            r = await http.request(method, API + url, **kw)
+            assert r.status_code == expected_status, (label, r.status_code, r.text)
+            try:
+                count = assert_max_queries(r, budget)
+                print(f"ok    {label:<28} {count:>3} / {budget} queries")
+            except QueryBudgetExceeded as e:
+                print(f"FAIL  {label:<28} {e}")
+                failures.append(label)
+            return r
+
+        signup = {"name": "Admin", "email": "admin@example.com", "password": PASSWORD, "tenant_name": "Q"}
+        await check("POST /auth/signup", 4, "POST", "/auth/signup", 201, json=signup)
+        # The user lookup, then the new refresh token
+        r = await check("POST /auth/login", 2, "POST", "/auth/login", json={"email": signup["email"], "password": PASSWORD})
+        refresh_token = r.json()["refresh_token"]
+        # Claim the refresh token, read the user for the claims, store the next refresh token
+        r = await check("POST /auth/refresh", 3, "POST", "/auth/refresh", json={"refresh_token": refresh_token})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        # The token's claims authorize it, so even the first call runs no query; later ones skip the decode too
+        await check("GET /auth/me (cold)", 0, "GET", "/auth/me", headers=headers)
+        await check("GET /auth/me", 0, "GET", "/auth/me", headers=headers)
+
+        user = {"email": "u1@example.com", "password": PASSWORD, "tenant_id": 0}
+        r = await check("POST /users/", 4, "POST", "/users/", 201, headers=headers, json=user)
+        user_id = r.json()["id"]
+        rows = [{"email": f"bulk{i}@example.com", "password": PASSWORD} for i in range(20)]
+        await check("POST /users/bulk (20 rows)", 3, "POST", "/users/bulk", headers=headers, json=rows)
+        await check("GET /users/", 1, "GET", "/users/?limit=50", headers=headers)
+        r = await check("GET /users/{id}", 1, "GET", f"/users/{user_id}", headers=headers)
+        # A poll with the current ETag is answered from the version cache
+        await check("GET /users/{id} (304)", 0, "GET", f"/users/{user_id}", 304,
+                    headers={**headers, "If-None-Match": r.headers["ETag"]})
+        await check("PUT /users/{id}", 4, "PUT", f"/users/{user_id}", headers=headers, json={"is_active": False})
+        await check("GET /tenants/", 1, "GET", "/tenants/", headers=headers)
+        r = await check("GET /tenants/{id}", 1, "GET", "/tenants/1", headers=headers)
+        await check("GET /tenants/{id} (304)", 0, "GET", "/tenants/1", 304,
+                    headers={**headers, "If-None-Match": r.headers["ETag"]})
+        await check("GET /tenants/stats", 1, "GET", "/tenants/stats", headers=headers)
+        await check("GET /tenants/{id}/stats", 1, "GET", "/tenants/1/stats", headers=headers)
+        await check("DELETE /users/{id}", 3, "DELETE", f"/users/{user_id}", 204, headers=headers)
+        # Last: it revokes the token the checks above use
+        await check("POST /auth/logout", 2, "POST", "/auth/logout", 204, headers=headers)
+
+    await shutdown()
+    if failures:
+        print(f"{len(failures)} endpoint(s) over their query budget")
+        return 1
+    print("OK: all endpoints within their query budgets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,115 @@
+"""Check read-replica routing with SQLite files standing in for replicas.
+
+The "replicas" are snapshots of the primary taken with SQLite's backup API, so
+data written after a snapshot exists only on the primary; which rows a read
+returns shows where it was served from. The replica list also has one URL
+that can't be opened. Checks that:
+- GET requests are spread round-robin over the healthy replicas
+- the unreachable replica is skipped, and reads fall back to the primary when
+  no replica works
+- a client that just wrote reads from the primary for REPLICA_STICKY_SECONDS
+  (by token in this worker, and by cookie), and from replicas afterwards
+- writes always go to the primary
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_read_replicas.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_read_replicas.py
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+from checklib import API, PASSWORD, Checks, bearer, client, scratch_env, shutdown, signup, token_headers
+
+STICKY_SECONDS = 1.0
+
+# Point the app at a scratch primary and replicas before any app module is imported
+_tmpdir = scratch_env("replicas", REPLICA_STICKY_SECONDS=STICKY_SECONDS)
+PRIMARY = f"{_tmpdir}/replicas.db"
+REPLICAS = [f"{_tmpdir}/replica-a.db", f"{_tmpdir}/missing/replica-dead.db", f"{_tmpdir}/replica-b.db"]
+os.environ["DATABASE_REPLICA_URLS"] = ",".join(f"sqlite:///{path}" for path in REPLICAS)
+
+from app.core.database import Base, engine, replica_set  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+def snapshot(path):
+    """Copy the primary's current state to a replica file."""
+    source, target = sqlite3.connect(PRIMARY), sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        r = await signup(http, "admin@example.com", "R")
+        assert r.status_code == 201, r.text
+        headers = await token_headers(http, "admin@example.com")
+        http.cookies.clear()
+
+        async def user_count(request_headers, cookies=None):
+            r = await http.get(f"{API}/users/?limit=1000", headers=request_headers, cookies=cookies)
+            assert r.status_code == 200, r.text
+            return len(r.json())
+
+        async def create_user(email):
+            r = await http.post(
+                f"{API}/users/", headers=headers, json={"email": email, "password": PASSWORD, "tenant_id": 0}
+            )
+            assert r.status_code == 201, r.text
+            return r
+
+        # Replica A has 1 user, replica B has 2, the primary 3
+        snapshot(REPLICAS[0])
+        await create_user("b@example.com")
+        snapshot(REPLICAS[2])
+        time.sleep(STICKY_SECONDS)
+        r = await create_user("primary@example.com")
+        expect("writes set the read-your-writes cookie", "db_primary_until" in r.headers.get("set-cookie", ""))
+        http.cookies.clear()
+
+        # Same token: sticky to the primary
+        counts = [await user_count(headers) for _ in range(4)]
+        expect(f"writer reads its own write from the primary ({counts})", counts == [3] * 4)
+
+        # Another token for the same user: not sticky, round-robin over A and B
+        other = bearer(create_access_token({"sub": "admin@example.com", "tenant_id": 1}))
+        counts = [await user_count(other) for _ in range(6)]
+        expect(f"other clients read from replicas ({counts})", set(counts) == {1, 2})
+        expect("round-robin alternates replicas", all(a != b for a, b in zip(counts, counts[1:])))
+        expect("unreachable replica is skipped", replica_set.available() and 1 not in replica_set.available())
+
+        # The cookie alone pins a client to the primary on any worker
+        until = f"{time.time() + STICKY_SECONDS:.3f}"
+        counts = [await user_count(other, cookies={"db_primary_until": until}) for _ in range(2)]
+        expect(f"cookie pins reads to the primary ({counts})", counts == [3, 3])
+
+        # After the window the writer is back on the replicas
+        time.sleep(STICKY_SECONDS)
+        counts = [await user_count(headers) for _ in range(2)]
+        expect(f"writer back on replicas after the window ({counts})", set(counts) == {1, 2})
+
+        # Every replica down: reads fall back to the primary
+        for index in range(len(replica_set)):
+            replica_set.mark_down(index, RuntimeError("check"))
+        counts = [await user_count(other) for _ in range(2)]
+        expect(f"reads fall back to the primary when no replica is up ({counts})", counts == [3, 3])
+
+    await shutdown()
+    return checks.report("reads are routed to replicas")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,84 @@
+"""Check that logins upgrade password hashes made under an older policy.
+
+Creates users whose hashes use bcrypt at a lower cost than configured (and,
+with argon2-cffi installed, an argon2id policy switch), logs each in and
+checks that the stored hash now matches the current policy, that the old and
+new hashes both verify the same password, and that a second login does not
+rehash again.
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_rehash_on_login.py
+"""
+import asyncio
+import sys
+
+from checklib import Checks, client, login, queries_of, scratch_env, shutdown
+
+scratch_env("rehash", BCRYPT_ROUNDS=11)
+
+from sqlalchemy import select  # noqa: E402
+
+from app.core import password_hash, security  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.password_hash import ARGON2ID, BCRYPT, HashPolicy  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+PASSWORD = "pässword-123"
+
+
+def stored_hash(email):
+    with SessionLocal() as session:
+        return session.scalar(select(User.hashed_password).where(User.email == email))
+
+
+def add_user(email, hashed):
+    with SessionLocal() as session:
+        tenant = session.scalar(select(Tenant).limit(1)) or Tenant(name="Rehash")
+        session.add(User(email=email, hashed_password=hashed, tenant=tenant))
+        session.commit()
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        async def check_upgrade(email, old_policy, policy):
+            old = old_policy.hash(PASSWORD)
+            add_user(email, old)
+            security.set_hash_policy(policy)
+            r = await login(http, email, "wrong-password")
+            expect(f"{email}: wrong password leaves the hash alone", r.status_code == 401 and stored_hash(email) == old)
+            r = await login(http, email, PASSWORD)
+            new = stored_hash(email)
+            expect(f"{email}: login ok ({old_policy.describe()} -> {policy.describe()})", r.status_code == 200)
+            expect(f"{email}: hash upgraded", new != old and not policy.needs_rehash(new))
+            expect(f"{email}: new hash verifies", password_hash.verify(PASSWORD, new))
+            r = await login(http, email, PASSWORD)
+            # The user lookup and the refresh token insert; no UPDATE of the hash
+            expect(
+                f"{email}: second login doesn't rehash",
+                r.status_code == 200 and stored_hash(email) == new and queries_of(r) == 2,
+            )
+
+        await check_upgrade("cost@example.com", HashPolicy(bcrypt_rounds=10), HashPolicy(bcrypt_rounds=11))
+        await check_upgrade("down@example.com", HashPolicy(bcrypt_rounds=12), HashPolicy(bcrypt_rounds=11))
+        if password_hash.argon2_available():
+            argon2 = HashPolicy(scheme=ARGON2ID, argon2_time_cost=1, argon2_memory_cost=8192)
+            await check_upgrade("argon@example.com", HashPolicy(scheme=BCRYPT, bcrypt_rounds=10), argon2)
+            await check_upgrade("tuned@example.com", argon2, HashPolicy(scheme=ARGON2ID, argon2_time_cost=2, argon2_memory_cost=8192))
+            await check_upgrade("back@example.com", argon2, HashPolicy(bcrypt_rounds=10))
+        else:
+            print("skip  argon2id (argon2-cffi not installed)")
+
+    await shutdown()
+    return checks.report("outdated hashes are upgraded on login")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
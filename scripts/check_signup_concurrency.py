@@ -0,0 +1,79 @@
+"""Check that concurrent signups into one tenant are race-free.
+
+Fires `--users` signups at the same tenant name in parallel, plus a handful
+that reuse an email, against a fresh throwaway SQLite DB. Afterwards there must
+be exactly one tenant, exactly one admin, one user per distinct email and a
+matching tenant_stats counter, and every request must have been answered with
+201 or a clean 400 duplicate.
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_signup_concurrency.py --users 200
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+
+from checklib import Checks, client, scratch_env, shutdown, signup
+
+scratch_env("signup-race")
+# Let every signup through hashing backpressure so they all reach the database together
+os.environ.setdefault("PASSWORD_HASH_MAX_QUEUE", "100000")
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app.core.database import Base, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.tenant_stats import TenantStats  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+TENANT_NAME = "Race"
+
+
+async def signup_outcome(http, email):
+    r = await signup(http, email, TENANT_NAME)
+    return r.status_code, r.json().get("detail")
+
+
+async def main(n_users, n_duplicates):
+    Base.metadata.create_all(bind=engine)
+    emails = [f"user{i}@example.com" for i in range(n_users)]
+    # The same addresses again, racing their originals
+    emails += emails[:n_duplicates]
+
+    async with client(app, timeout=None) as http:
+        responses = await asyncio.gather(*(signup_outcome(http, email) for email in emails))
+    await shutdown()
+
+    outcomes = collections.Counter(responses)
+    for (code, detail), count in sorted(outcomes.items(), key=lambda item: item[0][0]):
+        print(f"{count:>6} x {code} {detail or ''}")
+
+    with engine.connect() as conn:
+        tenants = conn.scalar(select(func.count()).select_from(Tenant).where(Tenant.name == TENANT_NAME))
+        users = conn.scalar(select(func.count()).select_from(User))
+        admins = conn.scalar(select(func.count()).select_from(User).where(User.role == "admin"))
+        counted = conn.scalar(select(func.sum(TenantStats.total_users)))
+    print(f"tenants={tenants} users={users} admins={admins} tenant_stats total={counted}")
+
+    checks = Checks()
+    checks.expect(f"one tenant ({tenants})", tenants == 1)
+    checks.expect(f"one admin ({admins})", admins == 1)
+    checks.expect(f"{n_users} users ({users})", users == n_users)
+    checks.expect(f"tenant_stats counts every user ({counted})", counted == users)
+    checks.expect(f"{n_users} x 201 ({outcomes[(201, None)]})", outcomes[(201, None)] == n_users)
+    duplicates = outcomes[(400, "Email already registered")]
+    checks.expect(f"{n_duplicates} duplicate rejections ({duplicates})", duplicates == n_duplicates)
+    return checks.report("signups are race-free")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200, help="distinct signups fired at once")
+    parser.add_argument("--duplicates", type=int, default=20, help="extra signups reusing an email")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.duplicates)))
@@ -0,0 +1,184 @@
+"""Check the background tenant purge behind DELETE /tenants/{id}.
+
+Seeds a tenant with enough users to take several batches, next to a tenant
+that must survive, then deletes it through the API. Checks that:
+- the DELETE answers 202 at once, and the tenant's users are locked out right
+  away: tokens stop working, logins fail and signups into it are refused
+- the purge removes every user in more than one batch, then the tenant and its
+  counters, and reports progress at GET /tenants/{id}/purge-status
+- other tenants, their users and their counters are untouched
+- a purge left "running" by a worker that stopped is picked up again on startup
+- a bulk import whose tenant goes away mid-way (a foreign key failure on a
+  later batch) keeps its earlier batches and reports the rest as errors, not 500
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_tenant_purge.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_tenant_purge.py
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from checklib import API, PASSWORD, Checks, client, login, scratch_env, shutdown, signup, token_headers
+
+# Slow enough that the lockout checks run while the purge is still going
+scratch_env("tenant-purge", TENANT_PURGE_BATCH_SIZE=100, TENANT_PURGE_PAUSE_MS=200)
+
+from sqlalchemy import event, func, insert, select  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.security import get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import TENANT_DELETING, Tenant  # noqa: E402
+from app.models.tenant_purge import PURGE_DONE, PURGE_RUNNING, TenantPurge  # noqa: E402
+from app.models.tenant_stats import TenantStats  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.tenant_purge import PURGE_LEASE_SECONDS, resume_purges  # noqa: E402
+from app.services.tenant_stats import find_drift  # noqa: E402
+
+DOOMED_USERS = 950
+
+
+def add_users(tenant_id, count, prefix):
+    """Insert users straight into the table, keeping tenant_stats in step."""
+    hashed = get_password_hash(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"email": f"{prefix}{i}@example.com", "hashed_password": hashed, "tenant_id": tenant_id, "is_active": i % 10 != 0}
+            for i in range(count)
+        ])
+        stats = conn.execute(select(TenantStats).where(TenantStats.tenant_id == tenant_id)).first()
+        conn.execute(
+            TenantStats.__table__.update()
+            .where(TenantStats.tenant_id == tenant_id)
+            .values(total_users=stats.total_users + count, active_users=stats.active_users + count - (count + 9) // 10)
+        )
+
+
+def users_in(tenant_id):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(User).where(User.tenant_id == tenant_id))
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        async def wait_for_purge(tenant_id, timeout=30):
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                r = await http.get(f"{API}/tenants/{tenant_id}/purge-status", headers=admin)
+                assert r.status_code == 200, r.text
+                if r.json()["status"] not in ("pending", "running"):
+                    return r.json()
+                await asyncio.sleep(0.05)
+            return r.json()
+
+        for email, tenant_name in (("admin@example.com", "Ops"), ("owner@example.com", "Doomed"),
+                                   ("keeper@example.com", "Other")):
+            r = await signup(http, email, tenant_name)
+            assert r.status_code == 201, r.text
+        admin = await token_headers(http, "admin@example.com")
+        owner = await token_headers(http, "owner@example.com")
+        keeper = await token_headers(http, "keeper@example.com")
+        with engine.connect() as conn:
+            doomed_id = conn.scalar(select(Tenant.id).where(Tenant.name == "Doomed"))
+            other_id = conn.scalar(select(Tenant.id).where(Tenant.name == "Other"))
+        add_users(doomed_id, DOOMED_USERS, "doomed")
+        add_users(other_id, 50, "other")
+        expect("owner's token works before the delete", (await http.get(f"{API}/auth/me", headers=owner)).status_code == 200)
+
+        r = await http.delete(f"{API}/tenants/{doomed_id}", headers=admin)
+        expect(f"DELETE answers 202 ({r.status_code})", r.status_code == 202)
+        expect(f"DELETE reports the purge as pending ({r.json().get('status')})", r.json().get("status") == "pending")
+        expect(f"purge counts the tenant's users ({r.json().get('users_total')})", r.json().get("users_total") == DOOMED_USERS + 1)
+
+        # Still mid-purge: the tenant is locked out already
+        r = await http.get(f"{API}/auth/me", headers=owner)
+        expect(f"cached token of the deleted tenant is rejected ({r.status_code})", r.status_code == 401)
+        r = await login(http, "owner@example.com")
+        expect(f"login into the deleted tenant fails ({r.status_code})", r.status_code == 401)
+        r = await signup(http, "late@example.com", "Doomed")
+        expect(f"signup into the deleted tenant is refused ({r.status_code})", r.status_code == 409)
+        r = await http.get(f"{API}/tenants/{doomed_id}", headers=admin)
+        expect(f"tenant shows as deleting ({r.json().get('status')})", r.json().get("status") == TENANT_DELETING)
+        r = await http.delete(f"{API}/tenants/{doomed_id}", headers=admin)
+        expect(f"repeating the DELETE is accepted ({r.status_code})", r.status_code == 202)
+
+        purge = await wait_for_purge(doomed_id)
+        print(f"      purge: {purge}")
+        expect("purge finished", purge["status"] == PURGE_DONE and purge["finished_at"] is not None)
+        expect(f"purge ran in batches ({purge['batches']})", purge["batches"] > 1)
+        expect(f"every user counted as deleted ({purge['users_deleted']})", purge["users_deleted"] == DOOMED_USERS + 1)
+        expect("tenant's users are gone", users_in(doomed_id) == 0)
+        with engine.connect() as conn:
+            expect("tenant row is gone", conn.scalar(select(Tenant.id).where(Tenant.id == doomed_id)) is None)
+            expect("tenant_stats row is gone",
+                   conn.scalar(select(TenantStats.tenant_id).where(TenantStats.tenant_id == doomed_id)) is None)
+        expect("other tenant keeps its users", users_in(other_id) == 51)
+        expect("other tenant's token still works", (await http.get(f"{API}/auth/me", headers=keeper)).status_code == 200)
+        session = SessionLocal()
+        try:
+            drift = find_drift(session)
+        finally:
+            session.close()
+        expect(f"counters match the users table ({drift})", drift == [])
+        r = await http.delete(f"{API}/tenants/{doomed_id}", headers=admin)
+        expect(f"deleting a purged tenant is a 404 ({r.status_code})", r.status_code == 404)
+
+        # A purge abandoned mid-way by a worker that stopped is resumed on startup
+        r = await signup(http, "stalled@example.com", "Stalled")
+        assert r.status_code == 201, r.text
+        with engine.begin() as conn:
+            stalled_id = conn.scalar(select(Tenant.id).where(Tenant.name == "Stalled"))
+            conn.execute(Tenant.__table__.update().where(Tenant.id == stalled_id).values(status=TENANT_DELETING))
+            long_ago = datetime.utcnow() - timedelta(seconds=PURGE_LEASE_SECONDS + 1)
+            conn.execute(insert(TenantPurge).values(
+                tenant_id=stalled_id, status=PURGE_RUNNING, users_total=251, users_deleted=0, batches=0,
+                started_at=long_ago, updated_at=long_ago,
+            ))
+        add_users(stalled_id, 250, "stalled")
+        await resume_purges()
+        purge = await wait_for_purge(stalled_id)
+        expect(f"stalled purge is resumed and finishes ({purge['status']})", purge["status"] == PURGE_DONE)
+        expect("resumed purge removed the users", users_in(stalled_id) == 0)
+
+        # The tenant of a streamed import is purged after its first batch: the next INSERT
+        # fails its foreign key (SQLite doesn't enforce them, so the failure is injected)
+        r = await signup(http, "importer@example.com", "Importer")
+        assert r.status_code == 201, r.text
+        importer = await token_headers(http, "importer@example.com")
+        inserts = []
+
+        def purged_meanwhile(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("INSERT INTO users"):
+                inserts.append(statement)
+                if len(inserts) > 1:
+                    raise IntegrityError(statement, parameters, Exception("FOREIGN KEY constraint failed"))
+
+        settings.BULK_IMPORT_BATCH_SIZE = 2
+        event.listen(Engine, "before_cursor_execute", purged_meanwhile)
+        try:
+            rows = [{"email": f"import{i}@example.com", "password": PASSWORD} for i in range(4)]
+            r = await http.post(f"{API}/users/bulk", headers=importer, json=rows)
+        finally:
+            event.remove(Engine, "before_cursor_execute", purged_meanwhile)
+            settings.BULK_IMPORT_BATCH_SIZE = 500
+        outcome = [row["status"] for row in r.json()["results"]] if r.status_code == 200 else r.status_code
+        expect(f"an import failing mid-way reports the failed batch's rows, no retry ({outcome}, {len(inserts)} INSERTs)",
+               outcome == ["created", "created", "error", "error"] and r.json()["created"] == 2 and len(inserts) == 2)
+
+    await shutdown()
+    return checks.report("tenants are purged in the background")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,246 @@
+"""Check tenant sharding with SQLite files as shards.
+
+Runs the app with a default database and two shards ("east", "west"), with
+one tenant pinned to "east" by TENANT_SHARDS. Checks that:
+- signup, login, token auth, user CRUD, listing and export of the pinned
+  tenant all happen on its shard, and the superuser's stats read it from there
+- scripts/move_tenant.py's move takes a tenant of a few hundred users from
+  "default" to "west" while a client keeps writing and reading: writes get
+  201 or a 503 while held, reads never fail, and afterwards every user is on
+  "west" and nothing is left on "default"
+- the moved tenant logs in and lists its users from "west"
+- purging a sharded tenant clears it from its shard and from the registry
+- signup and login ignore a bearer token naming a tenant on a shard
+- an email is unique across shards: creating, importing, signing up or
+  renaming to an email used on another shard is refused, deleting a user or
+  purging a tenant frees it, and scripts/migrate_shards.py claims the
+  emails of users created before
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_tenant_shards.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_tenant_shards.py
+"""
+import asyncio
+import collections
+import os
+import sys
+import time
+
+from checklib import API, PASSWORD, Checks, client, login, scratch_env, shutdown, signup, token_headers
+
+# Point the app at a scratch default database and shards before any app module is imported
+_tmpdir = scratch_env(
+    "shards",
+    # Tenant 2 is the second one signed up below
+    TENANT_SHARDS='{"2": "east"}',
+    SHARD_MAP_TTL_SECONDS=0.2,
+    TENANT_PURGE_PAUSE_MS=0,
+    BCRYPT_ROUNDS=4,
+)
+os.environ["DATABASE_SHARDS"] = (
+    f'{{"east": "sqlite:///{_tmpdir}/east.db", "west": "sqlite:///{_tmpdir}/west.db"}}'
+)
+
+from sqlalchemy import delete, func, insert, select, update  # noqa: E402
+
+from app.core.database import create_all_shards, shard_map  # noqa: E402
+from app.core.security import get_password_hash  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tenant import Tenant  # noqa: E402
+from app.models.tenant_shard import TenantShard  # noqa: E402
+from app.models.tenant_stats import TenantStats  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.user_email import UserEmail  # noqa: E402
+from app.services.tenant_shards import move_tenant  # noqa: E402
+from app.services.tenant_stats import find_drift  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from migrate_shards import claim_user_emails  # noqa: E402
+
+MOVED_USERS = 300
+
+
+def users_on(shard, tenant_id):
+    with shard_map.engine(shard).connect() as conn:
+        return set(conn.scalars(select(User.email).where(User.tenant_id == tenant_id)))
+
+
+def claimed_emails(tenant_id=None):
+    query = select(UserEmail.email)
+    if tenant_id is not None:
+        query = query.where(UserEmail.tenant_id == tenant_id)
+    with shard_map.engine("default").connect() as conn:
+        return set(conn.scalars(query))
+
+
+def drift_on(shard):
+    with Session(shard_map.engine(shard)) as session:
+        return find_drift(session)
+
+
+async def main():
+    create_all_shards()
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app, timeout=None) as http:
+        async def add_tenant(email, tenant_name):
+            r = await signup(http, email, tenant_name)
+            assert r.status_code == 201, r.text
+
+        async def create_user(headers, email):
+            r = await http.post(f"{API}/users/", headers=headers, json={"email": email, "password": PASSWORD, "tenant_id": 0})
+            return r.status_code
+
+        # Tenant 1 on "default", tenant 2 pinned to "east"
+        await add_tenant("admin@example.com", "Ops")
+        await add_tenant("pinned@example.com", "Pinned")
+        admin = await token_headers(http, "admin@example.com")
+        expect("pinned tenant's signup lands on its shard",
+               users_on("east", 2) == {"pinned@example.com"} and not users_on("default", 2))
+        pinned = await token_headers(http, "pinned@example.com")
+        r = await http.get(f"{API}/auth/me", headers=pinned)
+        expect(f"pinned tenant's token authenticates ({r.status_code})", r.status_code == 200)
+        statuses = [await create_user(pinned, f"east{i}@example.com") for i in range(5)]
+        expect(f"pinned tenant creates users ({statuses})", statuses == [201] * 5)
+        r = await http.get(f"{API}/users/?limit=100", headers=pinned)
+        expect(f"pinned tenant lists its users from its shard ({len(r.json())})", len(r.json()) == 6 and len(users_on("east", 2)) == 6)
+        r = await http.get(f"{API}/users/export", headers=pinned)
+        expect(f"export reads from the shard ({len(r.text.splitlines())} lines)", len(r.text.splitlines()) == 6)
+        r = await http.get(f"{API}/tenants/2/stats", headers=admin)
+        expect(f"tenant stats come from the shard ({r.json().get('total_users')})", r.json().get("total_users") == 6)
+        r = await http.get(f"{API}/tenants/stats", headers=admin)
+        totals = {row["tenant_id"]: row["total_users"] for row in r.json()}
+        expect(f"stats list mixes shards ({totals})", totals == {1: 1, 2: 6})
+
+        # Emails are unique across shards, not just per database
+        code = await create_user(pinned, "admin@example.com")
+        expect(f"a shard can't create a user with an email used on default ({code})", code == 400)
+        code = await create_user(admin, "east0@example.com")
+        expect(f"default can't create a user with an email used on a shard ({code})", code == 400)
+        r = await signup(http, "east1@example.com", "Ops")
+        expect(f"signup refuses an email used on another shard ({r.status_code})", r.status_code == 400)
+        r = await http.post(f"{API}/users/bulk", headers=pinned, json=[
+            {"email": "admin@example.com", "password": PASSWORD}, {"email": "bulk@example.com", "password": PASSWORD},
+        ])
+        outcome = [row["status"] for row in r.json()["results"]]
+        expect(f"bulk import skips emails used on another shard ({outcome})", outcome == ["duplicate", "created"])
+        east = {row["email"]: row["id"] for row in (await http.get(f"{API}/users/?limit=100", headers=pinned)).json()}
+        r = await http.put(f"{API}/users/{east['east1@example.com']}", headers=pinned, json={"email": "admin@example.com"})
+        expect(f"renaming to an email used on another shard is refused ({r.status_code})", r.status_code == 400)
+        r = await http.put(f"{API}/users/{east['east1@example.com']}", headers=pinned, json={"email": "renamed@example.com"})
+        code = await create_user(admin, "east1@example.com")
+        expect(f"renaming frees the old email ({r.status_code}, then {code})", r.status_code == 200 and code == 201)
+        r = await http.delete(f"{API}/users/{east['bulk@example.com']}", headers=pinned)
+        code = await create_user(admin, "bulk@example.com")
+        expect(f"deleting a user frees its email ({r.status_code}, then {code})", r.status_code == 204 and code == 201)
+        expect("every email is claimed for its tenant",
+               claimed_emails(1) == users_on("default", 1) and claimed_emails(2) == users_on("east", 2))
+
+        # Tenant 3 grows on "default", then moves to "west" while in use
+        await add_tenant("mover@example.com", "Movable")
+        with shard_map.engine("default").begin() as conn:
+            hashed = get_password_hash(PASSWORD)
+            conn.execute(insert(User), [
+                {"email": f"mover{i}@example.com", "hashed_password": hashed, "tenant_id": 3} for i in range(MOVED_USERS)
+            ])
+            conn.execute(update(TenantStats).where(TenantStats.tenant_id == 3).values(
+                total_users=TenantStats.total_users + MOVED_USERS, active_users=TenantStats.active_users + MOVED_USERS
+            ))
+        mover = await token_headers(http, "mover@example.com")
+
+        writes = collections.Counter()
+        created = set()
+        reads = collections.Counter()
+        moving = True
+
+        async def writer():
+            n = 0
+            while moving:
+                email = f"during{n}@example.com"
+                code = await create_user(mover, email)
+                writes[code] += 1
+                if code == 201:
+                    created.add(email)
+                n += 1
+                await asyncio.sleep(0.01)
+
+        async def reader():
+            while moving:
+                r = await http.get(f"{API}/users/?limit=5", headers=mover)
+                reads[r.status_code] += 1
+                await asyncio.sleep(0.01)
+
+        tasks = [asyncio.create_task(writer()), asyncio.create_task(reader())]
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        await asyncio.to_thread(move_tenant, 3, "west", 50, 1.0, lambda line: print(f"      {line}"))
+        await asyncio.sleep(0.3)
+        moving = False
+        await asyncio.gather(*tasks)
+        print(f"      move took {time.perf_counter() - start:.1f}s; writes {dict(writes)}, reads {dict(reads)}")
+
+        expect("writes during the move got 201 or 503", set(writes) <= {201, 503} and writes[201] and writes[503])
+        expect("reads during the move never failed", set(reads) == {200})
+        expected = {"mover@example.com"} | {f"mover{i}@example.com" for i in range(MOVED_USERS)} | created
+        expect(f"every user is on the new shard ({len(users_on('west', 3))}/{len(expected)})", users_on("west", 3) == expected)
+        expect("nothing is left on the old shard", not users_on("default", 3))
+        with shard_map.engine("default").connect() as conn:
+            directory = conn.execute(select(TenantShard.shard, TenantShard.moving).where(TenantShard.tenant_id == 3)).one()
+            registry = conn.scalar(select(func.count()).select_from(Tenant).where(Tenant.id == 3))
+        expect(f"directory points at the new shard ({tuple(directory)})", tuple(directory) == ("west", False))
+        expect("registry row stays on default", registry == 1)
+        expect("counters match on every database", not any(drift_on(shard) for shard in shard_map.names()))
+        r = await login(http, "mover0@example.com")
+        expect(f"moved tenant's users log in ({r.status_code})", r.status_code == 200)
+        r = await http.get(f"{API}/users/?limit=1000", headers=mover)
+        expect(f"moved tenant lists its users ({len(r.json())})", len(r.json()) == len(expected))
+        expect(f"writes work again after the move ({await create_user(mover, 'after@example.com')})",
+               "after@example.com" in users_on("west", 3))
+        r = await http.get(f"{API}/auth/me", headers=admin)
+        expect(f"tenant on default is unaffected ({r.status_code})", r.status_code == 200)
+
+        # Purging a sharded tenant
+        r = await http.delete(f"{API}/tenants/2", headers=admin)
+        expect(f"DELETE of a sharded tenant is accepted ({r.status_code})", r.status_code == 202)
+        r = await login(http, "pinned@example.com")
+        expect(f"its users are locked out at once ({r.status_code})", r.status_code == 401)
+        for _ in range(200):
+            r = await http.get(f"{API}/tenants/2/purge-status", headers=admin)
+            if r.json()["status"] not in ("pending", "running"):
+                break
+            await asyncio.sleep(0.05)
+        expect(f"purge finished ({r.json()['status']})", r.json()["status"] == "done")
+        expect("shard has no users left", not users_on("east", 2))
+        with shard_map.engine("east").connect() as conn:
+            expect("shard's tenant copy is gone", conn.scalar(select(Tenant.id).where(Tenant.id == 2)) is None)
+        with shard_map.engine("default").connect() as conn:
+            expect("registry row is gone", conn.scalar(select(Tenant.id).where(Tenant.id == 2)) is None)
+        expect("its emails are released", not claimed_emails(2))
+
+        # Nothing verifies a token on signup or login, so one must not pick their database
+        r = await signup(http, "stray@example.com", "Stray", headers=mover)
+        with shard_map.engine("default").connect() as conn:
+            registered = conn.scalar(select(Tenant.id).where(Tenant.name == "Stray"))
+        with shard_map.engine("west").connect() as conn:
+            copied = conn.scalar(select(Tenant.id).where(Tenant.name == "Stray"))
+        expect(f"signup with another shard's token registers on default ({r.status_code}, {registered}, {copied})",
+               r.status_code == 201 and registered is not None and copied is None)
+        r = await login(http, "stray@example.com", headers=mover)
+        expect(f"login with another shard's token finds a user on default ({r.status_code})", r.status_code == 200)
+
+    # Users that predate user_emails (here: all of them) are claimed by scripts/migrate_shards.py
+    with shard_map.engine("default").begin() as conn:
+        conn.execute(delete(UserEmail))
+    conflicts = claim_user_emails(batch_size=100)
+    everyone = set().union(*(users_on(shard, tenant_id) for shard in shard_map.names() for tenant_id in (1, 3, 4)))
+    expect(f"migrate_shards claims every existing email ({len(claimed_emails())}/{len(everyone)}, {conflicts})",
+           claimed_emails() == everyone and not conflicts)
+
+    await shutdown()
+    return checks.report("tenants are routed to and moved between shards")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
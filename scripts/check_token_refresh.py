@@ -0,0 +1,223 @@
+"""Check short-lived access tokens with authorization claims, and refresh token rotation.
+
+Drives the app in-process against a throwaway SQLite DB. Checks that:
+- login returns an access token carrying the user's id, role and flags, plus
+  a refresh token stored only as its hash
+- authenticated routes authorize from those claims with no query, even for a
+  token never seen before, superuser checks included
+- a change to the user (or a tenant-wide one) makes older access tokens get
+  401 until refreshed, and the refreshed token carries the new state
+- `POST /auth/refresh` rotates: the used token stops working, replaying it
+  revokes the whole family, and of two concurrent refreshes only one wins
+- logout, expiry, a deleted user and a tenant being purged end refreshing
+- tokens without the claims still authenticate through the DB
+- a worker replaying an invalidation log row older than an access token's
+  lifetime skips it and moves on, and picks up a row committed after one
+  with a higher id
+- every PRUNE_EVERY-th log write deletes the rows older than an access token's
+  lifetime, and only those
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_token_refresh.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_token_refresh.py
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+import checklib
+from checklib import API, PASSWORD, Checks, client, queries_of, scratch_env, shutdown, signup
+
+scratch_env("refresh", SQL_TIMING_ENABLED="true", BCRYPT_ROUNDS=4)
+
+from jose import jwt  # noqa: E402
+from sqlalchemy import func, insert, select, update  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, engine, get_async_sessionmaker  # noqa: E402
+from app.core import principal_cache  # noqa: E402
+from app.core.principal_cache import PrincipalCache, invalidate_principal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.principal_invalidation import PrincipalInvalidation  # noqa: E402
+from app.models.refresh_token import RefreshToken  # noqa: E402
+from app.services.refresh_tokens import hash_refresh_token  # noqa: E402
+
+
+def bearer(body):
+    return checklib.bearer(body["access_token"])
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        async def login(email):
+            r = await checklib.login(http, email)
+            assert r.status_code == 200, r.text
+            return r.json()
+
+        async def refresh(token):
+            r = await http.post(f"{API}/auth/refresh", json={"refresh_token": token})
+            return r.status_code, r.json()
+
+        async def get(url, body):
+            r = await http.get(f"{API}{url}", headers=bearer(body))
+            return r.status_code, queries_of(r)
+
+        r = await signup(http, "admin@example.com", "Ops")
+        assert r.status_code == 201, r.text
+        admin = await login("admin@example.com")
+        claims = jwt.get_unverified_claims(admin["access_token"])
+        expect(f"the access token carries role and flags ({claims['role']}, superuser={claims['is_superuser']})",
+               claims["role"] == "admin" and claims["is_superuser"] is True and claims["is_active"] is True)
+        lifetime = claims["exp"] - claims["iat"]
+        expect(f"it lives ACCESS_TOKEN_EXPIRE_MINUTES ({lifetime:.0f}s, expires_in {admin['expires_in']})",
+               abs(lifetime - settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60) < 2 and admin["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        with engine.connect() as conn:
+            stored = conn.scalars(select(RefreshToken.token_hash)).all()
+        expect("the refresh token is stored only as its hash",
+               stored == [hash_refresh_token(admin["refresh_token"])] and admin["refresh_token"] not in stored)
+
+        # Authorization from claims
+        code, queries = await get("/auth/me", admin)
+        expect(f"a new token authorizes without a query ({code}, {queries} queries)", code == 200 and queries == 0)
+        r = await http.post(f"{API}/users/", headers=bearer(admin), json={"email": "u1@example.com", "password": PASSWORD, "tenant_id": 0})
+        user_id = r.json()["id"]
+        member = await login("u1@example.com")
+        code, queries = await get("/tenants/stats", member)
+        expect(f"the superuser check runs from claims too ({code}, {queries} queries)", code == 403 and queries == 0)
+
+        # Changes make older access tokens refresh
+        r = await http.put(f"{API}/users/{user_id}", headers=bearer(admin), json={"is_active": False})
+        assert r.status_code == 200, r.text
+        code, _ = await get("/auth/me", member)
+        expect(f"a deactivated user's token is outdated at once ({code})", code == 401)
+        code, member = await refresh(member["refresh_token"])
+        expect(f"refreshing picks up the change ({code})", code == 200 and jwt.get_unverified_claims(member["access_token"])["is_active"] is False)
+        code, queries = await get("/auth/me", member)
+        expect(f"the refreshed token is refused as inactive ({code}, {queries} queries)", code == 400 and queries == 0)
+        code, _ = await get("/auth/me", admin)
+        expect(f"other users' tokens are untouched ({code})", code == 200)
+
+        # Rotation and reuse detection
+        old = admin["refresh_token"]
+        code, admin = await refresh(old)
+        expect(f"refresh rotates the token ({code})", code == 200 and admin["refresh_token"] != old)
+        code, _ = await get("/auth/me", admin)
+        expect(f"the new access token works ({code})", code == 200)
+        code, _ = await refresh(old)
+        expect(f"replaying a used refresh token is refused ({code})", code == 401)
+        code, _ = await refresh(admin["refresh_token"])
+        expect(f"and revokes the rest of its family ({code})", code == 401)
+
+        admin = await login("admin@example.com")
+        results = await asyncio.gather(*(refresh(admin["refresh_token"]) for _ in range(2)))
+        codes = sorted(code for code, _ in results)
+        expect(f"two concurrent refreshes: one wins ({codes})", codes == [200, 401])
+
+        # What ends refreshing
+        admin = await login("admin@example.com")
+        r = await http.post(f"{API}/auth/logout", headers=bearer(admin))
+        code, _ = await refresh(admin["refresh_token"])
+        expect(f"logout revokes the refresh token ({r.status_code}, {code})", r.status_code == 204 and code == 401)
+
+        admin = await login("admin@example.com")
+        with engine.begin() as conn:
+            conn.execute(
+                update(RefreshToken)
+                .where(RefreshToken.token_hash == hash_refresh_token(admin["refresh_token"]))
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+        code, _ = await refresh(admin["refresh_token"])
+        expect(f"an expired refresh token is refused ({code})", code == 401)
+
+        admin = await login("admin@example.com")
+        u2 = await http.post(f"{API}/users/", headers=bearer(admin), json={"email": "u2@example.com", "password": PASSWORD, "tenant_id": 0})
+        gone = await login("u2@example.com")
+        await http.delete(f"{API}/users/{u2.json()['id']}", headers=bearer(admin))
+        code, _ = await get("/auth/me", gone)
+        refreshed, _ = await refresh(gone["refresh_token"])
+        expect(f"a deleted user's tokens stop at once ({code}, refresh {refreshed})", code == 401 and refreshed == 401)
+
+        r = await signup(http, "b@example.com", "Doomed")
+        doomed = await login("b@example.com")
+        tenant_id = jwt.get_unverified_claims(doomed["access_token"])["tenant_id"]
+        r = await http.delete(f"{API}/tenants/{tenant_id}", headers=bearer(admin))
+        code, _ = await get("/auth/me", doomed)
+        refreshed, _ = await refresh(doomed["refresh_token"])
+        expect(f"a tenant being purged can't refresh ({r.status_code}; {code}, refresh {refreshed})",
+               r.status_code == 202 and code == 401 and refreshed == 401)
+
+        # Tokens issued before the claims existed go through the DB
+        legacy = jwt.encode(
+            {"sub": "admin@example.com", "tenant_id": 1, "exp": datetime.utcnow() + timedelta(minutes=5)},
+            settings.SECRET_KEY, algorithm=settings.ALGORITHM,
+        )
+        code, queries = await get("/auth/me", {"access_token": legacy})
+        expect(f"a token without claims is checked against the DB ({code}, {queries} queries)", code == 200 and queries == 1)
+
+        for url in ("/cache-stats", "/pool-stats"):
+            codes = [(await http.get(url, headers=headers)).status_code for headers in ({}, bearer(member), bearer(admin))]
+            expect(f"{url} needs a superuser ({codes})", codes == [401, 403, 200])
+        r = await http.get("/cache-stats", headers=bearer(admin))
+        expect(f"changes tracked at /cache-stats ({r.json()['principal_cache']['changes_tracked']})",
+               r.json()["principal_cache"]["changes_tracked"] > 0)
+
+    # Another worker's cache, catching up on the log: a row older than any access token
+    # (a slow poll, a restored backup) has nothing left to outdate
+    worker = PrincipalCache(claims_ttl=300)
+
+    async def sync():
+        async with get_async_sessionmaker()() as db:
+            await worker.sync(db, interval=0)
+
+    def log(user_id, age, **values):
+        with engine.begin() as conn:
+            conn.execute(insert(PrincipalInvalidation).values(user_id=user_id, created_at=datetime.utcnow() - age, **values))
+
+    await sync()
+    log(1001, timedelta(hours=1))
+    try:
+        await sync()
+        synced = True
+    except Exception as e:
+        synced = repr(e)
+    tracked = worker.stats()["changes_tracked"]
+    expect(f"an hour-old log row is skipped ({synced}, {tracked} changes tracked)", synced is True and tracked == 0)
+    log(1002, timedelta(0))
+    await sync()
+    expect("the poll moved past it to a fresh row", worker.claims_outdated({"uid": 1002, "tenant_id": 0, "iat": 0}))
+    # Postgres hands out ids at insert: the row after next can commit first
+    with engine.connect() as conn:
+        newest = conn.scalar(select(func.max(PrincipalInvalidation.id)))
+    log(1004, timedelta(0), id=newest + 2)
+    await sync()
+    log(1003, timedelta(0), id=newest + 1)
+    await sync()
+    expect("a row committed after a higher id is still applied",
+           all(worker.claims_outdated({"uid": uid, "tenant_id": 0, "iat": 0}) for uid in (1003, 1004)))
+
+    # The log is pruned as it is written: the hour-old row goes, the fresh ones stay
+    settings.PRINCIPAL_CACHE_SYNC = True
+    try:
+        principal_cache.principal_cache.log_writes = principal_cache.PRUNE_EVERY - 1
+        async with get_async_sessionmaker()() as db:
+            invalidate_principal(db, 1005)
+            await db.commit()
+    finally:
+        settings.PRINCIPAL_CACHE_SYNC = False
+    with engine.connect() as conn:
+        left = conn.scalars(select(PrincipalInvalidation.user_id).order_by(PrincipalInvalidation.id)).all()
+    expect(f"the PRUNE_EVERY-th log write prunes rows past a token's lifetime ({left})",
+           1001 not in left and {1002, 1003, 1004, 1005} <= set(left))
+
+    await shutdown()
+    return checks.report("access tokens authorize from claims and refresh tokens rotate")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,157 @@
+"""Check token revocation: POST /auth/logout, the in-memory list and its cross-worker sync.
+
+Drives the app in-process against a throwaway SQLite DB. Checks that:
+- a logged-out token is refused at once, even with its principal cached,
+  while the user's other tokens keep working
+- a revocation written by another worker (a `revoked_tokens` row) is picked
+  up by the background poll within TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS
+- a worker starting up loads the unexpired revocations, not the expired ones
+- a row committed after one with a higher id (Postgres hands out ids at
+  insert) is still picked up
+- checking a token stays a dict lookup, and authenticated requests run no
+  revocation query
+- expired rows are pruned without deleting the newest row
+- tokens issued without `jti` still authenticate but can't be revoked
+
+Exits non-zero on any violation.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/check_token_revocation.py
+    DB_MODE=async PYTHONPATH=. .venv/bin/python scripts/check_token_revocation.py
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from checklib import API, Checks, client, queries_of, scratch_env, shutdown, signup, token_headers
+
+SYNC_INTERVAL = 0.3
+scratch_env(
+    "revocation", SQL_TIMING_ENABLED="true", TOKEN_REVOCATION_SYNC_INTERVAL_SECONDS=SYNC_INTERVAL, BCRYPT_ROUNDS=4
+)
+
+from jose import jwt  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.core import revocation  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, engine  # noqa: E402
+from app.core.revocation import RevocationList  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.revoked_token import RevokedToken  # noqa: E402
+
+
+def claims_of(token):
+    return jwt.get_unverified_claims(token)
+
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    checks = Checks()
+    expect = checks.expect
+
+    async with client(app) as http:
+        email = "admin@example.com"
+        r = await signup(http, email, "Ops")
+        assert r.status_code == 201, r.text
+
+        async def login():
+            return await token_headers(http, email)
+
+        async def me(headers):
+            r = await http.get(f"{API}/auth/me", headers=headers)
+            return r.status_code, queries_of(r)
+
+        first, second, third = await login(), await login(), await login()
+        jtis = {claims_of(h["Authorization"][7:])["jti"] for h in (first, second, third)}
+        expect("every token gets its own jti", len(jtis) == 3)
+        await me(first)
+        code, queries = await me(first)
+        expect(f"a cached token authenticates without queries ({code}, {queries} queries)", code == 200 and queries == 0)
+
+        r = await http.post(f"{API}/auth/logout", headers=first)
+        expect(f"logout answers 204 ({r.status_code})", r.status_code == 204)
+        code, queries = await me(first)
+        expect(f"the logged-out token is refused at once ({code}, {queries} queries)", code == 401 and queries == 0)
+        code, _ = await me(second)
+        expect(f"the user's other tokens still work ({code})", code == 200)
+        r = await http.post(f"{API}/auth/logout", headers=first)
+        expect(f"logging out twice is refused ({r.status_code})", r.status_code == 401)
+
+        # Another worker revokes `second`: only the row is written here
+        claims = claims_of(second["Authorization"][7:])
+        with engine.begin() as conn:
+            conn.execute(insert(RevokedToken).values(jti=claims["jti"], expires_at=datetime.utcfromtimestamp(claims["exp"])))
+        start = time.perf_counter()
+        while (await me(second))[0] == 200 and time.perf_counter() - start < 5:
+            await asyncio.sleep(0.05)
+        waited = time.perf_counter() - start
+        expect(f"another worker's revocation arrives by the next poll ({waited:.2f}s)", waited <= SYNC_INTERVAL + 0.5)
+
+        # A worker that starts now: unexpired revocations are loaded, expired ones skipped
+        with engine.begin() as conn:
+            conn.execute(insert(RevokedToken).values(jti="expired", expires_at=datetime.utcnow() - timedelta(minutes=1)))
+        fresh = RevocationList(interval=60)
+        await fresh.poll()
+        expect(f"a new worker loads the live revocations ({len(fresh)})",
+               claims_of(first["Authorization"][7:])["jti"] in fresh and claims["jti"] in fresh and "expired" not in fresh)
+        # Ids 2 and 3 past the newest row: 3 commits first, 2 commits a poll later
+        with engine.begin() as conn:
+            newest = conn.scalar(select(func.max(RevokedToken.id)))
+            conn.execute(insert(RevokedToken).values(id=newest + 3, jti="later", expires_at=datetime.utcnow() + timedelta(minutes=5)))
+        await fresh.poll()
+        with engine.begin() as conn:
+            conn.execute(insert(RevokedToken).values(id=newest + 2, jti="earlier", expires_at=datetime.utcnow() + timedelta(minutes=5)))
+        await fresh.poll()
+        expect("a revocation committed after a later id is still picked up", "later" in fresh and "earlier" in fresh)
+        fresh.add("short", time.time() + 0.1)
+        await asyncio.sleep(0.2)
+        fresh.prune()
+        expect("ids are forgotten once their tokens expire", "short" not in fresh)
+
+        # Lookup cost with a large list
+        big = RevocationList()
+        exp = time.time() + 3600
+        for i in range(100_000):
+            big.add(f"jti-{i}", exp)
+        start = time.perf_counter()
+        for i in range(100_000):
+            f"jti-{i}" in big  # noqa: B015
+        per_check = (time.perf_counter() - start) / 100_000 * 1e9
+        expect(f"a check against 100,000 revocations costs {per_check:.0f}ns", per_check < 5_000)
+
+        # Pruning deletes expired rows but keeps the newest
+        with engine.begin() as conn:
+            conn.execute(insert(RevokedToken), [
+                {"jti": f"old-{i}", "expires_at": datetime.utcnow() - timedelta(minutes=1)} for i in range(5)
+            ])
+        revocation.PRUNE_EVERY = 1
+        r = await http.post(f"{API}/auth/logout", headers=third)
+        revocation.PRUNE_EVERY = 100
+        with engine.connect() as conn:
+            expired = conn.scalar(select(func.count()).select_from(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+            newest = conn.scalar(select(RevokedToken.jti).order_by(RevokedToken.id.desc()).limit(1))
+        expect(f"logout prunes expired rows ({expired} left)", r.status_code == 204 and expired == 0)
+        expect("the newest row is the new revocation", newest == claims_of(third["Authorization"][7:])["jti"])
+
+        # Tokens from before jti: accepted until they expire, but not revocable
+        legacy = jwt.encode(
+            {"sub": email, "tenant_id": 1, "exp": datetime.utcnow() + timedelta(minutes=5)},
+            settings.SECRET_KEY, algorithm=settings.ALGORITHM,
+        )
+        legacy_headers = {"Authorization": f"Bearer {legacy}"}
+        code, _ = await me(legacy_headers)
+        expect(f"a token without jti still authenticates ({code})", code == 200)
+        r = await http.post(f"{API}/auth/logout", headers=legacy_headers)
+        expect(f"and can't be logged out ({r.status_code})", r.status_code == 400)
+
+        r = await http.get("/cache-stats", headers=await login())
+        expect(f"revocation list reported at /cache-stats ({r.json()['revocation_list']})", r.json()["revocation_list"]["polls"] > 0)
+
+    await shutdown()
+    return checks.report("revoked tokens are refused on every worker")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
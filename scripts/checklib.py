@@ -0,0 +1,93 @@
+"""Shared setup and helpers for the scripts/check_*.py regression checks.
+
+The app reads its settings from the environment when it is imported, so a
+check calls `scratch_env` first and imports app modules after it:
+
+    from checklib import Checks, scratch_env
+    scratch_env("etags", BCRYPT_ROUNDS=4)
+
+    from app.main import app  # noqa: E402
+
+Nothing here imports the app at module level.
+"""
+import os
+import tempfile
+
+API = "/api/v1"
+PASSWORD = "password123"
+
+
+def scratch_env(name: str, **env) -> str:
+    """Point the app at a throwaway SQLite database `<name>.db` and set `env`; returns its directory."""
+    tmpdir = tempfile.mkdtemp(prefix=f"{name}-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/{name}.db"
+    for key, value in env.items():
+        os.environ[key] = str(value)
+    return tmpdir
+
+
+class Checks:
+    """Prints an `ok`/`FAIL` line per expectation; `report` sums them up as the exit code."""
+
+    def __init__(self):
+        self.failures = []
+
+    def expect(self, label: str, ok) -> bool:
+        print(f"{'ok' if ok else 'FAIL':<5} {label}")
+        if not ok:
+            self.failures.append(label)
+        return bool(ok)
+
+    def report(self, success: str) -> int:
+        for failure in self.failures:
+            print(f"FAIL: {failure}")
+        if not self.failures:
+            print(f"OK: {success}")
+        return 1 if self.failures else 0
+
+
+def client(app, **kwargs):
+    """An in-process httpx client for `app`."""
+    import httpx
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check", **kwargs)
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def queries_of(response) -> int:
+    """The SQL query count a response reports in its Server-Timing header (SQL_TIMING_ENABLED)."""
+    from app.core.server_timing import SERVER_TIMING_HEADER, query_count
+
+    return query_count(response.headers[SERVER_TIMING_HEADER])
+
+
+async def signup(client, email: str, tenant_name: str, password: str = PASSWORD, **kwargs):
+    return await client.post(
+        f"{API}/auth/signup",
+        json={"name": email, "email": email, "password": password, "tenant_name": tenant_name},
+        **kwargs,
+    )
+
+
+async def login(client, email: str, password: str = PASSWORD, **kwargs):
+    return await client.post(f"{API}/auth/login", json={"email": email, "password": password}, **kwargs)
+
+
+async def token_headers(client, email: str, password: str = PASSWORD) -> dict:
+    """Log in and return the Authorization header of the new access token."""
+    r = await login(client, email, password)
+    assert r.status_code == 200, r.text
+    return bearer(r.json()["access_token"])
+
+
+async def shutdown() -> None:
+    """Stop the app's background poller and hashing pools so the process can exit."""
+    from app.core.revocation import revocation_list
+    from app.core.security import bulk_hashing_pool, hashing_pool
+
+    await revocation_list.stop()
+    hashing_pool.shutdown()
+    bulk_hashing_pool.shutdown()
@@ -2,20 +2,30 @@
 
 Run this with the project's virtualenv to populate the database with the tables
 defined in `app.models` (useful for local development when migrations are not run).
+With DATABASE_SHARDS set, every shard gets the tables too.
 
 Usage:
     .venv/bin/python scripts/create_tables.py
 """
-from app.core.database import engine, Base
+from app.core.database import create_all_shards
 # Ensure model modules are imported so they register with Base.metadata
 import app.models.user  # noqa: F401
 import app.models.tenant  # noqa: F401
+import app.models.principal_invalidation  # noqa: F401
+import app.models.system_state  # noqa: F401
+import app.models.tenant_stats  # noqa: F401
+import app.models.rate_limit_bucket  # noqa: F401
+import app.models.tenant_purge  # noqa: F401
+import app.models.tenant_shard  # noqa: F401
+import app.models.revoked_token  # noqa: F401
+import app.models.refresh_token  # noqa: F401
+import app.models.user_email  # noqa: F401
 import logging
 
 
 def main():
     logging.getLogger("uvicorn").info("Creating database tables from models...")
-    Base.metadata.create_all(bind=engine)
+    create_all_shards()
     logging.getLogger("uvicorn").info("Tables created")
 
 
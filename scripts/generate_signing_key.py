@@ -0,0 +1,72 @@
+"""Generate a key for signing access tokens, or the public half of an existing one.
+
+Writes `<kid>.pem` into the keys directory (JWT_KEYS_DIR). RSA keys sign
+with RS256, P-256 keys with ES256. `--public` writes only the public key of
+an existing `<kid>.pem`, for retiring a key: tokens it signed still verify
+until they expire, but it can no longer sign new ones.
+
+Rotation: generate the new key on every worker's JWT_KEYS_DIR and restart, so
+it is published at /.well-known/jwks.json; after JWKS_MAX_AGE_SECONDS point
+JWT_SIGNING_KID at it and restart again; once ACCESS_TOKEN_EXPIRE_MINUTES have
+passed, delete the old `<kid>.pem`.
+
+Run with:
+    .venv/bin/python scripts/generate_signing_key.py --dir keys --kid 2026-10 [--type ec]
+    .venv/bin/python scripts/generate_signing_key.py --dir keys --kid 2026-04 --public
+"""
+import argparse
+import os
+import sys
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+
+def generate(key_type: str):
+    if key_type == "ec":
+        return ec.generate_private_key(ec.SECP256R1())
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def private_pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def public_pem(private_key) -> bytes:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+def main(directory: str, kid: str, key_type: str, public: bool) -> int:
+    path = os.path.join(directory, f"{kid}.pem")
+    if public:
+        with open(path, "rb") as f:
+            private_key = serialization.load_pem_private_key(f.read(), password=None)
+        pem = public_pem(private_key)
+        algorithm = "RS256" if isinstance(private_key, rsa.RSAPrivateKey) else "ES256"
+    else:
+        if os.path.exists(path):
+            print(f"{path} already exists")
+            return 1
+        os.makedirs(directory, exist_ok=True)
+        pem = private_pem(generate(key_type))
+        algorithm = "ES256" if key_type == "ec" else "RS256"
+    # Only the owner may read a private key
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644 if public else 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    print(f"Wrote {path} ({algorithm}, {'public only' if public else 'private'})")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", required=True, help="keys directory (JWT_KEYS_DIR)")
+    parser.add_argument("--kid", required=True, help="key id, also the file name")
+    parser.add_argument("--type", choices=("rsa", "ec"), default="rsa", help="RSA (RS256) or P-256 (ES256)")
+    parser.add_argument("--public", action="store_true", help="replace an existing key with its public half")
+    args = parser.parse_args()
+    sys.exit(main(args.dir, args.kid, args.type, args.public))
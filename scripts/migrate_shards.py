@@ -0,0 +1,119 @@
+"""Bring the default database and every shard in DATABASE_SHARDS to the current schema.
+
+Runs `alembic upgrade head` on each database, "default" first; every shard
+carries the full schema. `--create-all` instead creates the tables from the
+models and stamps the Alembic head, for new, empty shards (the migration chain
+starts from tables that `create_all` made).
+
+With shards configured, a run over every database also claims each existing
+user's email in `user_emails` on "default" (emails must be unique across
+shards), and lists emails found under two tenants; rerunning it is harmless.
+
+On Postgres, shard number N (in DATABASE_SHARDS order, "default" being 0) also
+has its users id sequence moved up to N x `--id-block`, so users created on
+different shards never share an id and tenants can be moved between them.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/migrate_shards.py
+    PYTHONPATH=. .venv/bin/python scripts/migrate_shards.py --create-all --shard eu2
+"""
+import argparse
+import sys
+
+from typing import List
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select, text
+
+from app.core.database import DEFAULT_SHARD, Base, insert_or_ignore, shard_map
+from app.models.user import User
+from app.models.user_email import UserEmail
+# Ensure model modules are imported so they register with Base.metadata
+import app.models.user  # noqa: F401
+import app.models.tenant  # noqa: F401
+import app.models.principal_invalidation  # noqa: F401
+import app.models.system_state  # noqa: F401
+import app.models.tenant_stats  # noqa: F401
+import app.models.rate_limit_bucket  # noqa: F401
+import app.models.tenant_purge  # noqa: F401
+import app.models.tenant_shard  # noqa: F401
+import app.models.revoked_token  # noqa: F401
+import app.models.refresh_token  # noqa: F401
+import app.models.user_email  # noqa: F401
+
+
+def alembic_config(shard: str) -> Config:
+    config = Config("alembic.ini")
+    # Read by alembic/env.py, like `alembic -x shard=<name>` on the command line
+    config.cmd_opts = argparse.Namespace(x=[f"shard={shard}"])
+    return config
+
+
+def reserve_id_block(shard_engine, number: int, block: int) -> None:
+    """Start the shard's users id sequence at its own block (Postgres only)."""
+    if shard_engine.dialect.name != "postgresql" or number == 0:
+        return
+    with shard_engine.begin() as conn:
+        sequence = conn.scalar(text("SELECT pg_get_serial_sequence('users', 'id')"))
+        last = conn.scalar(text(f"SELECT last_value FROM {sequence}"))
+        if last < number * block:
+            conn.execute(text("SELECT setval(:sequence, :start)"), {"sequence": sequence, "start": number * block})
+
+
+def claim_user_emails(batch_size: int = 10000) -> List[str]:
+    """Claim every user's email for its tenant in `user_emails`; returns those taken by another tenant."""
+    conflicts = []
+    with shard_map.engine(DEFAULT_SHARD).begin() as directory:
+        for shard in shard_map.names():
+            with shard_map.engine(shard).connect() as conn:
+                result = conn.execution_options(yield_per=batch_size).execute(select(User.email, User.tenant_id))
+                for rows in result.partitions():
+                    tenants = {row.email: row.tenant_id for row in rows}
+                    claimed = directory.scalars(
+                        insert_or_ignore(UserEmail, "email").returning(UserEmail.email),
+                        [{"email": email, "tenant_id": tenant_id} for email, tenant_id in tenants.items()],
+                    ).all()
+                    unclaimed = set(tenants) - set(claimed)
+                    if unclaimed:
+                        owners = directory.execute(
+                            select(UserEmail.email, UserEmail.tenant_id).where(UserEmail.email.in_(unclaimed))
+                        )
+                        conflicts += [email for email, tenant_id in owners if tenant_id != tenants[email]]
+    return conflicts
+
+
+def main(args) -> int:
+    names = shard_map.names()
+    for shard in args.shard or names:
+        if shard not in names:
+            print(f"Unknown shard {shard!r}; configured: {', '.join(names)}")
+            return 1
+    for number, shard in enumerate(names):
+        if args.shard and shard not in args.shard:
+            continue
+        shard_engine = shard_map.engine(shard)
+        if args.create_all:
+            Base.metadata.create_all(bind=shard_engine)
+            command.stamp(alembic_config(shard), "head")
+            print(f"{shard}: tables created, stamped head")
+        else:
+            command.upgrade(alembic_config(shard), "head")
+            print(f"{shard}: upgraded to head")
+        reserve_id_block(shard_engine, number, args.id_block)
+    if shard_map and not args.shard:
+        conflicts = claim_user_emails()
+        for email in conflicts:
+            print(f"{email} is used in more than one tenant; change one of them and run this again")
+        if conflicts:
+            return 1
+        print("user emails claimed")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shard", action="append", help="only this shard (repeatable); default: all")
+    parser.add_argument("--create-all", action="store_true", help="create tables from the models and stamp head")
+    parser.add_argument("--id-block", type=int, default=100_000_000, help="users ids reserved per shard (Postgres)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,35 @@
+"""Move a tenant's users and counters to another shard while it stays online.
+
+Copies every row to the target shard while the tenant keeps working, then
+holds its writes (they get a 503 with Retry-After) just long enough to copy
+what changed meanwhile and switch the `tenant_shards` directory over. Reads
+are served throughout. Each step waits SHARD_MAP_TTL_SECONDS (+1s) so every
+worker has seen it; use the same setting as the running app.
+
+If the move fails before the switch, writes are released and the tenant stays
+where it was; running it again resumes from what was already copied.
+
+Run:
+    PYTHONPATH=. .venv/bin/python scripts/move_tenant.py --tenant 42 --to eu2
+"""
+import argparse
+import sys
+
+from app.services.tenant_shards import MoveError, move_tenant
+
+
+def main(args) -> int:
+    try:
+        move_tenant(args.tenant, args.to, batch_size=args.batch, log=print)
+    except MoveError as e:
+        print(f"Move failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", type=int, required=True, help="tenant id")
+    parser.add_argument("--to", required=True, help="target shard name (see DATABASE_SHARDS)")
+    parser.add_argument("--batch", type=int, default=1000, help="users copied per transaction")
+    sys.exit(main(parser.parse_args()))
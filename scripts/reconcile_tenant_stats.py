@@ -0,0 +1,43 @@
+"""Recompute per-tenant user counters and report any drift.
+
+`tenant_stats` is maintained incrementally by the user write paths. This
+recounts `users` per tenant, prints every tenant whose stored counters differ,
+and (unless `--dry-run`) resets those tenants to the recounted values.
+
+Exits non-zero on drift with `--dry-run`, so it can run as a periodic check.
+
+Run with:
+    PYTHONPATH=. .venv/bin/python scripts/reconcile_tenant_stats.py [--dry-run]
+"""
+import argparse
+import sys
+
+from app.core.database import SessionLocal
+from app.services.tenant_stats import find_drift, reset_tenant_stats
+
+
+def main(dry_run: bool) -> int:
+    session = SessionLocal()
+    try:
+        drift = find_drift(session)
+        for entry in drift:
+            print(f"tenant {entry['tenant_id']}: stored {entry['stored']} actual {entry['actual']}")
+        if not drift:
+            print("No drift")
+            return 0
+        if dry_run:
+            print(f"{len(drift)} tenant(s) drifted (dry run, nothing changed)")
+            return 1
+        for entry in drift:
+            reset_tenant_stats(session, entry["tenant_id"])
+        print(f"Reset counters for {len(drift)} tenant(s)")
+        return 0
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="report drift without fixing it")
+    args = parser.parse_args()
+    sys.exit(main(args.dry_run))